@@ -0,0 +1,221 @@
+# app/cache.py
+from __future__ import annotations
+import sqlite3, threading, time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+class LRUCache(Generic[V]):
+    """Thread-safe in-process LRU with optional TTL and hit/miss counters."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, stored_at = item
+            if self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: V, stored_at: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (value, stored_at if stored_at is not None else time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class SqliteCache:
+    """
+    On-disk key -> bytes store that survives restarts.
+
+    Entries live under a `namespace` (e.g. the embedding model). Opening the
+    store with a different namespace drops every entry, so a config change
+    invalidates the cache automatically.
+
+    Hits only read: last-access times are buffered and written with the next
+    put (or every `touch_batch` hits). The entry count is tracked per put and
+    re-read with COUNT(*) only when it passes `max_entries` or every
+    `recount_every` puts (other processes may share the file); eviction then
+    drops the least recently used entries down to ~1% below the cap, so a full
+    cache doesn't recount on every put.
+    """
+
+    def __init__(self, path: Path, namespace: str, max_entries: int = 100_000,
+                 ttl_seconds: Optional[float] = None, touch_batch: int = 256, recount_every: int = 256):
+        self.path = Path(path)
+        self.namespace = namespace
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.touch_batch = max(1, int(touch_batch))
+        self.recount_every = max(1, int(recount_every))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}  # key -> last access not yet written
+        self._puts_since_count = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+            " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT NOT NULL)")
+        row = self._conn.execute("SELECT v FROM meta WHERE k = 'namespace'").fetchone()
+        if row is None or row[0] != namespace:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('namespace', ?)", (namespace,))
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _write_touches(self) -> None:
+        """Write buffered last-access times (caller holds the lock and commits)."""
+        if self._touched:
+            self._conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                                   [(t, k) for k, t in self._touched.items()])
+            self._touched.clear()
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Return (value, created_at) or None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._touched.pop(key, None)
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self._count -= 1
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= self.touch_batch:
+                self._write_touches()
+                self._conn.commit()
+            self.hits += 1
+            return bytes(row[0]), row[1]
+
+    def put(self, key: str, value: bytes) -> None:
+        now = time.time()
+        with self._lock:
+            self._touched.pop(key, None)
+            self._write_touches()
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO entries (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), now, now),
+            )
+            if cur.rowcount:
+                self._count += 1
+            else:
+                self._conn.execute("UPDATE entries SET value = ?, created_at = ?, last_access = ? WHERE key = ?",
+                                   (sqlite3.Binary(value), now, now, key))
+            self._puts_since_count += 1
+            if self._count > self.max_entries or self._puts_since_count >= self.recount_every:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Recount (other processes may have written) and trim to below the cap if over it."""
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        self._puts_since_count = 0
+        if self._count <= self.max_entries:
+            return
+        overflow = self._count - self.max_entries + self.max_entries // 100
+        self._conn.execute(
+            "DELETE FROM entries WHERE key IN "
+            "(SELECT key FROM entries ORDER BY last_access ASC LIMIT ?)", (overflow,)
+        )
+        self._count -= overflow
+        self.evictions += overflow
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self._count = 0
+            self._puts_since_count = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class TwoTierCache(Generic[V]):
+    """In-process LRU in front of an optional SqliteCache; values are (de)serialized at the disk boundary."""
+
+    def __init__(self, memory: LRUCache, disk: Optional[SqliteCache],
+                 encode: Callable[[V], bytes], decode: Callable[[bytes], V]):
+        self.memory = memory
+        self.disk = disk
+        self._encode = encode
+        self._decode = decode
+
+    def get(self, key: str) -> Optional[V]:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.disk is None:
+            return None
+        item = self.disk.get(key)
+        if item is None:
+            return None
+        raw, created_at = item
+        value = self._decode(raw)
+        self.memory.put(key, value, stored_at=created_at)  # keep the original age for TTL
+        return value
+
+    def put(self, key: str, value: V) -> None:
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, self._encode(value))
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
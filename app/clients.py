@@ -0,0 +1,101 @@
+# app/clients.py
+"""
+One place to get OpenAI-compatible clients. Sync and async clients are created
+once per process (async: once per event loop) on top of pooled keep-alive httpx
+clients, so /chat, semantic search and the indexer reuse connections.
+"""
+from __future__ import annotations
+import asyncio, os, threading
+from typing import TYPE_CHECKING, Any, Dict, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from app.config import load_yaml, repo_path
+
+if TYPE_CHECKING:  # openai/httpx are imported on first client use (slow imports)
+    import httpx
+    from openai import AsyncOpenAI, OpenAI
+
+load_dotenv()
+CLIENT_CFG: Dict[str, Any] = load_yaml(repo_path("config", "clients.yaml")) or {}
+POOL_CFG = CLIENT_CFG.get("pool", {}) or {}
+TIMEOUTS_CFG = CLIENT_CFG.get("timeouts", {}) or {}
+
+_lock = threading.Lock()
+_sync_client: Optional["OpenAI"] = None
+_async_client: Optional[Tuple[asyncio.AbstractEventLoop, "AsyncOpenAI"]] = None
+_closing: Set["asyncio.Task[None]"] = set()  # pools of failed client constructions, closing
+
+def _limits() -> "httpx.Limits":
+    import httpx
+    return httpx.Limits(
+        max_connections=int(POOL_CFG.get("max_connections", 50)),
+        max_keepalive_connections=int(POOL_CFG.get("max_keepalive_connections", 20)),
+        keepalive_expiry=float(POOL_CFG.get("keepalive_expiry_s", 30)),
+    )
+
+def timeout(kind: str) -> "httpx.Timeout":
+    """Per-call timeout for `kind` (chat, embeddings, embeddings_build) from config/clients.yaml."""
+    import httpx
+    total = float(TIMEOUTS_CFG.get(kind, TIMEOUTS_CFG.get("chat", 20)))
+    return httpx.Timeout(total, connect=float(TIMEOUTS_CFG.get("connect", 5)))
+
+def _client_kwargs() -> Dict[str, Any]:
+    kw: Dict[str, Any] = {"max_retries": int(CLIENT_CFG.get("max_retries", 2)), "timeout": timeout("chat")}
+    base_url = CLIENT_CFG.get("base_url") or os.getenv("OPENAI_BASE_URL")
+    if base_url:
+        kw["base_url"] = base_url
+    return kw
+
+def get_client() -> "OpenAI":
+    """Process-wide sync client on a pooled keep-alive httpx.Client."""
+    global _sync_client
+    if _sync_client is None:
+        with _lock:
+            if _sync_client is None:
+                import httpx
+                from openai import OpenAI
+                kw = _client_kwargs()
+                http = httpx.Client(limits=_limits(), timeout=kw["timeout"])
+                try:
+                    _sync_client = OpenAI(http_client=http, **kw)
+                except BaseException:  # e.g. no API key: don't leak a pool per retry
+                    http.close()
+                    raise
+    return _sync_client
+
+def get_async_client() -> "AsyncOpenAI":
+    """Async client for the running event loop on a pooled keep-alive httpx.AsyncClient."""
+    global _async_client
+    loop = asyncio.get_running_loop()
+    current = _async_client
+    if current is None or current[0] is not loop:
+        import httpx
+        from openai import AsyncOpenAI
+        kw = _client_kwargs()
+        http = httpx.AsyncClient(limits=_limits(), timeout=kw["timeout"])
+        try:
+            current = (loop, AsyncOpenAI(http_client=http, **kw))
+        except BaseException:  # e.g. no API key: close the pool (nothing connected yet) on the next tick
+            task = loop.create_task(http.aclose())
+            _closing.add(task)
+            task.add_done_callback(_closing.discard)
+            raise
+        _async_client = current
+    return current[1]
+
+def close_clients() -> None:
+    """Close the sync pool (the async pool is closed by aclose_clients)."""
+    global _sync_client
+    with _lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+
+async def aclose_clients() -> None:
+    global _async_client
+    current = _async_client
+    _async_client = None
+    if current is not None and current[0] is asyncio.get_running_loop():
+        await current[1].close()
+    close_clients()
@@ -0,0 +1,197 @@
+# app/embeddings.py
+"""
+Embedding providers, selected by `embedding.provider` in config/semantic.yaml and
+shared by the indexer and the query path:
+
+- `openai`: the remote embeddings API (`EMBEDDING_MODEL` / `model`), one network
+  round trip per uncached query.
+- `local`: `HashedTfidfEmbeddings`, a CPU-only encoder fit on the profile corpus
+  (hashed unigram+bigram TF-IDF, random-projected to `dim`). No network; a query
+  embeds in tens of microseconds.
+
+The indexer records `provider.info()` in the stats file; `provider_for_index`
+refuses to serve an index built by a different provider, model or local fit.
+"""
+from __future__ import annotations
+import hashlib, json, os, zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.config import load_yaml, repo_path
+
+load_dotenv()
+SEM_CFG = load_yaml(repo_path("config", "semantic.yaml"))
+EMBED_CFG = SEM_CFG.get("embedding", {}) or {}
+LOCAL_CFG = EMBED_CFG.get("local", {}) or {}
+
+PROVIDER = EMBED_CFG.get("provider", "openai")
+EMBED_MODEL = os.getenv("EMBEDDING_MODEL", SEM_CFG.get("model", "text-embedding-3-large"))
+LOCAL_PATH = repo_path(LOCAL_CFG.get("path", "data/local_embedder.npz"))
+
+def _l2_normalize(mat: np.ndarray) -> np.ndarray:
+    mat = np.asarray(mat, dtype="float32")
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    return mat / np.maximum(norms, 1e-12)
+
+class EmbeddingProvider:
+    """Turns normalized texts into L2-normalized float32 rows."""
+
+    name = ""
+    remote = False             # True: network call per batch (query cache + coalescing apply)
+    model = ""                 # cache / embedding-store namespace
+    dim: Optional[int] = None  # None when only known after the first call
+
+    def info(self) -> Dict[str, Any]:
+        """What the indexer records in the stats file."""
+        return {"provider": self.name, "model": self.model}
+
+    def embed(self, texts: List[str], timeout_kind: str = "embeddings") -> np.ndarray:
+        raise NotImplementedError
+
+    async def aembed(self, texts: List[str], timeout_kind: str = "embeddings") -> np.ndarray:
+        return self.embed(texts, timeout_kind)
+
+class OpenAIEmbeddings(EmbeddingProvider):
+    name = "openai"
+    remote = True
+
+    def __init__(self, model: str = EMBED_MODEL):
+        self.model = model
+
+    def embed(self, texts: List[str], timeout_kind: str = "embeddings") -> np.ndarray:
+        from app.clients import get_client, timeout
+        resp = get_client().embeddings.create(model=self.model, input=texts, timeout=timeout(timeout_kind))
+        return _l2_normalize([d.embedding for d in resp.data])
+
+    async def aembed(self, texts: List[str], timeout_kind: str = "embeddings") -> np.ndarray:
+        from app.clients import get_async_client, timeout
+        resp = await get_async_client().embeddings.create(model=self.model, input=texts, timeout=timeout(timeout_kind))
+        return _l2_normalize([d.embedding for d in resp.data])
+
+class HashedTfidfEmbeddings(EmbeddingProvider):
+    """
+    Unigrams (+ bigrams) of the normalized text are hashed into `n_features` buckets
+    (crc32, stable across processes), weighted by (1 + log tf) * idf with idf fit on
+    the profile corpus, and projected to `dim` with a seeded +-1 matrix.
+    """
+
+    name = "local"
+
+    def __init__(self, df: np.ndarray, n_docs: int, dim: int = 256, bigrams: bool = True, seed: int = 0):
+        self.df = np.asarray(df, dtype="int32")
+        self.n_features = int(self.df.size)
+        if self.n_features & (self.n_features - 1):
+            raise ValueError("n_features must be a power of two")
+        self.n_docs = int(n_docs)
+        self.dim = int(dim)
+        self.bigrams = bool(bigrams)
+        self.seed = int(seed)
+        self.idf = (np.log((1.0 + self.n_docs) / (1.0 + self.df)) + 1.0).astype("float32")
+        rng = np.random.default_rng(self.seed)
+        self._proj = (rng.integers(0, 2, size=(self.n_features, self.dim), dtype=np.int8) * 2 - 1).astype(np.int8)
+        h = hashlib.sha256(json.dumps(self._params(), sort_keys=True).encode("utf-8"))
+        h.update(self.df.tobytes())
+        self.fingerprint = h.hexdigest()[:16]
+        self.model = f"local-tfidf-{self.dim}-{self.fingerprint}"
+
+    def _params(self) -> Dict[str, Any]:
+        return {"n_features": self.n_features, "n_docs": self.n_docs, "dim": self.dim,
+                "bigrams": self.bigrams, "seed": self.seed}
+
+    def info(self) -> Dict[str, Any]:
+        return {**super().info(), "fingerprint": self.fingerprint, "dim": self.dim}
+
+    @staticmethod
+    def _buckets(text: str, n_features: int, bigrams: bool) -> Dict[int, int]:
+        toks = text.split()
+        grams = toks + [f"{a} {b}" for a, b in zip(toks, toks[1:])] if bigrams else toks
+        mask = n_features - 1
+        counts: Dict[int, int] = {}
+        for g in grams:
+            b = zlib.crc32(g.encode("utf-8")) & mask
+            counts[b] = counts.get(b, 0) + 1
+        return counts
+
+    @classmethod
+    def fit(cls, texts: Iterable[str], dim: int = 256, n_features: int = 1 << 16,
+            bigrams: bool = True, seed: int = 0) -> "HashedTfidfEmbeddings":
+        """Document frequencies over the corpus (normalized profile blobs)."""
+        df = np.zeros(int(n_features), dtype="int32")
+        n_docs = 0
+        for t in texts:
+            n_docs += 1
+            b = list(cls._buckets(t, n_features, bigrams))
+            if b:
+                df[b] += 1
+        return cls(df, n_docs, dim=dim, bigrams=bigrams, seed=seed)
+
+    def embed(self, texts: List[str], timeout_kind: str = "embeddings") -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for i, text in enumerate(texts):
+            counts = self._buckets(text, self.n_features, self.bigrams)
+            if not counts:
+                continue
+            buckets = np.fromiter(counts.keys(), dtype="int64", count=len(counts))
+            tf = np.fromiter(counts.values(), dtype="float32", count=len(counts))
+            w = (1.0 + np.log(tf)) * self.idf[buckets]
+            out[i] = w @ self._proj[buckets].astype("float32")
+        return _l2_normalize(out)
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        with path.open("wb") as f:  # np.savez would append .npz to a str path
+            np.savez(f, df=self.df, params=np.array(json.dumps(self._params())))
+
+    @classmethod
+    def load(cls, path: Path) -> "HashedTfidfEmbeddings":
+        with np.load(Path(path)) as z:
+            params = json.loads(str(z["params"]))
+            df = z["df"]
+        return cls(df, params["n_docs"], dim=params["dim"], bigrams=params["bigrams"], seed=params["seed"])
+
+def fit_local(texts: Iterable[str]) -> HashedTfidfEmbeddings:
+    """Fit the local encoder with the parameters from config/semantic.yaml (embedding.local)."""
+    return HashedTfidfEmbeddings.fit(
+        texts,
+        dim=int(LOCAL_CFG.get("dim", 256)),
+        n_features=int(LOCAL_CFG.get("n_features", 1 << 16)),
+        bigrams=bool(LOCAL_CFG.get("bigrams", True)),
+        seed=int(LOCAL_CFG.get("seed", 0)),
+    )
+
+_remote: Optional[OpenAIEmbeddings] = None
+
+def remote_provider() -> OpenAIEmbeddings:
+    global _remote
+    if _remote is None:
+        _remote = OpenAIEmbeddings(EMBED_MODEL)
+    return _remote
+
+def provider_for_index(recorded: Optional[Dict[str, Any]], what: str) -> EmbeddingProvider:
+    """
+    The configured provider for serving an index whose stats recorded `recorded`
+    (stats["embedding"]; legacy stats: {"provider": "openai", "model": stats["model"]}).
+    Raises if the index was built by another provider/model or, for `local`, another fit.
+    """
+    recorded = recorded or {}
+    hint = "; rebuild with `python indexing/build_index.py --full`"
+    built_with = recorded.get("provider", "openai")
+    if built_with != PROVIDER:
+        raise RuntimeError(f"{what} was built with embedding provider {built_with!r}, "
+                           f"but config/semantic.yaml selects {PROVIDER!r}{hint}")
+    if PROVIDER == "openai":
+        if recorded.get("model") and recorded["model"] != EMBED_MODEL:
+            raise RuntimeError(f"{what} was embedded with {recorded['model']}, but EMBEDDING_MODEL is {EMBED_MODEL}{hint}")
+        return remote_provider()
+    if PROVIDER == "local":
+        if not LOCAL_PATH.exists():
+            raise FileNotFoundError(f"local embedder not found at {LOCAL_PATH}{hint}")
+        local = HashedTfidfEmbeddings.load(LOCAL_PATH)
+        if recorded.get("fingerprint") != local.fingerprint:
+            raise RuntimeError(f"{what} was built with local embedder {recorded.get('fingerprint')}, "
+                               f"but {LOCAL_PATH} is {local.fingerprint}{hint}")
+        return local
+    raise ValueError(f"unknown embedding provider {PROVIDER!r} (openai | local)")
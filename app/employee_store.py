@@ -0,0 +1,331 @@
+# app/employee_store.py
+"""
+Embedded SQLite store for employee records (config/data.yaml -> store).
+
+employees.json stays the editable source; `import_json` converts it into
+data/employees.sqlite:
+
+- `employees`: one row per employee (id primary key, file position, name,
+  experience_years, lower-cased availability, the full record as JSON), indexed
+  on availability + experience_years and on experience_years.
+- `skills` / `domains` with `employee_skills` / `employee_domains` join tables,
+  so skill/domain filters and facet lists never touch the JSON documents.
+- `meta`: schema version, sha256 and stat of the source file, import time.
+
+The import streams the JSON array record by record, and the snapshot builder,
+facets and the indexer stream rows from here instead of each parsing the whole
+JSON file. `filter_employees` answers the column filters (experience,
+availability) in SQL; skill/domain names are stored as written, so token
+matching stays in the keyword index.
+"""
+from __future__ import annotations
+import hashlib, json, logging, os, sqlite3, tempfile, threading, time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.config import load_yaml, repo_path
+
+try:
+    import fcntl
+except ImportError:  # Windows: imports are not serialized, but each still writes its own temp file
+    fcntl = None
+
+DATA_CFG = load_yaml(repo_path("config", "data.yaml")) or {}
+EMPLOYEES_PATH = repo_path(DATA_CFG.get("employees", "data/employees.json"))
+STORE_PATH = repo_path(DATA_CFG.get("store", "data/employees.sqlite"))
+AUTO_IMPORT = bool(DATA_CFG.get("auto_import", True))
+
+SCHEMA_VERSION = "1"
+
+logger = logging.getLogger("hrbot.data")
+
+_SCHEMA = [
+    "CREATE TABLE employees ("
+    " id INTEGER PRIMARY KEY, pos INTEGER NOT NULL UNIQUE, name TEXT NOT NULL,"
+    " experience_years INTEGER NOT NULL, availability TEXT NOT NULL, doc TEXT NOT NULL)",
+    "CREATE INDEX employees_availability ON employees(availability, experience_years)",
+    "CREATE INDEX employees_experience ON employees(experience_years)",
+    "CREATE TABLE skills (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)",
+    "CREATE TABLE domains (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)",
+    "CREATE TABLE employee_skills (skill_id INTEGER NOT NULL, employee_id INTEGER NOT NULL,"
+    " PRIMARY KEY (skill_id, employee_id)) WITHOUT ROWID",
+    "CREATE INDEX employee_skills_employee ON employee_skills(employee_id)",
+    "CREATE TABLE employee_domains (domain_id INTEGER NOT NULL, employee_id INTEGER NOT NULL,"
+    " PRIMARY KEY (domain_id, employee_id)) WITHOUT ROWID",
+    "CREATE INDEX employee_domains_employee ON employee_domains(employee_id)",
+    "CREATE TABLE meta (k TEXT PRIMARY KEY, v TEXT NOT NULL)",
+]
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _stat_key(path: Path) -> str:
+    st = Path(path).stat()
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+# ---------- Import ----------
+def _write_store(conn: sqlite3.Connection, employees: Iterable[Dict[str, Any]],
+                 meta: Optional[Dict[str, str]]) -> int:
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    for stmt in _SCHEMA:
+        conn.execute(stmt)
+    term_ids: Dict[str, Dict[str, int]] = {"skills": {}, "domains": {}}
+    links: Dict[str, List[Tuple[int, int]]] = {"skills": [], "domains": []}
+    rows: List[Tuple[Any, ...]] = []
+    n = 0
+
+    def flush() -> None:
+        conn.executemany("INSERT INTO employees VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.executemany("INSERT OR IGNORE INTO employee_skills VALUES (?, ?)", links["skills"])
+        conn.executemany("INSERT OR IGNORE INTO employee_domains VALUES (?, ?)", links["domains"])
+        rows.clear()
+        links["skills"].clear()
+        links["domains"].clear()
+
+    for emp in employees:
+        emp_id = int(emp["id"])
+        rows.append((
+            emp_id, n, emp.get("name", ""), int(emp.get("experience_years", 0)),
+            str(emp.get("availability", "")).lower(), json.dumps(emp, ensure_ascii=False),
+        ))
+        for table in ("skills", "domains"):
+            ids = term_ids[table]
+            for name in emp.get(table) or []:
+                tid = ids.get(name)
+                if tid is None:
+                    tid = ids[name] = len(ids) + 1
+                links[table].append((tid, emp_id))
+        n += 1
+        if len(rows) >= 5000:
+            flush()
+    flush()
+    for table, ids in term_ids.items():
+        conn.executemany(f"INSERT INTO {table} (id, name) VALUES (?, ?)", [(i, s) for s, i in ids.items()])
+    meta = {"schema": SCHEMA_VERSION, "employees": str(n),
+            "imported_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), **(meta or {})}
+    conn.executemany("INSERT INTO meta (k, v) VALUES (?, ?)", list(meta.items()))
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.commit()
+    return n
+
+def import_employees(employees: Iterable[Dict[str, Any]], db_path: Path = STORE_PATH,
+                     meta: Optional[Dict[str, str]] = None) -> int:
+    """
+    Write `employees` to a fresh database at `db_path` (built in a private temp file
+    next to it and moved into place, so readers never see a partial import and
+    concurrent imports never share a file). Returns the row count.
+    """
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=db_path.name + ".", suffix=".tmp", dir=db_path.parent)
+    os.close(fd)
+    tmp = Path(tmp_name)
+    try:
+        conn = sqlite3.connect(str(tmp))
+        try:
+            n = _write_store(conn, employees, meta)
+        finally:
+            conn.close()
+        os.replace(tmp, db_path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return n
+
+@contextmanager
+def import_lock(db_path: Path = STORE_PATH) -> Iterator[None]:
+    """Exclusive lock (a `.lock` file next to the store) held by one importer at a time."""
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    with db_path.with_name(db_path.name + ".lock").open("a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def iter_json_array(path: Path, key: str, read_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the items of the top-level array `key` in a JSON object file
+    (e.g. {"employees": [...]}) one at a time, reading `read_size` chars at a time.
+    """
+    decoder = json.JSONDecoder()
+    with Path(path).open("r", encoding="utf-8") as f:
+        buf = ""
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buf, eof
+            if eof:
+                return False
+            chunk = f.read(read_size)
+            if not chunk:
+                eof = True
+                return False
+            buf += chunk
+            return True
+
+        # Seek to the opening bracket of the array under `key`
+        marker = json.dumps(key)
+        while True:
+            at = buf.find(marker)
+            if at >= 0:
+                br = buf.find("[", at + len(marker))
+                if br >= 0:
+                    buf = buf[br + 1:]
+                    break
+            if not fill():
+                raise ValueError(f"array {key!r} not found in {path}")
+
+        pos = 0
+        while True:
+            # skip whitespace and separators
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    break
+            if pos >= len(buf):
+                raise ValueError(f"unterminated array {key!r} in {path}")
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+                continue
+            yield item
+            buf = buf[end:]
+            pos = 0
+
+def import_json(json_path: Path = EMPLOYEES_PATH, db_path: Path = STORE_PATH) -> int:
+    """Convert employees.json ({"employees": [...]}) into the store, one record at a time."""
+    json_path = Path(json_path)
+    stat_key = _stat_key(json_path)
+    sha = file_sha256(json_path)
+    return import_employees(iter_json_array(json_path, "employees"), db_path, {
+        "source_path": str(json_path), "source_sha256": sha, "source_stat": stat_key,
+    })
+
+# ---------- Read ----------
+class EmployeeStore:
+    """Read-only view over an imported store; usable from several threads (one shared connection, locked)."""
+
+    def __init__(self, path: Path = STORE_PATH):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"employee store not found at {self.path} (run `python -m app.employee_store`)")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{self.path.as_posix()}?mode=ro", uri=True, check_same_thread=False)
+        self.meta: Dict[str, str] = dict(self._conn.execute("SELECT k, v FROM meta"))
+        if self.meta.get("schema") != SCHEMA_VERSION:
+            self._conn.close()
+            raise RuntimeError(f"{self.path} has schema {self.meta.get('schema')}, expected {SCHEMA_VERSION}; re-import it")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "EmployeeStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    @property
+    def source_sha(self) -> str:
+        """sha256 of the employees.json the store was imported from."""
+        return self.meta.get("source_sha256", "")
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def count(self) -> int:
+        return self._query("SELECT COUNT(*) FROM employees")[0][0]
+
+    def iter_employees(self, batch: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Every record, in employees.json order, decoded `batch` rows at a time."""
+        last = -1
+        while True:
+            rows = self._query("SELECT pos, doc FROM employees WHERE pos > ? ORDER BY pos LIMIT ?", (last, batch))
+            if not rows:
+                return
+            for _, doc in rows:
+                yield json.loads(doc)
+            last = rows[-1][0]
+
+    def filter_employees(self, min_experience_years: Optional[int] = None, availability: Optional[str] = None,
+                         limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Records with experience >= min_experience_years and the given availability bucket,
+        most experienced first (file order on ties), answered in SQL on the
+        (availability, experience_years) / experience_years indexes.
+        """
+        where: List[str] = []
+        params: List[Any] = []
+        if availability is not None:
+            where.append("availability = ?")
+            params.append(availability.lower())
+        if min_experience_years is not None:
+            where.append("experience_years >= ?")
+            params.append(int(min_experience_years))
+        sql = ("SELECT doc FROM employees" + (" WHERE " + " AND ".join(where) if where else "")
+               + " ORDER BY experience_years DESC, pos LIMIT ?")
+        return [json.loads(doc) for (doc,) in self._query(sql, (*params, int(limit)))]
+
+    def skill_names(self) -> List[str]:
+        return [r[0] for r in self._query("SELECT name FROM skills ORDER BY id")]
+
+    def domain_names(self) -> List[str]:
+        return [r[0] for r in self._query("SELECT name FROM domains ORDER BY id")]
+
+def is_stale(db_path: Path = STORE_PATH, json_path: Path = EMPLOYEES_PATH) -> bool:
+    """True if the store is missing or was imported from different employees.json content."""
+    db_path, json_path = Path(db_path), Path(json_path)
+    if not db_path.exists():
+        return True
+    if not json_path.exists():
+        return False  # the store is the only copy
+    try:
+        with EmployeeStore(db_path) as store:
+            meta = store.meta
+    except (RuntimeError, sqlite3.DatabaseError):
+        return True
+    if meta.get("source_stat") == _stat_key(json_path):
+        return False
+    return meta.get("source_sha256") != file_sha256(json_path)  # touched but unchanged -> still current
+
+def open_store(db_path: Path = STORE_PATH, json_path: Path = EMPLOYEES_PATH) -> EmployeeStore:
+    """Open the store, (re)importing employees.json first if it changed and auto_import is on."""
+    if AUTO_IMPORT and Path(json_path).exists() and is_stale(db_path, json_path):
+        with import_lock(db_path):
+            if is_stale(db_path, json_path):  # another worker may have imported while we waited
+                t0 = time.perf_counter()
+                n = import_json(json_path, db_path)
+                logger.info(f"employee store import rows={n} path={db_path} "
+                            f"latency_ms={(time.perf_counter() - t0) * 1000.0:.1f}")
+    return EmployeeStore(db_path)
+
+def main():
+    import argparse
+    ap = argparse.ArgumentParser(description="Import employees.json into the SQLite employee store.")
+    ap.add_argument("--source", type=Path, default=EMPLOYEES_PATH)
+    ap.add_argument("--db", type=Path, default=STORE_PATH)
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    with import_lock(args.db):
+        n = import_json(args.source, args.db)
+    print(f"Imported {n} employees from {args.source} → {args.db} in {time.perf_counter() - t0:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,18 @@
 # app/generation.py
 from __future__ import annotations
-import os, json, uuid, time, logging
-from typing import Any, Dict, List, Optional
+import os, json, time, logging, hashlib, threading
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from dotenv import load_dotenv
-from openai import OpenAI
 
+from app import snapshot
+from app.cache import LRUCache, SqliteCache, TwoTierCache
+from app.clients import get_async_client, get_client, timeout
 from app.config import load_yaml, repo_path
-from app.search.hybrid import hybrid_search
+from app.metrics import FALLBACKS, NO_MATCH, cache_lookup, observe_phase, phase, request_id
+from app.search.hybrid import hybrid_search, hybrid_search_async, query_key
+from app.search.semantic import normalize_text
+from app.singleflight import SingleFlight
 
 # ---------- Env & config ----------
 load_dotenv()  # loads .env
@@ -25,7 +30,7 @@ def _pick_candidates(hybrid_result: Dict[str, Any], k: int) -> List[Dict[str, An
     results = hybrid_result.get("results", [])
     return results[:k]
 
-def _format_top_candidates_json(cands: List[Dict[str, Any]]) -> str:
+def _prompt_candidates(cands: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     # Minimal metadata to keep it grounded—extend if you’d like.
     payload = []
     for r in cands:
@@ -35,10 +40,219 @@ def _format_top_candidates_json(cands: List[Dict[str, Any]]) -> str:
             "hybrid_score": r.get("hybrid_score"),
             "reason": r.get("reason_kw") or r.get("reason_sem") or "",
         })
-    return json.dumps(payload, ensure_ascii=False, indent=2)
+    return payload
+
+def _format_top_candidates_json(cands: List[Dict[str, Any]]) -> str:
+    return json.dumps(_prompt_candidates(cands), ensure_ascii=False, indent=2)
+
+SYSTEM_MSG = (
+    "You are an assistant that recommends employees for internal projects. "
+    "Ground every fact in the provided profiles. Do not invent facts. "
+    "If uncertain or results are weak, ask a clarifying question."
+)
+
+def _build_messages(query: str, cands: List[Dict[str, Any]], k: int, max_words: int) -> List[Dict[str, str]]:
+    top_candidates_json = _format_top_candidates_json(cands)
+    user_msg = (
+        f'Request: "{query}"\n\n'
+        f"Top candidates (JSON):\n{top_candidates_json}\n\n"
+        f"Constraints:\n"
+        f"- Use only the fields present.\n"
+        f"- Prefer availability=available, then soon, then unavailable.\n"
+        f"- Keep total reply under {max_words} words.\n"
+        f"- Suggest exactly {k} candidates when possible.\n\n"
+        "Write the response in this format:\n"
+        "1) One-line summary of the requirement.\n"
+        "2) 2–3 candidate lines (name — why fit — availability).\n"
+        "3) Next steps or a clarifying question if needed."
+    )
+    return [
+        {"role": "system", "content": SYSTEM_MSG},
+        {"role": "user", "content": user_msg},
+    ]
+
+# Bump when SYSTEM_MSG or the _build_messages template changes (part of the response-cache key)
+PROMPT_VERSION = "1"
+
+# ---------- Response cache ----------
+RCACHE_CFG = GEN_CFG.get("response_cache", {}) or {}
+
+class _ResponseCache:
+    """
+    Generated replies keyed by (normalized request, ordered candidate ids, candidate-facts
+    hash, CHAT_MODEL, PROMPT_VERSION). The disk tier is namespaced by model, prompt version
+    and the employees.json content hash of the live data snapshot, and both tiers are
+    dropped when a reload changes that hash.
+    """
+
+    def __init__(self, cfg: Dict[str, Any]):
+        self.cfg = cfg
+        ttl = cfg.get("ttl_seconds")
+        self.ttl = float(ttl) if ttl else None
+        self._lock = threading.Lock()
+        self._data_version = ""
+        self._cache: Optional[TwoTierCache] = None
+
+    def _tiers(self) -> TwoTierCache:
+        """The tiers for the live snapshot's employees.json, rebuilt when it changes."""
+        version = snapshot.current().employees_sha[:16]
+        cache = self._cache
+        if cache is not None and version == self._data_version:
+            return cache
+        with self._lock:
+            if self._cache is not None and version == self._data_version:
+                return self._cache
+            memory = LRUCache(max_entries=int(self.cfg.get("memory_entries", 512)), ttl_seconds=self.ttl)
+            disk = None
+            if self.cfg.get("disk_path"):
+                disk = SqliteCache(
+                    repo_path(self.cfg["disk_path"]),
+                    namespace=f"{CHAT_MODEL}|{PROMPT_VERSION}|{version}",
+                    max_entries=int(self.cfg.get("disk_entries", 10_000)),
+                    ttl_seconds=self.ttl,
+                )
+            self._cache = TwoTierCache(
+                memory, disk,
+                encode=lambda v: v.encode("utf-8"),
+                decode=lambda b: b.decode("utf-8"),
+            )
+            self._data_version = version
+            return self._cache
+
+    def get(self, key: str) -> Optional[str]:
+        return self._tiers().get(key)
+
+    def put(self, key: str, text: str) -> None:
+        self._tiers().put(key, text)
+
+    def clear(self) -> None:
+        self._tiers().clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._tiers().stats(), "data_version": self._data_version}
+
+_response_cache: Optional[_ResponseCache] = (
+    _ResponseCache(RCACHE_CFG) if RCACHE_CFG.get("enabled", True) else None
+)
+
+def _candidate_facts(cands: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Exactly what reaches the prompt: a change to any rendered field changes the key
+    return _prompt_candidates(cands)
+
+def _response_key(query: str, cands: List[Dict[str, Any]], k: int, max_words: int) -> str:
+    facts = json.dumps(_candidate_facts(cands), sort_keys=True, ensure_ascii=False, default=str)
+    parts = {
+        "q": normalize_text(query),
+        "ids": [c.get("id") for c in cands],
+        "facts": hashlib.sha256(facts.encode("utf-8")).hexdigest(),
+        "model": CHAT_MODEL,
+        "prompt": PROMPT_VERSION,
+        "k": k,
+        "max_words": max_words,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+def response_cache_stats() -> Optional[Dict[str, Any]]:
+    return _response_cache.stats() if _response_cache is not None else None
+
+def _cached_response(query: str, cands: List[Dict[str, Any]], k: int, max_words: int,
+                     key: Optional[str], rid: str, t_hybrid_ms: float) -> Optional[Dict[str, Any]]:
+    if _response_cache is None or key is None:
+        return None
+    t1 = time.perf_counter()
+    text = _response_cache.get(key)
+    cache_lookup("response", text is not None)
+    if text is None:
+        return None
+    t_gen_ms = (time.perf_counter() - t1) * 1000.0
+    logger.info(
+        f"req_id={rid} phase=retrieve latency_ms={t_hybrid_ms:.1f} "
+        f"phase=generate latency_ms={t_gen_ms:.1f} cache=hit k={k} used={len(cands)}"
+    )
+    return {
+        "query": query,
+        "used_candidate_ids": [c.get("id") for c in cands],
+        "response_text": text,
+        "notes": {"k": k, "max_words": max_words, "cache_hit": True},
+    }
+
+def _no_match_response(query: str, k: int, rid: str, t_hybrid_ms: float) -> Dict[str, Any]:
+    text = (
+        f"I couldn’t find strong matches for “{query}”. "
+        "Want me to relax constraints (e.g., lower min years or include 'soon' availability)?"
+    )
+    NO_MATCH.inc()
+    logger.info(f"req_id={rid} phase=retrieve latency_ms={t_hybrid_ms:.1f} k={k} used=0 no_matches=1")
+    return {"query": query, "used_candidate_ids": [], "response_text": text, "notes": {"no_matches": True, "k": k}}
+
+def _fallback_text(cands: List[Dict[str, Any]]) -> str:
+    lines = ["Generation failed; showing retrieved candidates:"]
+    for c in cands:
+        name = c.get("name", "")
+        meta = c.get("meta", {}) or {}
+        avail = meta.get("availability", "n/a")
+        why = c.get("reason_kw") or c.get("reason_sem") or ""
+        lines.append(f"- {name} (availability: {avail}) — {why}")
+    return "\n".join(lines)
+
+def _fallback_response(query: str, cands: List[Dict[str, Any]], k: int) -> Dict[str, Any]:
+    FALLBACKS.inc("complete")
+    return {
+        "query": query,
+        "used_candidate_ids": [c.get("id") for c in cands],
+        "response_text": _fallback_text(cands),
+        "notes": {"k": k, "fallback": True},
+    }
+
+def _success_response(query: str, cands: List[Dict[str, Any]], k: int, max_words: int,
+                      resp: Any, rid: str, t_hybrid_ms: float, t_gen_ms: float,
+                      key: Optional[str] = None) -> Dict[str, Any]:
+    text = resp.choices[0].message.content.strip() if resp.choices else "(no response)"
+    observe_phase("generate", t_gen_ms / 1000.0)
+    logger.info(
+        f"req_id={rid} phase=retrieve latency_ms={t_hybrid_ms:.1f} "
+        f"phase=generate latency_ms={t_gen_ms:.1f} cache=miss k={k} used={len(cands)}"
+    )
+    if _response_cache is not None and key is not None and resp.choices:
+        _response_cache.put(key, text)
+    return {
+        "query": query,
+        "used_candidate_ids": [c.get("id") for c in cands],
+        "response_text": text,
+        "notes": {"k": k, "max_words": max_words, "cache_hit": False},
+    }
 
 # ---------- Main ----------
-def generate_response(query: str, top_k: Optional[int] = None, req_id: Optional[str] = None) -> Dict[str, Any]:
+# Identical concurrent requests share one retrieval + LLM call
+_GEN_FLIGHT = SingleFlight("generate_response")
+
+def _coalesced(out: Dict[str, Any], shared: bool, rid: str, query: str) -> Dict[str, Any]:
+    if not shared:
+        return out
+    logger.info(f"req_id={rid} phase=generate coalesced=1")
+    return {**out, "query": query, "notes": {**out.get("notes", {}), "coalesced": True}}
+
+def generate_response(query: str, top_k: Optional[int] = None, req_id: Optional[str] = None,
+                      mmr_lambda: Optional[float] = None) -> Dict[str, Any]:
+    """
+    RAG reply for `query` (see _generate_response); concurrent identical requests are coalesced.
+    `mmr_lambda` diversifies the retrieved candidates (see hybrid_search).
+    """
+    rid = req_id or request_id()
+    k = top_k or int(GEN_CFG.get("k", 3))
+    out, shared = _GEN_FLIGHT.do((query_key(query), k, mmr_lambda), _generate_response, query, k, rid, mmr_lambda)
+    return _coalesced(out, shared, rid, query)
+
+async def generate_response_async(query: str, top_k: Optional[int] = None, req_id: Optional[str] = None,
+                                  mmr_lambda: Optional[float] = None) -> Dict[str, Any]:
+    """Async generate_response."""
+    rid = req_id or request_id()
+    k = top_k or int(GEN_CFG.get("k", 3))
+    out, shared = await _GEN_FLIGHT.do_async((query_key(query), k, mmr_lambda), _generate_response_async,
+                                             query, k, rid, mmr_lambda)
+    return _coalesced(out, shared, rid, query)
+
+def _generate_response(query: str, k: int, rid: str, mmr_lambda: Optional[float] = None) -> Dict[str, Any]:
     """
     RAG generation:
       - hybrid retrieval
@@ -46,96 +260,164 @@ def generate_response(query: str, top_k: Optional[int] = None, req_id: Optional[
       - LLM call with timeout
       - on error/timeout -> graceful fallback using retrieved candidates
     """
-    rid = req_id or str(uuid.uuid4())
-    k = top_k or int(GEN_CFG.get("k", 3))
 
     # 1) Retrieve candidates via hybrid (fetch a few extra, then slice)
     t0 = time.perf_counter()
-    hyb = hybrid_search(query, top_k=max(k, 10))
+    hyb = hybrid_search(query, top_k=max(k, 10), mmr_lambda=mmr_lambda)
     t_hybrid_ms = (time.perf_counter() - t0) * 1000.0
+    observe_phase("retrieve", t_hybrid_ms / 1000.0)
 
     cands = _pick_candidates(hyb, k)
 
     # Edge case: no matches
     if not cands:
-        text = (
-            f"I couldn’t find strong matches for “{query}”. "
-            "Want me to relax constraints (e.g., lower min years or include 'soon' availability)?"
-        )
-        logger.info(f"req_id={rid} phase=retrieve latency_ms={t_hybrid_ms:.1f} k={k} used=0 no_matches=1")
-        return {"query": query, "used_candidate_ids": [], "response_text": text, "notes": {"no_matches": True, "k": k}}
-
-    # 2) Build prompt from template/spec
-    request_summary = _summarize_request(query)
-    top_candidates_json = _format_top_candidates_json(cands)
+        return _no_match_response(query, k, rid, t_hybrid_ms)
 
+    # 2) Cached reply for the same request + candidate set? Otherwise build the prompt
     max_words = int(GEN_CFG.get("max_words", 200))
-    next_steps_default = GEN_CFG.get("phrasing", {}).get(
-        "next_steps_default",
-        "Shall I widen skills or lower min years, or include 'soon' availability?"
-    )
-
-    system_msg = (
-        "You are an assistant that recommends employees for internal projects. "
-        "Ground every fact in the provided profiles. Do not invent facts. "
-        "If uncertain or results are weak, ask a clarifying question."
-    )
-    user_msg = (
-        f'Request: "{query}"\n\n'
-        f"Top candidates (JSON):\n{top_candidates_json}\n\n"
-        f"Constraints:\n"
-        f"- Use only the fields present.\n"
-        f"- Prefer availability=available, then soon, then unavailable.\n"
-        f"- Keep total reply under {max_words} words.\n"
-        f"- Suggest exactly {k} candidates when possible.\n\n"
-        "Write the response in this format:\n"
-        "1) One-line summary of the requirement.\n"
-        "2) 2–3 candidate lines (name — why fit — availability).\n"
-        "3) Next steps or a clarifying question if needed."
-    )
+    key = _response_key(query, cands, k, max_words) if _response_cache is not None else None
+    cached = _cached_response(query, cands, k, max_words, key, rid, t_hybrid_ms)
+    if cached is not None:
+        return cached
+    with phase("prompt"):
+        messages = _build_messages(query, cands, k, max_words)
 
     # 3) Call the model with timeout; on failure -> fallback
-    client = OpenAI()
+    t1 = time.perf_counter()
     try:
-        t1 = time.perf_counter()
+        client = get_client()  # no API key -> fallback, like any other call failure
         resp = client.chat.completions.create(
             model=CHAT_MODEL,
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": user_msg},
-            ],
+            messages=messages,
             temperature=0.2,
-            timeout=20,  # seconds (request-level timeout)
+            timeout=timeout("chat"),  # request-level timeout (config/clients.yaml)
         )
         t_gen_ms = (time.perf_counter() - t1) * 1000.0
+        return _success_response(query, cands, k, max_words, resp, rid, t_hybrid_ms, t_gen_ms, key)
+
+    except Exception as e:
+        observe_phase("generate", time.perf_counter() - t1)
+        # 4) Graceful fallback: list retrieved candidates with short reasons
+        logger.exception(f"req_id={rid} phase=generate error={type(e).__name__}")
+        return _fallback_response(query, cands, k)
+
+async def _generate_response_async(query: str, k: int, rid: str,
+                                   mmr_lambda: Optional[float] = None) -> Dict[str, Any]:
+    """Async twin of _generate_response: retrieval and the LLM call are awaited, not thread-blocking."""
+
+    t0 = time.perf_counter()
+    hyb = await hybrid_search_async(query, top_k=max(k, 10), mmr_lambda=mmr_lambda)
+    t_hybrid_ms = (time.perf_counter() - t0) * 1000.0
+    observe_phase("retrieve", t_hybrid_ms / 1000.0)
+
+    cands = _pick_candidates(hyb, k)
+    if not cands:
+        return _no_match_response(query, k, rid, t_hybrid_ms)
+
+    max_words = int(GEN_CFG.get("max_words", 200))
+    key = _response_key(query, cands, k, max_words) if _response_cache is not None else None
+    cached = _cached_response(query, cands, k, max_words, key, rid, t_hybrid_ms)
+    if cached is not None:
+        return cached
+    with phase("prompt"):
+        messages = _build_messages(query, cands, k, max_words)
 
-        text = resp.choices[0].message.content.strip() if resp.choices else "(no response)"
-        logger.info(
-            f"req_id={rid} phase=retrieve latency_ms={t_hybrid_ms:.1f} "
-            f"phase=generate latency_ms={t_gen_ms:.1f} k={k} used={len(cands)}"
+    t1 = time.perf_counter()
+    try:
+        client = get_async_client()  # no API key -> fallback, like any other call failure
+        resp = await client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=messages,
+            temperature=0.2,
+            timeout=timeout("chat"),  # request-level timeout (config/clients.yaml)
         )
-        return {
-            "query": query,
-            "used_candidate_ids": [c.get("id") for c in cands],
-            "response_text": text,
-            "notes": {"k": k, "max_words": max_words},
-        }
+        t_gen_ms = (time.perf_counter() - t1) * 1000.0
+        return _success_response(query, cands, k, max_words, resp, rid, t_hybrid_ms, t_gen_ms, key)
 
     except Exception as e:
-        # 4) Graceful fallback: list retrieved candidates with short reasons
+        observe_phase("generate", time.perf_counter() - t1)
         logger.exception(f"req_id={rid} phase=generate error={type(e).__name__}")
-        lines = ["Generation failed; showing retrieved candidates:"]
-        for c in cands:
-            name = c.get("name", "")
-            meta = c.get("meta", {}) or {}
-            avail = meta.get("availability", "n/a")
-            why = c.get("reason_kw") or c.get("reason_sem") or ""
-            lines.append(f"- {name} (availability: {avail}) — {why}")
-        fallback_text = "\n".join(lines)
-
-        return {
-            "query": query,
-            "used_candidate_ids": [c.get("id") for c in cands],
-            "response_text": fallback_text,
-            "notes": {"k": k, "fallback": True},
-        }
+        return _fallback_response(query, cands, k)
+
+async def stream_response(query: str, top_k: Optional[int] = None, req_id: Optional[str] = None,
+                          mmr_lambda: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming RAG generation. Yields events:
+      {"event": "candidates", "data": {"used_candidate_ids", "candidates"}}  -- right after retrieval
+      {"event": "token", "data": {"text"}}                                   -- LLM deltas as they arrive
+      {"event": "fallback", "data": {"response_text"}}                        -- stream failed; retrieved list
+      {"event": "done", "data": {"notes"}}
+    """
+    rid = req_id or request_id()
+    k = top_k or int(GEN_CFG.get("k", 3))
+
+    t0 = time.perf_counter()
+    hyb = await hybrid_search_async(query, top_k=max(k, 10), mmr_lambda=mmr_lambda)
+    t_hybrid_ms = (time.perf_counter() - t0) * 1000.0
+    observe_phase("retrieve", t_hybrid_ms / 1000.0)
+
+    cands = _pick_candidates(hyb, k)
+    yield {"event": "candidates", "data": {
+        "used_candidate_ids": [c.get("id") for c in cands],
+        "candidates": [{"id": c.get("id"), "name": c.get("name")} for c in cands],
+    }}
+
+    if not cands:
+        out = _no_match_response(query, k, rid, t_hybrid_ms)
+        yield {"event": "token", "data": {"text": out["response_text"]}}
+        yield {"event": "done", "data": {"notes": out["notes"]}}
+        return
+
+    max_words = int(GEN_CFG.get("max_words", 200))
+    key = _response_key(query, cands, k, max_words) if _response_cache is not None else None
+    cached = _cached_response(query, cands, k, max_words, key, rid, t_hybrid_ms)
+    if cached is not None:
+        yield {"event": "token", "data": {"text": cached["response_text"]}}
+        yield {"event": "done", "data": {"notes": cached["notes"]}}
+        return
+    with phase("prompt"):
+        messages = _build_messages(query, cands, k, max_words)
+
+    t1 = time.perf_counter()
+    t_first_ms: Optional[float] = None
+    n_chunks = 0
+    parts: List[str] = []
+    try:
+        client = get_async_client()
+        stream = await client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=messages,
+            temperature=0.2,
+            timeout=timeout("chat"),  # request-level timeout (config/clients.yaml)
+            stream=True,
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            if t_first_ms is None:
+                t_first_ms = (time.perf_counter() - t1) * 1000.0
+                observe_phase("first_token", t_first_ms / 1000.0)
+            n_chunks += 1
+            parts.append(delta)
+            yield {"event": "token", "data": {"text": delta}}
+    except Exception as e:
+        # Stream failed (before or mid-way): fall back to the retrieved-candidate summary
+        observe_phase("generate", time.perf_counter() - t1)
+        FALLBACKS.inc("stream")
+        logger.exception(f"req_id={rid} phase=generate_stream error={type(e).__name__} chunks={n_chunks}")
+        yield {"event": "fallback", "data": {"response_text": _fallback_text(cands)}}
+        yield {"event": "done", "data": {"notes": {"k": k, "fallback": True}}}
+        return
+
+    t_gen_ms = (time.perf_counter() - t1) * 1000.0
+    observe_phase("generate", t_gen_ms / 1000.0)
+    first = f"{t_first_ms:.1f}" if t_first_ms is not None else "n/a"
+    logger.info(
+        f"req_id={rid} phase=retrieve latency_ms={t_hybrid_ms:.1f} "
+        f"phase=first_token latency_ms={first} "
+        f"phase=generate latency_ms={t_gen_ms:.1f} cache=miss k={k} used={len(cands)} chunks={n_chunks}"
+    )
+    if _response_cache is not None and key is not None and parts:
+        _response_cache.put(key, "".join(parts).strip())
+    yield {"event": "done", "data": {"notes": {"k": k, "max_words": max_words, "streamed": True, "cache_hit": False}}}
@@ -1,15 +1,21 @@
+import time
+_IMPORT_T0 = time.perf_counter()
+
 from fastapi import FastAPI, Query, Body, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, List
-import uuid, time, logging, re  # logging + re for guard
+from typing import Any, Dict, Optional, List
+import asyncio, json, logging, re  # logging + re for guard
 
 from app.search.baseline import baseline_search
-from app.search.semantic import semantic_search
-from app.search.hybrid import hybrid_search
-from app.generation import generate_response
+from app.search.semantic import semantic_search_async
+from app.search.hybrid import hybrid_search_async, hybrid_search_batch
+from app.generation import generate_response_async, stream_response
 
-from functools import lru_cache
-from app.config import repo_path, load_json
+from contextlib import asynccontextmanager
+from app import employee_store, metrics, snapshot, warmup
+from app.clients import aclose_clients
+from app.singleflight import singleflight_stats
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -18,7 +24,24 @@ from fastapi.middleware.cors import CORSMiddleware
 # Logger for API observability
 logger = logging.getLogger("hrbot.api")
 
-app = FastAPI(title="HR Resource Chatbot API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background: /health answers at once, /ready flips once data,
+    # clients and caches are loaded. Requests arriving earlier still work (they wait
+    # for the snapshot build instead of starting a second one).
+    warm = asyncio.create_task(asyncio.to_thread(warmup.run_warmup))
+    # Reload data when employees.json or the index artifacts change on disk
+    watcher = snapshot.start_watcher()
+    try:
+        yield
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        if not warm.done():
+            warm.cancel()
+        await aclose_clients()
+
+app = FastAPI(title="HR Resource Chatbot API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,11 +51,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request id (contextvar) + per-route latency histogram + access log with the phase breakdown
+app.add_middleware(
+    metrics.MetricsMiddleware,
+    access_log=bool(metrics.METRICS_CFG.get("access_log", True)),
+    skip_log=metrics.METRICS_CFG.get("skip_access_log", []) or [],
+)
+
 
 # ===== Contract Models (for nicer OpenAPI + validation) =====
 class ChatRequest(BaseModel):
     query: str = Field(min_length=3, description="User request text")
     top_k: Optional[int] = Field(default=3, ge=1, le=20)
+    mmr_lambda: Optional[float] = Field(
+        default=None, ge=0.0, le=1.0,
+        description="Diversify candidates with MMR (1 = relevance only, lower = more diverse)",
+    )
 
 class CandidateOut(BaseModel):
     id: int
@@ -42,72 +76,86 @@ class CandidateOut(BaseModel):
 class ChatResponse(BaseModel):
     response_text: str
     used_candidate_ids: List[int]
+    notes: Optional[Dict[str, Any]] = None
 
 class EmployeeSearchResponse(BaseModel):
     results: List[CandidateOut]
 
+class BatchSearchRequest(BaseModel):
+    queries: List[str] = Field(min_length=1, max_length=500, description="Role requirements, one per entry")
+    top_k: Optional[int] = Field(default=None, ge=1, le=50)
+    nprobe: Optional[int] = Field(default=None, ge=1, le=4096)
+    ef_search: Optional[int] = Field(default=None, ge=1, le=4096)
+
 # ===== Health & Root =====
 @app.get("/health")
 def health():
+    # Liveness only: the process is up and serving
     return {"status": "ok"}
 
+@app.get("/ready")
+def ready():
+    """Readiness: 200 once startup warmup finished (snapshot, clients, caches), else 503."""
+    report = warmup.STATE.report()
+    if not report["ready"]:
+        status = "failed" if report["error"] else "warming"
+        return JSONResponse(status_code=503, content={"status": status, **report})
+    return {"status": "ready", **report, "snapshot": snapshot.current().info()}
+
+# ===== Metrics =====
+def _semantic_size() -> Optional[int]:
+    sem = snapshot.current().semantic
+    return sem.index.ntotal if sem is not None else None
+
+def _singleflight(field: str):
+    return lambda: {(name,): s[field] for name, s in singleflight_stats().items()}
+
+metrics.Gauge("data_version", "Version of the live data snapshot (increments on reload)",
+              fn=lambda: snapshot.current().version)
+metrics.Gauge("employees", "Employees in the live data snapshot", fn=lambda: len(snapshot.current().keyword.candidates))
+metrics.Gauge("index_vectors", "Vectors in the live FAISS index", fn=_semantic_size)
+metrics.Gauge("ready", "1 once startup warmup finished", fn=lambda: int(warmup.STATE.ready))
+metrics.Counter("singleflight_calls_total", "Calls into a coalescing group", ["group"], fn=_singleflight("calls"))
+metrics.Counter("singleflight_coalesced_total", "Calls that joined an in-flight computation", ["group"],
+                fn=_singleflight("coalesced"))
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["ops"])
+def get_metrics():
+    """Prometheus text exposition of the in-process registry (see docs/observability.md)."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/")
 def root():
     return {"message": "Hello from FastAPI — backend is running!"}
 
 
 # ===== Facets (skills/domains) =====
-def _norm_token(s: str) -> str:
-    s = s.strip().lower()
-    s = re.sub(r"\s+", " ", s)
-    return s
-
-@lru_cache(maxsize=1)
-def _load_facets_cached():
-    # Load data + normalization rules
-    employees = load_json(repo_path("data", "employees.json")).get("employees", [])
-    norm = load_json(repo_path("config", "normalization.json"))
-    skill_aliases = { _norm_token(k): _norm_token(v) for k, v in norm.get("skill_aliases", {}).items() }
-    domain_aliases = { _norm_token(k): _norm_token(v) for k, v in norm.get("domain_aliases", {}).items() }
-
-    skills_set = set()
-    domains_set = set()
-
-    def canon_skill(tok: str) -> str:
-        t = _norm_token(tok)
-        return skill_aliases.get(t, t)
-
-    def canon_domain(tok: str) -> str:
-        t = _norm_token(tok)
-        return domain_aliases.get(t, t)
-
-    for emp in employees:
-        for sk in emp.get("skills", []) or []:
-            skills_set.add(canon_skill(sk))
-        for dm in emp.get("domains", []) or []:
-            domains_set.add(canon_domain(dm))
-
-    skills = sorted([s for s in skills_set if s])
-    domains = sorted([d for d in domains_set if d])
-
-    return {
-        "skills": skills,
-        "domains": domains,
-        "availability": ["available", "soon", "unavailable"],
-        "counts": {
-            "skills": len(skills),
-            "domains": len(domains),
-            "employees": len(employees)
-        }
-    }
-
 @app.get("/metadata/facets", tags=["metadata"])
 def get_facets():
     """
     Returns canonical lists of skills and domains for dropdowns, plus availability buckets.
-    Uses normalization/alias rules from config/normalization.json.
+    Uses normalization/alias rules from config/normalization.json; follows data reloads.
     """
-    return _load_facets_cached()
+    return snapshot.current().facets
+
+
+# ===== Admin =====
+@app.post("/admin/reload", tags=["admin"])
+async def admin_reload():
+    """
+    Rebuild the data snapshot (employees, keyword structures, facets, FAISS index + meta)
+    off the event loop and swap it in atomically. On failure the current snapshot stays live.
+    """
+    try:
+        snap = await asyncio.to_thread(snapshot.reload, "admin")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"reload failed, keeping current data: {type(e).__name__}: {e}")
+    return {"status": "ok", "snapshot": snap.info()}
+
+@app.get("/admin/snapshot", tags=["admin"])
+def admin_snapshot():
+    snap = snapshot.current()
+    return {"snapshot": snap.info(), "changed_sources": snapshot.changed_sources(snap)}
 
 
 # ===== Search Endpoints =====
@@ -123,24 +171,43 @@ def search_keyword(
     return baseline_search(q, top_k=top_k)
 
 @app.get("/search/semantic")
-def search_semantic(
+async def search_semantic(
     q: str = Query(..., description="User query for semantic search"),
     top_k: Optional[int] = Query(None, ge=1, le=50),
+    nprobe: Optional[int] = Query(None, ge=1, le=4096, description="IVF lists to probe (IVFFlat index only)"),
+    ef_search: Optional[int] = Query(None, ge=1, le=4096, description="HNSW search breadth (HNSWFlat index only)"),
 ):
     """Semantic search over FAISS index built in Step 9.2."""
-    return semantic_search(q, top_k=top_k)
+    return await semantic_search_async(q, top_k=top_k, nprobe=nprobe, ef_search=ef_search)
 
 @app.get("/search/hybrid")
-def search_hybrid_endpoint(
+async def search_hybrid_endpoint(
     q: str = Query(..., description="User query for hybrid (semantic + keyword) search"),
     top_k: Optional[int] = Query(None, ge=1, le=50),
+    nprobe: Optional[int] = Query(None, ge=1, le=4096, description="IVF lists to probe (IVFFlat index only)"),
+    ef_search: Optional[int] = Query(None, ge=1, le=4096, description="HNSW search breadth (HNSWFlat index only)"),
+    mmr_lambda: Optional[float] = Query(
+        None, ge=0.0, le=1.0, description="MMR re-ranking: 1 = relevance only, lower = more diverse results"
+    ),
 ):
-    """Hybrid search: combines semantic similarity and keyword score per config/semantic.yaml (hybrid_weights)."""
-    return hybrid_search(q, top_k=top_k)
+    """
+    Hybrid search: combines semantic similarity and keyword score per config/semantic.yaml (hybrid_weights).
+    With mmr_lambda, a wider pool is re-ranked by Maximal Marginal Relevance (docs/semantic_search.md 9.14).
+    """
+    return await hybrid_search_async(q, top_k=top_k, nprobe=nprobe, ef_search=ef_search, mmr_lambda=mmr_lambda)
+
+@app.post("/search/batch")
+def search_batch(body: BatchSearchRequest):
+    """
+    Hybrid search for many queries in one call: one batched embedding request,
+    one matrix FAISS search, keyword scoring per query. Results follow /search/hybrid.
+    """
+    results = hybrid_search_batch(body.queries, top_k=body.top_k, nprobe=body.nprobe, ef_search=body.ef_search)
+    return {"top_k": body.top_k, "count": len(results), "results": results}
 
 # ===== Generation Endpoint (Step 10 implementation) =====
 @app.post("/generate")
-def generate(
+async def generate(
     q: str = Body(..., embed=True, description="User request text, e.g., 'python aws 3+ years ecommerce available'"),
     top_k: Optional[int] = Body(None, embed=True),
 ):
@@ -151,41 +218,79 @@ def generate(
     - Calls CHAT_MODEL from .env
     - Returns concise, grounded recommendation text
     """
-    return generate_response(q, top_k=top_k)
+    return await generate_response_async(q, top_k=top_k)
 
 # ===== Contract Alias: POST /chat =====
-@app.post("/chat", response_model=ChatResponse, tags=["contract"])
-def chat(body: ChatRequest):
-    """
-    Contract alias for generation. POST /chat with:
-    { "query": "python aws 3+ years ecommerce available", "top_k": 3 }
-    """
+def _guard_chat_query(query: str) -> None:
     # ---- Absurd threshold guard for /chat as well ----
-    m = re.search(r"(\d+)\s*\+?\s*(?:years|yrs|yr)", body.query, flags=re.I)
+    m = re.search(r"(\d+)\s*\+?\s*(?:years|yrs|yr)", query, flags=re.I)
     if m:
         yrs = int(m.group(1))
         if yrs > 50:
             raise HTTPException(status_code=400, detail="min_experience is unrealistic (>50)")
 
-    # ---- Request ID + timing + logging ----
-    req_id = str(uuid.uuid4())
+@app.post("/chat", response_model=ChatResponse, tags=["contract"])
+async def chat(body: ChatRequest):
+    """
+    Contract alias for generation. POST /chat with:
+    { "query": "python aws 3+ years ecommerce available", "top_k": 3 }
+    Optional "mmr_lambda" (0..1) diversifies the candidates.
+    """
+    _guard_chat_query(body.query)
+
+    # ---- Request ID (set by MetricsMiddleware) + timing + logging ----
+    req_id = metrics.request_id()
     t0 = time.perf_counter()
     try:
-        out = generate_response(body.query, top_k=body.top_k, req_id=req_id)
+        out = await generate_response_async(body.query, top_k=body.top_k, req_id=req_id,
+                                            mmr_lambda=body.mmr_lambda)
         dt_ms = (time.perf_counter() - t0) * 1000.0
         logger.info(
             f"req_id={req_id} route=/chat latency_ms={dt_ms:.1f} "
-            f"k={body.top_k} used={len(out.get('used_candidate_ids', []))}"
+            f"k={body.top_k} used={len(out.get('used_candidate_ids', []))} "
+            f"cache={'hit' if out.get('notes', {}).get('cache_hit') else 'miss'}"
         )
         return ChatResponse(
             response_text=out["response_text"],
             used_candidate_ids=out["used_candidate_ids"],
+            notes=out.get("notes"),
         )
     except Exception as e:
         dt_ms = (time.perf_counter() - t0) * 1000.0
         logger.exception(f"req_id={req_id} route=/chat error={type(e).__name__} latency_ms={dt_ms:.1f}")
         raise
 
+@app.post("/chat/stream", tags=["contract"])
+async def chat_stream(body: ChatRequest):
+    """
+    Streaming /chat over Server-Sent Events. Events, in order:
+    `candidates` (retrieved ids), `token`* (LLM deltas), optional `fallback`, `done`.
+    """
+    _guard_chat_query(body.query)
+    req_id = metrics.request_id()
+    t0 = time.perf_counter()
+
+    async def sse():
+        ttfb_ms = None
+        try:
+            async for ev in stream_response(body.query, top_k=body.top_k, req_id=req_id,
+                                            mmr_lambda=body.mmr_lambda):
+                if ttfb_ms is None:
+                    ttfb_ms = (time.perf_counter() - t0) * 1000.0
+                yield f"event: {ev['event']}\ndata: {json.dumps(ev['data'], ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logger.exception(f"req_id={req_id} route=/chat/stream error={type(e).__name__}")
+            yield f"event: error\ndata: {json.dumps({'detail': type(e).__name__})}\n\n"
+        dt_ms = (time.perf_counter() - t0) * 1000.0
+        ttfb = f"{ttfb_ms:.1f}" if ttfb_ms is not None else "n/a"
+        logger.info(f"req_id={req_id} route=/chat/stream ttfb_ms={ttfb} latency_ms={dt_ms:.1f} k={body.top_k}")
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Request-ID": req_id},
+    )
+
 # ===== Param-based wrapper over baseline =====
 @app.get("/employees/search", response_model=EmployeeSearchResponse, tags=["contract"])
 def employees_search(
@@ -199,7 +304,10 @@ def employees_search(
     ),
     top_k: Optional[int] = Query(5, ge=1, le=50),
 ):
-    """Build a simple query string from provided params and reuse baseline_search."""
+    """
+    Build a simple query string from provided params and reuse baseline_search. With
+    only experience/availability there is nothing to score: the store answers in SQL.
+    """
     # Absurd threshold validation
     if min_experience is not None and min_experience > 50:
         raise HTTPException(status_code=400, detail="min_experience is unrealistic (>50)")
@@ -210,6 +318,15 @@ def employees_search(
             detail="Provide at least one of: skill, min_experience, domain, availability",
         )
 
+    if not skill and not domain:
+        with employee_store.EmployeeStore() as store:
+            rows = store.filter_employees(min_experience, availability, limit=top_k)
+        return EmployeeSearchResponse(results=[
+            CandidateOut(id=e["id"], name=e["name"],
+                         why=f"experience={e.get('experience_years', 0)}y; availability={e.get('availability', '')}.")
+            for e in rows
+        ])
+
     parts: List[str] = []
     if skill:
         parts.append(skill)
@@ -232,3 +349,7 @@ def employees_search(
             )
         )
     return EmployeeSearchResponse(results=items)
+
+
+# Module import + route setup time, reported as the first startup phase
+warmup.STATE.record("app_import", (time.perf_counter() - _IMPORT_T0) * 1000.0)
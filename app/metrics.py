@@ -0,0 +1,294 @@
+# app/metrics.py
+"""
+In-process metrics registry with Prometheus text exposition (served at GET /metrics).
+
+- `Counter`, `Gauge`, `Histogram`: label values are passed positionally, one lock per
+  metric, fixed buckets -- an observation is a bisect and three additions.
+- `phase(name)` / `observe_phase(name, seconds)`: per-phase latency (keyword scoring,
+  query embedding, FAISS search, hybrid merge, prompt build, LLM generation).
+- The request id lives in a contextvar set by `MetricsMiddleware`, so phases running in
+  worker threads (`asyncio.to_thread`, `run_in_context`) are attributed to their request
+  and summarized in one access-log line.
+"""
+from __future__ import annotations
+import contextvars, logging, re, threading, time, uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.config import load_yaml, repo_path
+
+METRICS_CFG = load_yaml(repo_path("config", "metrics.yaml")) or {}
+PREFIX = METRICS_CFG.get("prefix", "hrbot")
+LATENCY_BUCKETS: Tuple[float, ...] = tuple(sorted(float(b) for b in METRICS_CFG.get(
+    "latency_buckets_s", [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20]
+)))
+
+logger = logging.getLogger("hrbot.api")
+
+LabelValues = Tuple[str, ...]
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if v != int(v) else f"{int(v)}"
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        self.name = f"{PREFIX}_{name}"
+        self.doc = doc
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _check(self, values: LabelValues) -> None:
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        lines += self._samples()
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class _Valued(_Metric):
+    """
+    One number per label set: either updated in place or computed at scrape time by
+    `fn`, which returns a number (no labels) or {label values tuple: number}.
+    """
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = (),
+                 fn: Optional[Callable[[], Any]] = None):
+        super().__init__(name, doc, labels)
+        self._values: Dict[LabelValues, float] = {} if self.label_names else {(): 0.0}
+        self._fn = fn
+
+    def _add(self, labels: LabelValues, amount: float) -> None:
+        with self._lock:
+            cur = self._values.get(labels)
+            if cur is None:
+                self._check(labels)
+                cur = 0.0
+            self._values[labels] = cur + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def _samples(self) -> List[str]:
+        if self._fn is not None:
+            try:
+                out = self._fn()
+            except Exception:
+                logger.exception(f"metrics callback for {self.name} failed")
+                return []
+            if out is None:
+                return []
+            items = sorted(out.items()) if isinstance(out, dict) else [((), out)]
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, k)} {_fmt(v)}" for k, v in items]
+
+class Counter(_Valued):
+    """Monotonic count per label set."""
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._add(labels, amount)
+
+class Gauge(_Valued):
+    """Point-in-time value per label set."""
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = float(value)
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram per label set (cumulative counts are built at scrape time)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[LabelValues, List[float]] = {}  # [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, value)  # first bucket with le >= value
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                self._check(labels)
+                s = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            s[i] += 1
+            s[-1] += value
+
+    def snapshot(self, *labels: str) -> Tuple[int, float]:
+        """(count, sum) for one label set."""
+        with self._lock:
+            s = self._series.get(labels)
+            return (0, 0.0) if s is None else (int(sum(s[:-1])), s[-1])
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = []
+        for k, s in items:
+            acc = 0.0
+            for le, n in zip(self.buckets + (float("inf"),), s[:-1]):
+                acc += n
+                le_label = 'le="' + _fmt(le) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, k, le_label)} {_fmt(acc)}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, k)} {_fmt(s[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, k)} {_fmt(acc)}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for m in metrics:
+            lines += m.render()
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def render() -> str:
+    return REGISTRY.render()
+
+# ---------- Request id + per-request phase timings ----------
+REQUEST_ID: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+_REQUEST_PHASES: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_phases", default=None
+)
+
+def current_request_id() -> Optional[str]:
+    return REQUEST_ID.get()
+
+def request_id() -> str:
+    """The current request's id, or a fresh uuid4 outside a request."""
+    return REQUEST_ID.get() or str(uuid.uuid4())
+
+def run_in_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap `fn` to run in a copy of the caller's context (for executor.submit, which doesn't copy it)."""
+    ctx = contextvars.copy_context()
+    return lambda *a, **kw: ctx.run(fn, *a, **kw)
+
+# ---------- Phases ----------
+PHASE_SECONDS = Histogram("phase_seconds", "Latency of one request phase", ["phase"])
+
+def observe_phase(name: str, seconds: float) -> None:
+    PHASE_SECONDS.observe(seconds, name)
+    phases = _REQUEST_PHASES.get()
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_phase(name, time.perf_counter() - t0)
+
+# ---------- Application counters ----------
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result (hit|miss)", ["cache", "result"])
+FALLBACKS = Counter("generation_fallbacks_total", "Replies served from the retrieved-candidate fallback", ["mode"])
+NO_MATCH = Counter("no_match_total", "Generation requests with no retrieved candidates")
+HTTP_SECONDS = Histogram("http_request_seconds", "HTTP request latency by route and status", ["method", "route", "status"])
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+# ---------- ASGI middleware ----------
+_REQ_ID_OK = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware: sets the request id (incoming X-Request-ID if sane, else uuid4),
+    echoes it as a response header, records http_request_seconds by route template,
+    and logs one line per request with the phase breakdown.
+    """
+
+    def __init__(self, app: Any, access_log: bool = True, skip_log: Sequence[str] = ()):
+        self.app = app
+        self.access_log = access_log
+        self.skip_log = frozenset(skip_log)
+        self._routes: Dict[Any, str] = {}
+
+    def _route(self, scope: Dict[str, Any]) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        label = self._routes.get(endpoint)
+        if label is None:
+            label = next(
+                (r.path for r in getattr(scope.get("app"), "routes", ()) if getattr(r, "endpoint", None) is endpoint),
+                "unmatched",
+            )
+            self._routes[endpoint] = label
+        return label
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        incoming = next((v.decode("latin-1") for k, v in scope.get("headers", ()) if k == b"x-request-id"), None)
+        rid = incoming if incoming and _REQ_ID_OK.match(incoming) else str(uuid.uuid4())
+        rid_token = REQUEST_ID.set(rid)
+        phases: Dict[str, float] = {}
+        phases_token = _REQUEST_PHASES.set(phases)
+        status = 500
+        t0 = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                if not any(k.lower() == b"x-request-id" for k, _ in headers):
+                    headers.append((b"x-request-id", rid.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            dt = time.perf_counter() - t0
+            route = self._route(scope)
+            HTTP_SECONDS.observe(dt, scope["method"], route, str(status))
+            if self.access_log and route not in self.skip_log:
+                breakdown = " ".join(f"{k}_ms={v * 1000.0:.1f}" for k, v in phases.items())
+                logger.info(
+                    f"req_id={rid} method={scope['method']} route={route} status={status} "
+                    f"latency_ms={dt * 1000.0:.1f}" + (f" {breakdown}" if breakdown else "")
+                )
+            _REQUEST_PHASES.reset(phases_token)
+            REQUEST_ID.reset(rid_token)
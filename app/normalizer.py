@@ -0,0 +1,115 @@
+# app/normalizer.py
+"""
+The one text normalizer, compiled once from config/normalization.json and shared by
+keyword search, semantic search, the indexer and the facets endpoint.
+
+`VERSION` hashes the rules (plus ALGORITHM_VERSION); the indexer records it in the
+stats file so a normalizer/index mismatch is caught when the index is loaded.
+"""
+from __future__ import annotations
+import hashlib, json, re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Pattern, Tuple
+
+from app.config import load_json, repo_path
+
+# Bump when the normalization code (not the config) changes behaviour
+ALGORITHM_VERSION = "1"
+QUERY_CACHE_SIZE = 4096
+
+_WS = re.compile(r"\s+")
+
+class Normalizer:
+    """Precompiled rules: punctuation table, alias map, stopword set, experience regexes."""
+
+    def __init__(self, cfg: Dict[str, Any], cache_size: int = QUERY_CACHE_SIZE):
+        self.cfg = cfg
+        self.stopwords: FrozenSet[str] = frozenset(cfg.get("stopwords", []))
+        self.skill_aliases: Dict[str, str] = dict(cfg.get("skill_aliases", {}))
+        self.domain_aliases: Dict[str, str] = dict(cfg.get("domain_aliases", {}))
+        self.availability_aliases: Dict[str, str] = dict(cfg.get("availability_aliases", {}))
+        self.exp_regexes: List[Pattern[str]] = [
+            re.compile(p, flags=re.I) for p in cfg.get("min_experience_patterns", [])
+        ]
+        self._punct_table = str.maketrans({ch: " " for ch in cfg.get("punctuation_chars_to_strip", [])})
+        # token -> canonical token; skill aliases win over domain aliases
+        self._alias: Dict[str, str] = {**self.domain_aliases, **self.skill_aliases}
+        # facet canonicalization (whitespace-collapsed keys), per field
+        self._facet_skill = {self.facet_token(k): self.facet_token(v) for k, v in self.skill_aliases.items()}
+        self._facet_domain = {self.facet_token(k): self.facet_token(v) for k, v in self.domain_aliases.items()}
+        self.version = hashlib.sha256(
+            json.dumps([ALGORITHM_VERSION, cfg], sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:16]
+        self._tokens_cached = lru_cache(maxsize=cache_size)(self._tokens)
+
+    # ---------- Tokens ----------
+    def alias(self, tok: str) -> str:
+        return self._alias.get(tok, tok)
+
+    def words(self, text: str) -> List[str]:
+        """Lowercase, strip punctuation, split on whitespace; no aliases, stopwords kept."""
+        return text.lower().translate(self._punct_table).split()
+
+    def token(self, word: str) -> Optional[str]:
+        """One word from words() as tokens() would emit it (None for a stopword)."""
+        tok = self._alias.get(word, word)
+        return None if tok in self.stopwords else tok
+
+    def _tokens(self, text: str) -> Tuple[str, ...]:
+        alias, stop = self._alias, self.stopwords
+        out = []
+        for tok in text.lower().translate(self._punct_table).split():
+            tok = alias.get(tok, tok)
+            if tok not in stop:
+                out.append(tok)
+        return tuple(out)
+
+    def tokens(self, text: str) -> List[str]:
+        """Lowercase, strip punctuation, split on whitespace, alias-expand, drop stopwords (LRU-cached)."""
+        return list(self._tokens_cached(text))
+
+    def text(self, text: str) -> str:
+        """tokens() joined by single spaces: the form used for embeddings and cache keys."""
+        return " ".join(self._tokens_cached(text))
+
+    def cache_info(self):
+        return self._tokens_cached.cache_info()
+
+    # ---------- Facets ----------
+    @staticmethod
+    def facet_token(s: str) -> str:
+        """Facet label form: trimmed, lowercased, inner whitespace collapsed (punctuation kept)."""
+        return _WS.sub(" ", s.strip().lower())
+
+    def canon_skill(self, s: str) -> str:
+        t = self.facet_token(s)
+        return self._facet_skill.get(t, t)
+
+    def canon_domain(self, s: str) -> str:
+        t = self.facet_token(s)
+        return self._facet_domain.get(t, t)
+
+    # ---------- Query constraints ----------
+    def min_experience(self, q_lower: str) -> Optional[int]:
+        for rgx in self.exp_regexes:
+            m = rgx.search(q_lower)
+            if m:
+                try:
+                    return int(m.group(1))
+                except Exception:
+                    continue
+        return None
+
+def check_version(recorded: Optional[str], what: str) -> None:
+    """Raise if an artifact was built with a different normalizer; artifacts without a version pass."""
+    if recorded and recorded != NORMALIZER.version:
+        raise RuntimeError(
+            f"{what} was built with normalizer {recorded}, but config/normalization.json is now "
+            f"{NORMALIZER.version}; rebuild with `python indexing/build_index.py --full`"
+        )
+
+NORMALIZER = Normalizer(load_json(repo_path("config", "normalization.json")))
+VERSION = NORMALIZER.version
+
+normalize_tokens = NORMALIZER.tokens
+normalize_text = NORMALIZER.text
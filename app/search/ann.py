@@ -0,0 +1,102 @@
+# app/search/ann.py
+"""FAISS index construction and search-time parameters for the configured `index_type`."""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:  # faiss is imported on first use (slow native import)
+    import faiss  # type: ignore
+
+FLAT, IVF, HNSW = "flat", "ivf", "hnsw"
+
+_KIND_ALIASES = {
+    "flat": FLAT, "indexflatip": FLAT,
+    "ivf": IVF, "ivfflat": IVF, "indexivfflat": IVF,
+    "hnsw": HNSW, "hnswflat": HNSW, "indexhnswflat": HNSW,
+}
+
+def index_kind(index_type: str) -> str:
+    """Map a config `index_type` (e.g. IndexFlatIP, IVFFlat, HNSWFlat) to flat/ivf/hnsw."""
+    kind = _KIND_ALIASES.get(str(index_type or "flat").replace("_", "").replace("-", "").lower())
+    if kind is None:
+        raise ValueError(f"Unsupported index_type {index_type!r}; use IndexFlatIP, IVFFlat or HNSWFlat")
+    return kind
+
+def effective_nlist(nlist: int, n: int) -> int:
+    # FAISS wants ~39 training points per list; clamp for small corpora
+    return max(1, min(int(nlist), n // 39 if n >= 39 else 1))
+
+def build_ann_index(kind: str, vectors: np.ndarray, ids: np.ndarray,
+                    params: Dict[str, Any]) -> faiss.Index:
+    """
+    Build an ID-mapped inner-product index of `kind` over L2-normalized `vectors`.
+    params: ivf -> {nlist}; hnsw -> {M, ef_construction}.
+    """
+    import faiss  # type: ignore
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    ids = np.asarray(ids, dtype="int64")
+    n, d = vectors.shape
+
+    if kind == FLAT:
+        base = faiss.IndexFlatIP(d)
+    elif kind == IVF:
+        nlist = effective_nlist(params.get("nlist", 1024), n)
+        quantizer = faiss.IndexFlatIP(d)
+        base = faiss.IndexIVFFlat(quantizer, d, nlist, faiss.METRIC_INNER_PRODUCT)
+        base.train(vectors)
+        base.nprobe = int(params.get("nprobe", 16))
+    elif kind == HNSW:
+        base = faiss.IndexHNSWFlat(d, int(params.get("M", 32)), faiss.METRIC_INNER_PRODUCT)
+        base.hnsw.efConstruction = int(params.get("ef_construction", 200))
+        base.hnsw.efSearch = int(params.get("ef_search", 64))
+    else:
+        raise ValueError(f"unknown index kind {kind!r}")
+
+    index = faiss.IndexIDMap2(base)
+    if n:
+        index.add_with_ids(vectors, ids)
+    return index
+
+def describe(index: faiss.Index) -> str:
+    """e.g. 'IndexIDMap2(IndexIVFFlat)'."""
+    import faiss  # type: ignore
+    if isinstance(index, faiss.IndexIDMap):
+        return f"{type(index).__name__}({type(faiss.downcast_index(index.index)).__name__})"
+    return type(index).__name__
+
+def base_index(index: faiss.Index) -> faiss.Index:
+    import faiss  # type: ignore
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+def id_selector(labels: np.ndarray) -> faiss.IDSelector:
+    """Selector restricting a search to `labels` (external ids of an ID-mapped index)."""
+    import faiss  # type: ignore
+    return faiss.IDSelectorBatch(np.ascontiguousarray(labels, dtype="int64"))
+
+def search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                  defaults: Optional[Dict[str, Any]] = None,
+                  sel: Optional[faiss.IDSelector] = None) -> Optional[faiss.SearchParameters]:
+    """
+    Per-request search parameters for the index's base type.
+    IVF -> nprobe, HNSW -> efSearch; Flat -> None unless `sel` is given.
+    Unset values fall back to `defaults`. The caller must keep `sel` alive for the search.
+    """
+    import faiss  # type: ignore
+    defaults = defaults or {}
+    base = base_index(index)
+    if isinstance(base, faiss.IndexIVF):
+        p = faiss.SearchParametersIVF()
+        p.nprobe = int(nprobe or defaults.get("nprobe") or base.nprobe)
+    elif isinstance(base, faiss.IndexHNSW):
+        p = faiss.SearchParametersHNSW()
+        p.efSearch = int(ef_search or defaults.get("ef_search") or base.hnsw.efSearch)
+    elif sel is not None:
+        p = faiss.SearchParameters()
+    else:
+        return None
+    if sel is not None:
+        p.sel = sel
+    return p
@@ -1,23 +1,22 @@
 from __future__ import annotations
+from array import array
 from dataclasses import dataclass
-from typing import Dict, List, Set, Tuple, Any, Optional
-import re
-from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple, Any, Optional
+import heapq, sys, time
 
-from app.config import load_json, load_yaml, repo_path
+from app import snapshot
+from app.config import load_yaml, repo_path
+from app.metrics import observe_phase
+from app.normalizer import NORMALIZER
+from app.search.filter_index import FilterIndex
+from app.search.matcher import QueryScanner
 
-# ---------- Load configs & data ----------
+# ---------- Load configs ----------
 
-NORMALIZATION = load_json(repo_path("config", "normalization.json"))
 BASELINE_CFG = load_yaml(repo_path("config", "baseline.yaml"))
-EMPLOYEES = load_json(repo_path("data", "employees.json"))["employees"]
 
-STOPWORDS: Set[str] = set(NORMALIZATION.get("stopwords", []))
-PUNCT_TO_STRIP: List[str] = NORMALIZATION.get("punctuation_chars_to_strip", [])
-SKILL_ALIASES: Dict[str, str] = NORMALIZATION.get("skill_aliases", {})
-DOMAIN_ALIASES: Dict[str, str] = NORMALIZATION.get("domain_aliases", {})
-AVAIL_ALIASES: Dict[str, str] = NORMALIZATION.get("availability_aliases", {})
-EXP_PATTERNS: List[str] = NORMALIZATION.get("min_experience_patterns", [])
+STOPWORDS: FrozenSet[str] = NORMALIZER.stopwords
+AVAIL_ALIASES: Dict[str, str] = NORMALIZER.availability_aliases
 
 WEIGHTS = BASELINE_CFG.get("weights", {"skills": 3, "domains": 2, "projects": 1})
 MIN_TOKEN_MATCH = int(BASELINE_CFG.get("min_token_match", 1))
@@ -25,87 +24,179 @@ TOP_K_DEFAULT = int(BASELINE_CFG.get("top_k", 5))
 
 AVAIL_ORDER = {"available": 3, "soon": 2, "unavailable": 1}  # for tie-break
 
-# Precompile experience regexes
-EXP_REGEXES = [re.compile(p, flags=re.I) for p in EXP_PATTERNS]
-
-def _strip_punct(s: str) -> str:
-    if not PUNCT_TO_STRIP:
-        return s
-    tbl = str.maketrans({ch: " " for ch in PUNCT_TO_STRIP})
-    return s.translate(tbl)
-
-def _collapse_spaces(s: str) -> str:
-    return re.sub(r"\s+", " ", s).strip()
-
-def _alias_expand(token: str) -> str:
-    # expand via skill or domain aliases; if multiple maps define it, skill wins
-    if token in SKILL_ALIASES:
-        return SKILL_ALIASES[token]
-    if token in DOMAIN_ALIASES:
-        return DOMAIN_ALIASES[token]
-    return token
-
-def normalize_to_tokens(text: str) -> List[str]:
-    """Lowercase, strip punctuation, collapse spaces, split, alias-expand, remove stopwords."""
-    t = text.lower()
-    t = _strip_punct(t)
-    t = _collapse_spaces(t)
-    tokens = t.split() if t else []
-    expanded = [_alias_expand(tok) for tok in tokens]
-    return [tok for tok in expanded if tok and tok not in STOPWORDS]
-
-def normalize_list_to_token_set(items: List[str]) -> Set[str]:
-    """Normalize a list of phrases into a set of tokens."""
+def phrase_names(employees: Iterable[Dict[str, Any]]) -> List[str]:
+    return [name for e in employees for name in (e.get("skills") or []) + (e.get("domains") or [])]
+
+def build_scanner(employees: Iterable[Dict[str, Any]], names: Optional[Iterable[str]] = None) -> QueryScanner:
+    # Multi-word skill/domain names and alias phrases stay single tokens ("react native");
+    # `names` (e.g. the store's distinct skill/domain names) replaces the scan over employees
+    return QueryScanner(NORMALIZER, phrase_names=phrase_names(employees) if names is None else names)
+
+def _scanner(scanner: Optional[QueryScanner]) -> QueryScanner:
+    return scanner if scanner is not None else snapshot.current().keyword.scanner
+
+def normalize_to_tokens(text: str, scanner: Optional[QueryScanner] = None) -> List[str]:
+    """Lowercase, strip punctuation, split, alias-expand, remove stopwords, fold known phrases."""
+    return _scanner(scanner).tokens(text)
+
+def normalize_list_to_token_set(items: List[str], scanner: Optional[QueryScanner] = None) -> Set[str]:
+    """Normalize a list of phrases into a set of tokens (folded phrases plus their plain tokens)."""
+    scanner = _scanner(scanner)
     toks: Set[str] = set()
     for item in items:
-        for tok in normalize_to_tokens(item):
-            toks.add(tok)
+        toks.update(scanner.field_tokens(item))
     return toks
 
 def extract_min_experience(q_lower: str) -> Optional[int]:
-    for rgx in EXP_REGEXES:
-        m = rgx.search(q_lower)
-        if m:
-            try:
-                return int(m.group(1))
-            except Exception:
-                continue
-    return None
-
-def extract_availability(q_lower: str) -> Optional[str]:
-    # Look for exact words or known alias phrases inside the query
-    for phrase, mapped in AVAIL_ALIASES.items():
-        if phrase in q_lower:
-            return mapped
-    for bucket in ("available", "soon", "unavailable"):
-        if bucket in q_lower:
-            return bucket
-    return None
+    return NORMALIZER.min_experience(q_lower)
+
+def extract_availability(q_lower: str, scanner: Optional[QueryScanner] = None) -> Optional[str]:
+    # Earliest configured alias phrase found anywhere in the query, else the first bucket name
+    return _scanner(scanner).availability(q_lower)
 
 # ---------- Prepare employee candidate bags ----------
 
-@dataclass(frozen=True)
-class CandidateBag:
-    id: int
-    name: str
-    experience_years: int
-    availability: str
-    skills: Set[str]
-    projects: Set[str]
-    domains: Set[str]
+class Vocab:
+    """Token string <-> dense integer id, shared by every candidate of one KeywordData."""
+
+    __slots__ = ("ids", "tokens")
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.tokens: List[str] = []
+
+    def intern(self, tok: str) -> int:
+        tid = self.ids.get(tok)
+        if tid is None:
+            tid = self.ids[tok] = len(self.tokens)
+            self.tokens.append(tok)
+        return tid
+
+    def intern_all(self, toks: Iterable[str]) -> array:
+        """Sorted, de-duplicated uint32 ids for `toks`."""
+        return array("I", sorted({self.intern(t) for t in toks}))
 
-def build_candidate_bag(emp: Dict[str, Any]) -> CandidateBag:
+    def lookup(self, toks: Iterable[str]) -> Set[int]:
+        """Ids of the known tokens in `toks` (unknown tokens cannot match any candidate)."""
+        ids = self.ids
+        return {ids[t] for t in toks if t in ids}
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+class CandidateBag:
+    """
+    One employee as keyword search sees it. Token fields are sorted `array('I')` ids
+    into the shared Vocab (4 bytes per token instead of a set entry + str per
+    employee); treat instances as read-only.
+    """
+
+    __slots__ = ("id", "name", "experience_years", "availability", "skills", "projects", "domains")
+
+    def __init__(self, id: int, name: str, experience_years: int, availability: str,
+                 skills: array, projects: array, domains: array):
+        self.id = id
+        self.name = name
+        self.experience_years = experience_years
+        self.availability = availability
+        self.skills = skills
+        self.projects = projects
+        self.domains = domains
+
+    def __repr__(self) -> str:
+        return f"CandidateBag(id={self.id}, name={self.name!r})"
+
+def _vocab(vocab: Optional[Vocab]) -> Vocab:
+    return vocab if vocab is not None else snapshot.current().keyword.vocab
+
+def build_candidate_bag(emp: Dict[str, Any], scanner: Optional[QueryScanner] = None,
+                        vocab: Optional[Vocab] = None) -> CandidateBag:
+    scanner = _scanner(scanner)
+    vocab = _vocab(vocab)
     return CandidateBag(
         id=int(emp["id"]),
         name=emp.get("name", ""),
         experience_years=int(emp.get("experience_years", 0)),
-        availability=str(emp.get("availability", "")).lower(),
-        skills=normalize_list_to_token_set(emp.get("skills", [])),
-        projects=normalize_list_to_token_set(emp.get("projects", [])),
-        domains=normalize_list_to_token_set(emp.get("domains", [])),
+        availability=sys.intern(str(emp.get("availability", "")).lower()),
+        skills=vocab.intern_all(normalize_list_to_token_set(emp.get("skills", []), scanner)),
+        projects=vocab.intern_all(normalize_list_to_token_set(emp.get("projects", []), scanner)),
+        domains=vocab.intern_all(normalize_list_to_token_set(emp.get("domains", []), scanner)),
+    )
+
+# ---------- Inverted posting-list index ----------
+
+@dataclass
+class PostingIndex:
+    # token -> [(position in CANDIDATES, weighted impact, #fields hit)], ascending by position
+    postings: Dict[str, List[Tuple[int, int, int]]]
+    # token -> largest impact in its posting list (MaxScore upper bound)
+    max_impact: Dict[str, int]
+
+def build_posting_index(cands: List[CandidateBag], vocab: Optional[Vocab] = None) -> PostingIndex:
+    """Build token -> posting list over skills/domains/projects, with per-field weights folded in."""
+    tokens = _vocab(vocab).tokens
+    field_weights = (
+        WEIGHTS.get("skills", 3),
+        WEIGHTS.get("domains", 2),
+        WEIGHTS.get("projects", 1),
+    )
+
+    postings: Dict[str, List[Tuple[int, int, int]]] = {}
+    for pos, c in enumerate(cands):
+        acc: Dict[int, List[int]] = {}  # token id -> [impact, #fields]
+        for weight, ids in zip(field_weights, (c.skills, c.domains, c.projects)):
+            for tid in ids:
+                a = acc.get(tid)
+                if a is None:
+                    acc[tid] = [weight, 1]
+                else:
+                    a[0] += weight
+                    a[1] += 1
+        for tid, (impact, fields) in acc.items():
+            postings.setdefault(tokens[tid], []).append((pos, impact, fields))
+
+    max_impact = {tok: max(p[1] for p in plist) for tok, plist in postings.items()}
+    return PostingIndex(postings=postings, max_impact=max_impact)
+
+# ---------- Keyword data (one per DataSnapshot) ----------
+
+@dataclass(frozen=True)
+class KeywordData:
+    """Everything keyword search reads, built together from one pass over the employees."""
+    scanner: QueryScanner
+    vocab: Vocab
+    candidates: List[CandidateBag]
+    postings: PostingIndex
+    filters: FilterIndex
+
+def build_keyword_data(employees: Iterable[Dict[str, Any]], names: Optional[Iterable[str]] = None) -> KeywordData:
+    """
+    With `names` (every skill/domain name) the employees are consumed once as a stream,
+    so records from the employee store are never all held as dicts.
+    """
+    if names is None:
+        employees = list(employees)
+    scanner = build_scanner(employees, names)
+    vocab = Vocab()
+    cands = [build_candidate_bag(e, scanner, vocab) for e in employees]
+    return KeywordData(
+        scanner=scanner,
+        vocab=vocab,
+        candidates=cands,
+        postings=build_posting_index(cands, vocab),
+        filters=FilterIndex.from_candidates(cands),
     )
 
-CANDIDATES: List[CandidateBag] = [build_candidate_bag(e) for e in EMPLOYEES]
+_SNAPSHOT_ATTRS = {
+    "SCANNER": "scanner", "VOCAB": "vocab", "CANDIDATES": "candidates",
+    "POSTINGS": "postings", "FILTERS": "filters",
+}
+
+def __getattr__(name: str) -> Any:
+    # Module-level views of the current snapshot (read once; they do not follow later swaps)
+    if name in _SNAPSHOT_ATTRS:
+        return getattr(snapshot.current().keyword, _SNAPSHOT_ATTRS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ---------- Core baseline search ----------
 
@@ -123,26 +214,44 @@ class MatchResult:
     experience_years: int
     availability: str
 
-def parse_filters(original_query: str) -> SearchFilters:
+def parse_filters(original_query: str, scanner: Optional[QueryScanner] = None) -> SearchFilters:
     q_lower = original_query.lower()
     min_years = extract_min_experience(q_lower)
-    availability = extract_availability(q_lower)
+    availability = extract_availability(q_lower, scanner)
     return SearchFilters(min_experience_years=min_years, availability=availability)
 
-def apply_filters(cands: List[CandidateBag], flt: SearchFilters) -> List[CandidateBag]:
-    out = []
-    for c in cands:
-        if flt.min_experience_years is not None and c.experience_years < flt.min_experience_years:
-            continue
-        if flt.availability is not None and c.availability != flt.availability:
-            continue
-        out.append(c)
-    return out
-
-def score_candidate(query_tokens: Set[str], c: CandidateBag) -> Tuple[int, Dict[str, List[str]]]:
-    skill_hits = sorted(list(query_tokens.intersection(c.skills)))
-    domain_hits = sorted(list(query_tokens.intersection(c.domains)))
-    project_hits = sorted(list(query_tokens.intersection(c.projects)))
+def parse_query(original_query: str, scanner: Optional[QueryScanner] = None) -> Tuple[SearchFilters, List[str]]:
+    """Filters and phrase tokens from a single scan of the query."""
+    min_years, availability, tokens = _scanner(scanner).scan(original_query)
+    return SearchFilters(min_experience_years=min_years, availability=availability), tokens
+
+def passes_filters(c: CandidateBag, flt: SearchFilters) -> bool:
+    if flt.min_experience_years is not None and c.experience_years < flt.min_experience_years:
+        return False
+    if flt.availability is not None and c.availability != flt.availability:
+        return False
+    return True
+
+def apply_filters(cands: List[CandidateBag], flt: SearchFilters,
+                  data: Optional[KeywordData] = None) -> List[CandidateBag]:
+    if data is not None and cands is data.candidates:
+        rows = data.filters.resolve_rows(flt)
+        return list(cands) if rows is None else [cands[i] for i in rows.tolist()]
+    return [c for c in cands if passes_filters(c, flt)]
+
+def score_candidate(query_tokens: Set[str], c: CandidateBag, vocab: Optional[Vocab] = None,
+                    query_ids: Optional[Set[int]] = None) -> Tuple[int, Dict[str, List[str]]]:
+    """`query_ids` (vocab.lookup(query_tokens)) can be passed in when scoring many candidates."""
+    vocab = _vocab(vocab)
+    if query_ids is None:
+        query_ids = vocab.lookup(query_tokens)
+    tokens = vocab.tokens
+    hits = query_ids.intersection(c.skills)
+    skill_hits = sorted([tokens[t] for t in hits]) if hits else []
+    hits = query_ids.intersection(c.domains)
+    domain_hits = sorted([tokens[t] for t in hits]) if hits else []
+    hits = query_ids.intersection(c.projects)
+    project_hits = sorted([tokens[t] for t in hits]) if hits else []
 
     num_skill = len(skill_hits)
     num_domain = len(domain_hits)
@@ -166,29 +275,92 @@ def score_candidate(query_tokens: Set[str], c: CandidateBag) -> Tuple[int, Dict[
 def availability_rank(avail: str) -> int:
     return AVAIL_ORDER.get(avail, 0)
 
-def baseline_search(query: str, top_k: Optional[int] = None) -> Dict[str, Any]:
-    # Extract filters from the raw query, then normalize into tokens
-    filters = parse_filters(query)
-    query_tokens = set(normalize_to_tokens(query))
-
-    # Filter candidates first
-    survivors = apply_filters(CANDIDATES, filters)
-
-    # Score the survivors
-    results: List[MatchResult] = []
-    for c in survivors:
-        score, matched_terms = score_candidate(query_tokens, c)
-        if score > 0:
-            results.append(MatchResult(
-                id=c.id, name=c.name, score=score, matched_terms=matched_terms,
-                experience_years=c.experience_years, availability=c.availability
-            ))
-
-    # Sort: score desc, experience desc, availability (available>soon>unavailable), id asc
-    results.sort(key=lambda r: (-r.score, -r.experience_years, -availability_rank(r.availability), r.id))
-
+def _tie_break_key(r: MatchResult) -> Tuple[int, int, int, int]:
+    # score desc, experience desc, availability (available>soon>unavailable), id asc
+    return (-r.score, -r.experience_years, -availability_rank(r.availability), r.id)
+
+def _kth_largest(values: List[int], k: int) -> Optional[int]:
+    if len(values) < k:
+        return None
+    return heapq.nlargest(k, values)[-1]
+
+def rank_candidates(query_tokens: Set[str], filters: SearchFilters, k: int,
+                    cands: Optional[List[CandidateBag]] = None,
+                    index: Optional[PostingIndex] = None,
+                    filter_index: Optional[FilterIndex] = None,
+                    vocab: Optional[Vocab] = None) -> List[MatchResult]:
+    """
+    Term-at-a-time scoring over the posting lists of the query tokens only.
+
+    Tokens are visited in decreasing MaxScore order. Once the k-th best partial
+    score among eligible candidates is strictly above the summed upper bounds of
+    the remaining tokens, no unseen candidate can reach the top-k (ties included),
+    so later lists only update candidates that are already accumulated.
+    Unset cands/index/filter_index/vocab come from the current snapshot.
+    """
+    if cands is None or index is None or filter_index is None or vocab is None:
+        data = snapshot.current().keyword
+        cands = data.candidates if cands is None else cands
+        index = data.postings if index is None else index
+        filter_index = data.filters if filter_index is None else filter_index
+        vocab = data.vocab if vocab is None else vocab
+    terms = sorted((t for t in query_tokens if t in index.postings),
+                   key=lambda t: (-index.max_impact[t], t))
+    if not terms:
+        return []
+
+    # Resolve filters to a row mask up front (None = everyone eligible)
+    eligible = filter_index.resolve(filters)
+
+    # remaining[i] = best possible score from terms[i:]
+    remaining = [0] * (len(terms) + 1)
+    for i in range(len(terms) - 1, -1, -1):
+        remaining[i] = remaining[i + 1] + index.max_impact[terms[i]]
+
+    scores: Dict[int, int] = {}
+    hits: Dict[int, int] = {}
+    for i, tok in enumerate(terms):
+        admit_new = True
+        if i > 0:
+            theta = _kth_largest([s for pos, s in scores.items() if hits[pos] >= MIN_TOKEN_MATCH], k)
+            admit_new = theta is None or remaining[i] >= theta
+        for pos, impact, fields in index.postings[tok]:
+            if pos in scores:
+                scores[pos] += impact
+                hits[pos] += fields
+            elif admit_new and (eligible is None or eligible[pos]):
+                scores[pos] = impact
+                hits[pos] = fields
+
+    results: List[Tuple[MatchResult, int]] = []
+    for pos, score in scores.items():
+        if score <= 0 or hits[pos] < MIN_TOKEN_MATCH:
+            continue
+        c = cands[pos]
+        results.append((MatchResult(
+            id=c.id, name=c.name, score=score, matched_terms={},
+            experience_years=c.experience_years, availability=c.availability
+        ), pos))
+
+    top = heapq.nsmallest(k, results, key=lambda rp: _tie_break_key(rp[0]))
+    query_ids = vocab.lookup(query_tokens)
+    for r, pos in top:
+        _, r.matched_terms = score_candidate(query_tokens, cands[pos], vocab, query_ids)
+    return [r for r, _ in top]
+
+def baseline_search(query: str, top_k: Optional[int] = None,
+                    data: Optional[KeywordData] = None) -> Dict[str, Any]:
+    # One snapshot for the whole request, even if a reload swaps it meanwhile
+    data = data or snapshot.current().keyword
+    t0 = time.perf_counter()
+
+    # Extract filters and normalized phrase tokens from the raw query
+    filters, tokens = parse_query(query, data.scanner)
+    query_tokens = set(tokens)
+
+    # Filters resolve to a row mask first; only eligible postings are scored
     k = top_k or TOP_K_DEFAULT
-    top = results[:k]
+    top = rank_candidates(query_tokens, filters, k, data.candidates, data.postings, data.filters, data.vocab)
 
     # Build response with reasons
     resp_results = []
@@ -211,6 +383,7 @@ def baseline_search(query: str, top_k: Optional[int] = None) -> Dict[str, Any]:
             "reason": reason
         })
 
+    observe_phase("keyword", time.perf_counter() - t0)
     return {
         "query": query,
         "filters_applied": {
@@ -220,3 +393,15 @@ def baseline_search(query: str, top_k: Optional[int] = None) -> Dict[str, Any]:
         "top_k": k,
         "results": resp_results
     }
+
+def baseline_search_batch(queries: List[str], top_k: Optional[int] = None,
+                          data: Optional[KeywordData] = None) -> List[Dict[str, Any]]:
+    """Keyword search for many queries; repeated query strings are scored once."""
+    data = data or snapshot.current().keyword
+    memo: Dict[str, Dict[str, Any]] = {}
+    out = []
+    for q in queries:
+        if q not in memo:
+            memo[q] = baseline_search(q, top_k, data)
+        out.append(memo[q])
+    return out
@@ -0,0 +1,74 @@
+# app/search/filter_index.py
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+AVAILABILITY_BUCKETS = ("available", "soon", "unavailable")
+
+class FilterIndex:
+    """
+    Columnar filter layer over a fixed list of rows (candidates or index rows).
+
+    - experience: values sorted once with their row order, so `>= min_years`
+      is one binary search + a slice of row positions.
+    - availability: one boolean mask per bucket.
+
+    `resolve()` turns SearchFilters into a boolean row mask (None = no filter),
+    which both the keyword path and the semantic path use as a prefilter.
+    """
+
+    __slots__ = ("ids", "n", "_exp_sorted", "_exp_order", "_avail_masks")
+
+    def __init__(self, ids: Sequence[int], experience_years: Sequence[int], availability: Sequence[str]):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.n = int(self.ids.shape[0])
+
+        exp = np.asarray(experience_years, dtype=np.int32)
+        order = np.argsort(exp, kind="stable")
+        self._exp_order = order.astype(np.int64)
+        self._exp_sorted = exp[order]
+
+        avail = np.asarray([str(a).lower() for a in availability], dtype=object)
+        self._avail_masks: Dict[str, np.ndarray] = {}
+        for bucket in set(avail.tolist()) | set(AVAILABILITY_BUCKETS):
+            self._avail_masks[bucket] = avail == bucket
+
+    @classmethod
+    def from_candidates(cls, cands: Iterable) -> "FilterIndex":
+        cands = list(cands)
+        return cls(
+            ids=[c.id for c in cands],
+            experience_years=[c.experience_years for c in cands],
+            availability=[c.availability for c in cands],
+        )
+
+    def experience_mask(self, min_years: int) -> np.ndarray:
+        start = int(np.searchsorted(self._exp_sorted, min_years, side="left"))
+        mask = np.zeros(self.n, dtype=bool)
+        mask[self._exp_order[start:]] = True
+        return mask
+
+    def availability_mask(self, bucket: str) -> np.ndarray:
+        m = self._avail_masks.get(bucket)
+        return m if m is not None else np.zeros(self.n, dtype=bool)
+
+    def resolve(self, flt) -> Optional[np.ndarray]:
+        """Return a boolean mask of rows passing `flt`, or None if no filter is set."""
+        mask: Optional[np.ndarray] = None
+        if flt.min_experience_years is not None:
+            mask = self.experience_mask(flt.min_experience_years)
+        if flt.availability is not None:
+            am = self.availability_mask(flt.availability)
+            mask = am.copy() if mask is None else (mask & am)
+        return mask
+
+    def resolve_rows(self, flt) -> Optional[np.ndarray]:
+        """Row positions passing `flt` (ascending), or None if no filter is set."""
+        mask = self.resolve(flt)
+        return None if mask is None else np.flatnonzero(mask)
+
+    def resolve_ids(self, flt) -> Optional[List[int]]:
+        """Ids passing `flt`, or None if no filter is set."""
+        rows = self.resolve_rows(flt)
+        return None if rows is None else self.ids[rows].tolist()
@@ -1,34 +1,47 @@
 # app/search/hybrid.py
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio, time
 import numpy as np
 
-from app.search.baseline import baseline_search
-from app.search.semantic import semantic_search
+from app.search.baseline import baseline_search, baseline_search_batch, parse_query
+from app.search.mmr import mmr_rerank
+from app.search.semantic import (
+    TOP_K_DEFAULT, normalize_text, semantic_scores, semantic_search_batch_vec, semantic_search_vec,
+    semantic_search_vec_async,
+)
+from app import snapshot
 from app.config import repo_path, load_yaml
+from app.metrics import observe_phase, run_in_context
+from app.singleflight import SingleFlight
 
 # Load hybrid weights from semantic.yaml
 SEM_CFG = load_yaml(repo_path("config", "semantic.yaml"))
 W = SEM_CFG.get("hybrid_weights", {"semantic": 0.6, "keyword": 0.4})
+MMR_CFG = SEM_CFG.get("mmr", {}) or {}
+MMR_POOL_MULTIPLIER = int(MMR_CFG.get("pool_multiplier", 4))
+MMR_MAX_POOL = int(MMR_CFG.get("max_pool", 200))
 
-def _normalize_scores(results: List[Dict[str, Any]], field: str) -> None:
-    """Normalize scores in-place to 0..1 for fair combination."""
-    scores = [r[field] for r in results if r.get(field) is not None]
-    if not scores:
-        return
-    min_s, max_s = min(scores), max(scores)
-    rng = max_s - min_s if max_s > min_s else 1.0
-    for r in results:
-        if r.get(field) is not None:
-            r[field + "_norm"] = (r[field] - min_s) / rng
-        else:
-            r[field + "_norm"] = 0.0
+# Semantic leg runs here so its embedding round trip overlaps keyword scoring
+_SEMANTIC_POOL = ThreadPoolExecutor(
+    max_workers=int(SEM_CFG.get("hybrid_workers", 8)), thread_name_prefix="hybrid-sem"
+)
 
-def hybrid_search(query: str, top_k: Optional[int] = None) -> Dict[str, Any]:
-    # Run both searches
-    kw = baseline_search(query, top_k)
-    sem = semantic_search(query, top_k)
+def _normalize_scores(scores: np.ndarray) -> Optional[np.ndarray]:
+    """Min-max normalize to 0..1 for fair combination; NaN (missing) -> 0. None if nothing is scored."""
+    present = ~np.isnan(scores)
+    if not present.any():
+        return None
+    vals = scores[present]
+    min_s, max_s = float(vals.min()), float(vals.max())
+    rng = max_s - min_s if max_s > min_s else 1.0
+    return np.where(present, (scores - min_s) / rng, 0.0)
 
+def _merge(query: str, top_k: Optional[int], kw: Dict[str, Any], sem: Dict[str, Any],
+           qvec: Optional[np.ndarray] = None,
+           snap: Optional[snapshot.DataSnapshot] = None) -> Dict[str, Any]:
+    t0 = time.perf_counter()
     # Index results by id
     merged: Dict[int, Dict[str, Any]] = {}
     for r in kw["results"]:
@@ -47,27 +60,133 @@ def hybrid_search(query: str, top_k: Optional[int] = None) -> Dict[str, Any]:
     # Convert to list
     results = list(merged.values())
 
+    # Exact cosine for every candidate in the union (keyword-only hits included),
+    # one dot product against the stored vectors; falls back to the top-k scores.
+    if qvec is not None and results:
+        exact = semantic_scores(qvec, [r["id"] for r in results], snap)
+        for r, score in zip(results, exact.tolist()):
+            if score == score:  # not NaN
+                r["sem_score"] = score
+
+    nan = float("nan")
+    kw_arr = np.array([r.get("kw_score", nan) for r in results], dtype="float64")
+    sem_arr = np.array([r.get("sem_score", nan) for r in results], dtype="float64")
+
     # Normalize scores
-    _normalize_scores(results, "kw_score")
-    _normalize_scores(results, "sem_score")
+    kw_norm = _normalize_scores(kw_arr)
+    sem_norm = _normalize_scores(sem_arr)
+    zeros = np.zeros(len(results))
 
     # Combine
-    for r in results:
-        r["hybrid_score"] = (
-            W["semantic"] * r.get("sem_score_norm", 0.0) +
-            W["keyword"]  * r.get("kw_score_norm", 0.0)
-        )
+    hybrid = (W["semantic"] * (sem_norm if sem_norm is not None else zeros)
+              + W["keyword"] * (kw_norm if kw_norm is not None else zeros))
+    for i, r in enumerate(results):
+        if kw_norm is not None:
+            r["kw_score_norm"] = float(kw_norm[i])
+        if sem_norm is not None:
+            r["sem_score_norm"] = float(sem_norm[i])
+        r["hybrid_score"] = float(hybrid[i])
 
-    # Sort by hybrid score desc
-    results = sorted(results, key=lambda r: r["hybrid_score"], reverse=True)
+    # Sort by hybrid score desc (stable, like sorted(..., reverse=True))
+    order = np.argsort(-hybrid, kind="stable")
+    results = [results[i] for i in order.tolist()]
 
     # Truncate
     if top_k:
         results = results[:top_k]
 
+    observe_phase("merge", time.perf_counter() - t0)
     return {
         "query": query,
         "top_k": top_k,
         "weights": W,
         "results": results
     }
+
+def _diversify(out: Dict[str, Any], top_k: Optional[int], mmr_lambda: Optional[float],
+               snap: snapshot.DataSnapshot) -> Dict[str, Any]:
+    """MMR over the merged pool (when requested), cut to top_k."""
+    if mmr_lambda is None:
+        return out
+    k = top_k or TOP_K_DEFAULT
+    return {**out, "top_k": top_k, "mmr_lambda": mmr_lambda,
+            "results": mmr_rerank(out["results"], mmr_lambda, k, snap)}
+
+def _pool_k(top_k: Optional[int], mmr_lambda: Optional[float]) -> Optional[int]:
+    """Per-leg retrieval depth: top_k, or a wider (bounded) pool for MMR to choose from."""
+    if mmr_lambda is None:
+        return top_k
+    k = top_k or TOP_K_DEFAULT
+    return max(k, min(k * MMR_POOL_MULTIPLIER, MMR_MAX_POOL))
+
+# Identical concurrent hybrid queries share one retrieval (results are read-only)
+_HYBRID_FLIGHT = SingleFlight("hybrid_search")
+
+def query_key(query: str) -> Tuple[Any, ...]:
+    """
+    Everything retrieval reads from `query`: the embedded text plus the parsed filters
+    and phrase tokens (parsed from the raw query, so "not free" != "not, free").
+    """
+    flt, tokens = parse_query(query)
+    return (normalize_text(query), flt.min_experience_years, flt.availability, tuple(tokens))
+
+def _flight_key(query: str, top_k: Optional[int], nprobe: Optional[int],
+                ef_search: Optional[int], mmr_lambda: Optional[float]) -> Tuple[Any, ...]:
+    return (query_key(query), top_k, nprobe, ef_search, mmr_lambda)
+
+def _own_query(out: Dict[str, Any], shared: bool, query: str) -> Dict[str, Any]:
+    """A coalesced follower echoes its own query text, not the leader's."""
+    return {**out, "query": query} if shared and out.get("query") != query else out
+
+def hybrid_search(query: str, top_k: Optional[int] = None, nprobe: Optional[int] = None,
+                  ef_search: Optional[int] = None, mmr_lambda: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Keyword + semantic retrieval merged by hybrid_weights. With `mmr_lambda` (0..1),
+    both legs fetch a wider pool and the merged pool is re-ranked by MMR
+    (1 = relevance only, lower = more diverse).
+    """
+    out, shared = _HYBRID_FLIGHT.do(_flight_key(query, top_k, nprobe, ef_search, mmr_lambda),
+                                    _hybrid_search, query, top_k, nprobe, ef_search, mmr_lambda)
+    return _own_query(out, shared, query)
+
+async def hybrid_search_async(query: str, top_k: Optional[int] = None, nprobe: Optional[int] = None,
+                              ef_search: Optional[int] = None, mmr_lambda: Optional[float] = None) -> Dict[str, Any]:
+    out, shared = await _HYBRID_FLIGHT.do_async(_flight_key(query, top_k, nprobe, ef_search, mmr_lambda),
+                                                _hybrid_search_async, query, top_k, nprobe, ef_search, mmr_lambda)
+    return _own_query(out, shared, query)
+
+def _hybrid_search(query: str, top_k: Optional[int] = None, nprobe: Optional[int] = None,
+                   ef_search: Optional[int] = None, mmr_lambda: Optional[float] = None) -> Dict[str, Any]:
+    # Both legs read the same data snapshot; start the semantic leg (embedding call) first
+    snap = snapshot.current()
+    pool_k = _pool_k(top_k, mmr_lambda)
+    # run_in_context: the worker thread keeps this request's id/phase timings
+    sem_future = _SEMANTIC_POOL.submit(run_in_context(semantic_search_vec), query, pool_k, nprobe, ef_search, snap)
+    kw = baseline_search(query, pool_k, snap.keyword)
+    sem, qvec = sem_future.result()
+    return _diversify(_merge(query, pool_k, kw, sem, qvec, snap), top_k, mmr_lambda, snap)
+
+async def _hybrid_search_async(query: str, top_k: Optional[int] = None, nprobe: Optional[int] = None,
+                               ef_search: Optional[int] = None, mmr_lambda: Optional[float] = None) -> Dict[str, Any]:
+    # Embedding request is awaited on the loop; CPU-bound keyword scoring goes to a thread
+    snap = snapshot.current()
+    pool_k = _pool_k(top_k, mmr_lambda)
+    sem_task = asyncio.create_task(semantic_search_vec_async(query, pool_k, nprobe, ef_search, snap))
+    try:
+        kw = await asyncio.to_thread(baseline_search, query, pool_k, snap.keyword)
+    except BaseException:
+        sem_task.cancel()
+        raise
+    sem, qvec = await sem_task
+    return _diversify(_merge(query, pool_k, kw, sem, qvec, snap), top_k, mmr_lambda, snap)
+
+def hybrid_search_batch(queries: List[str], top_k: Optional[int] = None,
+                        nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Hybrid search for many queries: one batched embedding call + one matrix FAISS search."""
+    snap = snapshot.current()
+    sem_future = _SEMANTIC_POOL.submit(
+        run_in_context(semantic_search_batch_vec), queries, top_k, nprobe, ef_search, snap
+    )
+    kws = baseline_search_batch(queries, top_k, snap.keyword)
+    sems, qmat = sem_future.result()
+    return [_merge(q, top_k, kw, sem, qmat[i], snap) for i, (q, kw, sem) in enumerate(zip(queries, kws, sems))]
@@ -0,0 +1,197 @@
+# app/search/matcher.py
+"""
+Dictionary matchers built once at startup for query parsing:
+
+- `AhoCorasick`: character automaton over the availability phrases (aliases and
+  bucket names). One pass over the query finds every occurrence, regardless of
+  how many phrases are configured.
+- `PhraseTrie`: word trie that folds known multi-word phrases ("react native",
+  "aws cloud" -> "aws") into single tokens, longest match first. Phrases are keyed
+  by the words as written (before alias expansion), so "node.js" or "next.js"
+  never fold into "node.js javascript"-style hybrids.
+- `QueryScanner`: both of the above plus the experience regexes, applied to the
+  query (filters + phrase tokens) and to candidate fields (phrase tokens plus the
+  plain tokens, so "aws" still finds "AWS S3").
+"""
+from __future__ import annotations
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.normalizer import QUERY_CACHE_SIZE, Normalizer
+
+AVAILABILITY_BUCKETS = ("available", "soon", "unavailable")
+
+class AhoCorasick:
+    """Character-level Aho-Corasick automaton; `find` yields (end index, pattern id) for every occurrence."""
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        for pid, pat in enumerate(self.patterns):
+            node = 0
+            for ch in pat:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[node][ch] = nxt
+                node = nxt
+            if pat:
+                self._out[node] += (pid,)
+        # BFS: failure links + output sets inherited along them
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def step(self, node: int, ch: str) -> int:
+        goto, fail = self._goto, self._fail
+        while node and ch not in goto[node]:
+            node = fail[node]
+        return goto[node].get(ch, 0)
+
+    def outputs(self, node: int) -> Tuple[int, ...]:
+        return self._out[node]
+
+    def find(self, text: str) -> Iterator[Tuple[int, int]]:
+        node = 0
+        for i, ch in enumerate(text):
+            node = self.step(node, ch)
+            for pid in self._out[node]:
+                yield i, pid
+
+class PhraseTrie:
+    """Token-sequence trie mapping multi-word phrases to a single replacement token."""
+
+    _END = ""  # key for the replacement at a terminal node (tokens are never empty)
+
+    def __init__(self, phrases: Dict[Tuple[str, ...], str]):
+        self._root: Dict[str, dict] = {}
+        for words, token in phrases.items():
+            if len(words) < 2:
+                continue
+            node = self._root
+            for w in words:
+                node = node.setdefault(w, {})
+            node[self._END] = token
+        self.size = sum(1 for w in phrases if len(w) >= 2)
+
+    def merge(self, tokens: List[str], single: Optional[Callable[[str], Optional[str]]] = None) -> List[str]:
+        """
+        Replace the longest phrase starting at each position, left to right. Tokens
+        outside a phrase go through `single` (dropped when it returns None).
+        """
+        if not self._root and single is None:
+            return tokens
+        out: List[str] = []
+        i, n = 0, len(tokens)
+        while i < n:
+            node = self._root.get(tokens[i])
+            best: Optional[Tuple[int, str]] = None
+            j = i + 1
+            while node is not None:
+                if self._END in node:
+                    best = (j, node[self._END])
+                if j >= n:
+                    break
+                node = node.get(tokens[j])
+                j += 1
+            if best is None:
+                tok = tokens[i] if single is None else single(tokens[i])
+                if tok is not None:
+                    out.append(tok)
+                i += 1
+            else:
+                out.append(best[1])
+                i = best[0]
+        return out
+
+class QueryScanner:
+    """
+    Query parsing in one pass over the lowercased text (availability phrases + a digit
+    check that gates the experience regexes), plus phrase-aware tokenization.
+    """
+
+    def __init__(self, normalizer: Normalizer, phrase_names: Iterable[str] = (),
+                 cache_size: int = QUERY_CACHE_SIZE):
+        self.normalizer = normalizer
+        self._tokens_cached = lru_cache(maxsize=cache_size)(self._tokens)
+        # Availability: aliases in config order first, then bucket names (first-listed wins)
+        avail = list(normalizer.availability_aliases.items())
+        avail += [(b, b) for b in AVAILABILITY_BUCKETS]
+        self._avail_targets = [mapped for _, mapped in avail]
+        self._avail = AhoCorasick([phrase for phrase, _ in avail])
+
+        # Keys are raw words (normalizer.words): alias expansion would turn "node.js"
+        # into ("node.js", "javascript") and fold it into a token nothing else uses.
+        phrases: Dict[Tuple[str, ...], str] = {}
+        for name in phrase_names:  # multi-word skill/domain names keep their own form
+            if len(name.split()) > 1:
+                words = tuple(normalizer.words(name))
+                phrases.setdefault(words, " ".join(words))
+        alias_maps = (normalizer.skill_aliases, normalizer.domain_aliases)
+        for aliases in alias_maps:  # canonical multi-word targets ("machine learning")
+            for target in aliases.values():
+                if len(target.split()) > 1:
+                    words = tuple(normalizer.words(target))
+                    phrases.setdefault(words, " ".join(words))
+        for aliases in reversed(alias_maps):  # multi-word alias keys; skill aliases win
+            for key, target in aliases.items():
+                if len(key.split()) > 1:
+                    phrases[tuple(normalizer.words(key))] = normalizer.text(target)
+        self.phrases = PhraseTrie(phrases)
+
+    def availability(self, q_lower: str) -> Optional[str]:
+        best = None
+        for _, pid in self._avail.find(q_lower):
+            if best is None or pid < best:
+                best = pid
+                if best == 0:
+                    break
+        return self._avail_targets[best] if best is not None else None
+
+    def _tokens(self, text: str) -> Tuple[str, ...]:
+        norm = self.normalizer
+        return tuple(self.phrases.merge(norm.words(text), norm.token))
+
+    def tokens(self, text: str) -> List[str]:
+        """Normalizer tokens with known multi-word phrases folded into single tokens (LRU-cached)."""
+        return list(self._tokens_cached(text))
+
+    def field_tokens(self, text: str) -> List[str]:
+        """
+        Candidate-side tokens: tokens() plus the plain normalizer tokens, so a folded
+        field ("aws s3") still matches a query for one of its words ("aws").
+        """
+        folded = self.tokens(text)
+        plain = [t for t in self.normalizer.tokens(text) if t not in folded]
+        return folded + plain
+
+    def scan(self, query: str) -> Tuple[Optional[int], Optional[str], List[str]]:
+        """(min_experience_years, availability, phrase tokens) for a raw query."""
+        q_lower = query.lower()
+        best = None
+        saw_digit = False
+        node = 0
+        for ch in q_lower:
+            if not saw_digit and ch.isdigit():
+                saw_digit = True
+            node = self._avail.step(node, ch)
+            for pid in self._avail.outputs(node):
+                if best is None or pid < best:
+                    best = pid
+        availability = self._avail_targets[best] if best is not None else None
+        # every experience pattern captures an integer, so no digit -> no match
+        min_years = self.normalizer.min_experience(q_lower) if saw_digit else None
+        return min_years, availability, self.tokens(query)
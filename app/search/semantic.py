@@ -1,115 +1,368 @@
 # app/search/semantic.py
 from __future__ import annotations
-import os, json, re
-from typing import Any, Dict, List, Optional
+import os, json
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 import numpy as np
-import faiss  # type: ignore
 from dotenv import load_dotenv
-from openai import OpenAI
 
 # ✅ use the shared helpers from app/config.py
+from app import snapshot
 from app.config import repo_path, load_json, load_yaml
+from app.cache import LRUCache, SqliteCache, TwoTierCache
+from app.embeddings import EMBED_MODEL, EmbeddingProvider, provider_for_index, remote_provider
+from app.metrics import cache_lookup, phase
+from app.normalizer import check_version, normalize_text
+from app.singleflight import SingleFlight
+from app.search.ann import id_selector, index_kind, search_params
+from app.search.baseline import SearchFilters, parse_filters
+from app.search.filter_index import FilterIndex
+
+if TYPE_CHECKING:  # faiss is imported when the index is loaded (slow native import)
+    import faiss  # type: ignore
 
 # ---------- Load env & configs ----------
 load_dotenv()  # reads local .env (not committed)
 SEM_CFG = load_yaml(repo_path("config", "semantic.yaml"))
-NORM = load_json(repo_path("config", "normalization.json"))
 
-EMBED_MODEL = os.getenv("EMBEDDING_MODEL", SEM_CFG.get("model", "text-embedding-3-large"))
 TOP_K_DEFAULT = int(SEM_CFG.get("top_k", 5))
+INDEX_KIND = index_kind(SEM_CFG.get("index_type", "IndexFlatIP"))
+INDEX_PARAMS = (SEM_CFG.get("index_params", {}) or {}).get(INDEX_KIND, {}) or {}
 
 OUTS = SEM_CFG.get("outputs", {})
 INDEX_PATH = repo_path(OUTS.get("faiss", "data/employee_index.faiss"))
 META_PATH  = repo_path(OUTS.get("meta",  "data/employee_meta.json"))
+VECTORS_PATH = repo_path(OUTS.get("vectors", "data/employee_vectors.npy"))
+STATS_PATH = repo_path(OUTS.get("stats", "data/employee_index.stats.json"))
 
-# ---------- Normalization (mirror indexer behavior) ----------
-STOPWORDS = set(NORM.get("stopwords", []))
-PUNCT = NORM.get("punctuation_chars_to_strip", [])
-SKILL_ALIASES = NORM.get("skill_aliases", {})
-DOMAIN_ALIASES = NORM.get("domain_aliases", {})
-
-def _strip_punct(s: str) -> str:
-    if not PUNCT:
-        return s
-    tbl = str.maketrans({ch: " " for ch in PUNCT})
-    return s.translate(tbl)
-
-def _collapse_spaces(s: str) -> str:
-    return re.sub(r"\s+", " ", s).strip()
-
-def _alias_expand(tok: str) -> str:
-    if tok in SKILL_ALIASES:  return SKILL_ALIASES[tok]
-    if tok in DOMAIN_ALIASES: return DOMAIN_ALIASES[tok]
-    return tok
-
-def normalize_text(s: str) -> str:
-    s = s.lower()
-    s = _strip_punct(s)
-    s = _collapse_spaces(s)
-    toks = [ _alias_expand(t) for t in (s.split() if s else []) ]
-    toks = [ t for t in toks if t and t not in STOPWORDS ]
-    return " ".join(toks)
-
-# ---------- Load FAISS + meta once ----------
-_index: Optional[faiss.Index] = None
-_meta: Optional[List[Dict[str, Any]]] = None
-_dim: Optional[int] = None
-_client: Optional[OpenAI] = None
-
-def _ensure_loaded():
-    global _index, _meta, _dim, _client
-    if _index is None:
-        if not INDEX_PATH.exists():
-            raise FileNotFoundError(f"FAISS index not found at {INDEX_PATH}")
-        _index = faiss.read_index(str(INDEX_PATH))
-        _dim = _index.d
-    if _meta is None:
-        if not META_PATH.exists():
-            raise FileNotFoundError(f"Meta file not found at {META_PATH}")
-        _meta = load_json(META_PATH)
-    if _client is None:
-        _client = OpenAI()
-
-def _embed_query(text: str) -> np.ndarray:
-    """Embed and L2-normalize a single query string."""
-    assert _client is not None
-    resp = _client.embeddings.create(model=EMBED_MODEL, input=[text])
-    v = np.array(resp.data[0].embedding, dtype="float32")
-    faiss.normalize_L2(v.reshape(1, -1))
-    return v
+# ---------- Query-embedding cache ----------
+# Keyed by (EMBED_MODEL, normalized query). Memory LRU in front of a SQLite store;
+# the store is namespaced by model, so switching models clears it on startup.
+# Only the remote provider goes through it: a local embedding is cheaper than a lookup.
+QCACHE_CFG = SEM_CFG.get("query_cache", {}) or {}
+# QUERY_CACHE_PATH overrides disk_path; empty keeps the cache in memory (stub/load-test runs)
+QCACHE_DISK = os.getenv("QUERY_CACHE_PATH", QCACHE_CFG.get("disk_path") or "")
+
+def _build_query_cache() -> Optional[TwoTierCache]:
+    if not QCACHE_CFG.get("enabled", True):
+        return None
+    ttl = QCACHE_CFG.get("ttl_seconds")
+    ttl = float(ttl) if ttl else None
+    memory = LRUCache(max_entries=int(QCACHE_CFG.get("memory_entries", 2048)), ttl_seconds=ttl)
+    disk = None
+    if QCACHE_DISK:
+        disk = SqliteCache(
+            repo_path(QCACHE_DISK),
+            namespace=EMBED_MODEL,
+            max_entries=int(QCACHE_CFG.get("disk_entries", 100_000)),
+            ttl_seconds=ttl,
+        )
+    return TwoTierCache(
+        memory, disk,
+        encode=lambda v: v.astype("float32").tobytes(),
+        decode=lambda b: np.frombuffer(b, dtype="float32").copy(),
+    )
+
+_query_cache: Optional[TwoTierCache] = _build_query_cache()
+
+def _cache_key(q_norm: str) -> str:
+    return f"{EMBED_MODEL}\x1f{q_norm}"
+
+def query_cache_stats() -> Dict[str, Any]:
+    if _query_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "model": EMBED_MODEL, **_query_cache.stats()}
+
+# ---------- FAISS + meta (one per DataSnapshot) ----------
+@dataclass(frozen=True)
+class SemanticData:
+    index: faiss.Index
+    meta: List[Dict[str, Any]]
+    meta_by_label: Dict[int, Dict[str, Any]]
+    filter_index: FilterIndex            # columns over index labels, for filter-aware search
+    vectors: Optional[np.ndarray]        # [N, d], row i == meta row i
+    row_by_employee: Dict[int, int]
+    embedder: EmbeddingProvider          # the provider the index was built with
+
+    @property
+    def dim(self) -> int:
+        return self.index.d
+
+def _load_vectors(index: faiss.Index, meta: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+    """Row-aligned vectors: the indexer's .npy if present, else reconstructed from the index."""
+    import faiss  # type: ignore
+    if VECTORS_PATH.exists():
+        vecs = np.load(VECTORS_PATH, mmap_mode="r")
+        if vecs.shape == (len(meta), index.d):
+            return vecs
+    try:
+        if isinstance(index, faiss.IndexIDMap):
+            base = faiss.downcast_index(index.index)
+            if isinstance(base, faiss.IndexIVF):
+                base.make_direct_map()
+            xb = base.reconstruct_n(0, index.ntotal)
+            pos = {int(i): p for p, i in enumerate(faiss.vector_to_array(index.id_map).tolist())}
+            return xb[[pos[int(m["employee_id"])] for m in meta]]
+        return index.reconstruct_n(0, index.ntotal)  # legacy flat: labels are row ids
+    except RuntimeError:
+        return None  # index type without reconstruction; exact rescoring disabled
+
+def load_semantic_data() -> SemanticData:
+    """Read index, meta and vectors from disk and build the lookup structures."""
+    import faiss  # type: ignore
+    if not INDEX_PATH.exists():
+        raise FileNotFoundError(f"FAISS index not found at {INDEX_PATH}")
+    if not META_PATH.exists():
+        raise FileNotFoundError(f"Meta file not found at {META_PATH}")
+    stats = load_json(STATS_PATH) if STATS_PATH.exists() else {}
+    if stats:
+        check_version(stats.get("normalizer_version"), str(INDEX_PATH))
+    # Stats written before providers existed record only the OpenAI model name
+    embedder = provider_for_index(stats.get("embedding") or {"provider": "openai", "model": stats.get("model")},
+                                  str(INDEX_PATH))
+    index = faiss.read_index(str(INDEX_PATH))
+    meta = load_json(META_PATH)
+    if len(meta) != index.ntotal:  # e.g. caught between the indexer's index and meta writes
+        raise RuntimeError(f"{INDEX_PATH} has {index.ntotal} vectors but {META_PATH} has {len(meta)} rows")
+    return build_semantic_data(index, meta, _load_vectors(index, meta), embedder)
+
+def build_semantic_data(index: faiss.Index, meta: List[Dict[str, Any]], vectors: Optional[np.ndarray],
+                        embedder: Optional[EmbeddingProvider] = None) -> SemanticData:
+    """Lookup structures over an index + row-aligned meta (and vectors, if any)."""
+    import faiss  # type: ignore
+    embedder = embedder or remote_provider()
+    if embedder.dim is not None and embedder.dim != index.d:
+        raise RuntimeError(f"embedder {embedder.model} produces {embedder.dim}-d vectors, index has {index.d}")
+    # ID-mapped indexes label vectors by employee_id; legacy flat indexes by row_id
+    if isinstance(index, faiss.IndexIDMap):
+        meta_by_label = {int(m["employee_id"]): m for m in meta}
+    else:
+        meta_by_label = {int(m["row_id"]): m for m in meta}
+    labels = list(meta_by_label)
+    return SemanticData(
+        index=index,
+        meta=meta,
+        meta_by_label=meta_by_label,
+        filter_index=FilterIndex(
+            ids=labels,
+            experience_years=[int(meta_by_label[l]["top_fields"].get("experience_years", 0)) for l in labels],
+            availability=[meta_by_label[l]["top_fields"].get("availability", "") for l in labels],
+        ),
+        vectors=vectors,
+        row_by_employee={int(m["employee_id"]): row for row, m in enumerate(meta)},
+        embedder=embedder,
+    )
+
+def _data(snap: Optional[snapshot.DataSnapshot]) -> Tuple[SemanticData, snapshot.DataSnapshot]:
+    snap = snap or snapshot.current()
+    if snap.semantic is None:
+        err = snap.semantic_error
+        raise type(err)(*err.args) if err is not None else FileNotFoundError(f"FAISS index not found at {INDEX_PATH}")
+    return snap.semantic, snap
 
-def semantic_search(query: str, top_k: Optional[int] = None) -> Dict[str, Any]:
+def semantic_scores(vec: np.ndarray, employee_ids: List[int],
+                    snap: Optional[snapshot.DataSnapshot] = None) -> np.ndarray:
     """
-    Normalize query -> embed -> FAISS search -> hydrate meta.
-    Returns: { query, top_k, results: [{id,name,sem_score,meta}] }
+    Exact cosine scores of `vec` against the stored vectors of `employee_ids`,
+    in one vectorized dot product (no index search). NaN for unknown ids.
     """
-    _ensure_loaded()
-    assert _index is not None and _meta is not None
+    data, _ = _data(snap)
+    out = np.full(len(employee_ids), np.nan, dtype="float32")
+    if data.vectors is None or not employee_ids:
+        return out
+    rows = np.array([data.row_by_employee.get(int(i), -1) for i in employee_ids], dtype="int64")
+    known = rows >= 0
+    if known.any():
+        out[known] = np.asarray(data.vectors[rows[known]], dtype="float32") @ vec.astype("float32")
+    return out
 
-    q_norm = normalize_text(query)
-    vec = _embed_query(q_norm)
+def _cached_embedding(text: str) -> Optional[np.ndarray]:
+    if _query_cache is None:
+        return None
+    vec = _query_cache.get(_cache_key(text))
+    cache_lookup("query_embedding", vec is not None)
+    return vec
 
-    k = top_k or TOP_K_DEFAULT
-    D, I = _index.search(vec.reshape(1, -1), k)  # inner-product scores
-    scores = D[0].tolist()
-    idxs = I[0].tolist()
+def _store_embedding(text: str, v: np.ndarray) -> np.ndarray:
+    if _query_cache is not None:
+        _query_cache.put(_cache_key(text), v)
+    return v
+
+def warm_query_cache(queries: List[str]) -> int:
+    """Pull persisted embeddings for `queries` into the memory tier (no API calls); returns hits."""
+    return sum(_cached_embedding(normalize_text(q)) is not None for q in queries)
+
+# Concurrent misses for the same query text share one embeddings call
+_EMBED_FLIGHT = SingleFlight("embed_query")
+
+def _fetch_embedding(embedder: EmbeddingProvider, text: str) -> np.ndarray:
+    return _store_embedding(text, embedder.embed([text])[0])
+
+async def _fetch_embedding_async(embedder: EmbeddingProvider, text: str) -> np.ndarray:
+    return _store_embedding(text, (await embedder.aembed([text]))[0])
+
+def _embed_query(embedder: EmbeddingProvider, text: str) -> np.ndarray:
+    """Embed and L2-normalize a single (already normalized) query string; cache hits skip the API."""
+    with phase("embed"):
+        if not embedder.remote:
+            return embedder.embed([text])[0]
+        cached = _cached_embedding(text)
+        if cached is not None:
+            return cached
+        vec, _ = _EMBED_FLIGHT.do(text, _fetch_embedding, embedder, text)
+        return vec
+
+async def _embed_query_async(embedder: EmbeddingProvider, text: str) -> np.ndarray:
+    """Async twin of _embed_query: awaits the API instead of holding a worker thread."""
+    with phase("embed"):
+        if not embedder.remote:
+            return embedder.embed([text])[0]
+        cached = _cached_embedding(text)
+        if cached is not None:
+            return cached
+        vec, _ = await _EMBED_FLIGHT.do_async(text, _fetch_embedding_async, embedder, text)
+        return vec
 
+def _hydrate(data: SemanticData, scores: List[float], idxs: List[int]) -> List[Dict[str, Any]]:
     results = []
-    for row_id, score in zip(idxs, scores):
-        if row_id < 0:  # FAISS returns -1 if fewer than k items
+    for label, score in zip(idxs, scores):
+        if label < 0:  # FAISS returns -1 if fewer than k items
             continue
-        m = _meta[row_id]
+        m = data.meta_by_label[label]
         results.append({
             "id": m["employee_id"],
             "name": m.get("name", ""),
             "sem_score": float(score),
             "meta": m["top_fields"]
         })
+    return results
 
+def _eligible_labels(data: SemanticData, flt: Optional[SearchFilters]) -> Optional[np.ndarray]:
+    """Index labels passing `flt`, or None when no filter applies."""
+    if flt is None:
+        return None
+    rows = data.filter_index.resolve_rows(flt)
+    return None if rows is None else data.filter_index.ids[rows]
+
+def _search(data: SemanticData, mat: np.ndarray, k: int, nprobe: Optional[int], ef_search: Optional[int],
+            flt: Optional[SearchFilters]) -> Tuple[np.ndarray, np.ndarray]:
+    """index.search restricted to filter-eligible labels via an IDSelector (no over-fetch/post-filter)."""
+    labels = _eligible_labels(data, flt)
+    if labels is not None and labels.size == 0:
+        n = mat.shape[0]
+        return np.full((n, k), -np.inf, dtype="float32"), np.full((n, k), -1, dtype="int64")
+    sel = id_selector(labels) if labels is not None else None
+    params = search_params(data.index, nprobe=nprobe, ef_search=ef_search, defaults=INDEX_PARAMS, sel=sel)
+    with phase("faiss"):
+        return data.index.search(mat, k, params=params)  # `sel` stays referenced until the search returns
+
+def _filters_applied(flt: SearchFilters) -> Dict[str, Any]:
+    return {"min_experience_years": flt.min_experience_years, "availability": flt.availability}
+
+def _search_vector(snap: snapshot.DataSnapshot, query: str, q_norm: str, vec: np.ndarray,
+                   top_k: Optional[int], nprobe: Optional[int] = None,
+                   ef_search: Optional[int] = None) -> Dict[str, Any]:
+    """Filter-aware FAISS search for an embedded query + meta hydration."""
+    data, snap = _data(snap)
+    k = top_k or TOP_K_DEFAULT
+    flt = parse_filters(query, snap.keyword.scanner)
+    D, I = _search(data, vec.reshape(1, -1), k, nprobe, ef_search, flt)  # inner-product scores
     return {
         "query": query,
         "normalized_query": q_norm,
+        "filters_applied": _filters_applied(flt),
         "top_k": k,
-        "results": results
+        "results": _hydrate(data, D[0].tolist(), I[0].tolist())
     }
+
+# ---------- Batched path ----------
+MAX_EMBED_INPUTS = 2048  # embeddings API limit on inputs per request
+
+def _embed_queries(embedder: EmbeddingProvider, texts: List[str]) -> np.ndarray:
+    """Embed many normalized queries: cache hits first, all misses in one API call per 2048 inputs."""
+    if not embedder.remote:
+        return embedder.embed(texts)
+    vecs: Dict[str, np.ndarray] = {}
+    misses: List[str] = []
+    for t in dict.fromkeys(texts):
+        cached = _cached_embedding(t)
+        if cached is not None:
+            vecs[t] = cached
+        else:
+            misses.append(t)
+    for start in range(0, len(misses), MAX_EMBED_INPUTS):
+        chunk = misses[start:start + MAX_EMBED_INPUTS]
+        for t, v in zip(chunk, embedder.embed(chunk)):
+            vecs[t] = _store_embedding(t, v)
+    return np.vstack([vecs[t] for t in texts]).astype("float32")
+
+def semantic_search_batch_vec(queries: List[str], top_k: Optional[int] = None, nprobe: Optional[int] = None,
+                              ef_search: Optional[int] = None,
+                              snap: Optional[snapshot.DataSnapshot] = None
+                              ) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """
+    Normalize all queries, embed them together, and run one matrix FAISS search
+    per distinct filter combination (usually one).
+    """
+    data, snap = _data(snap)
+    if not queries:
+        return [], np.zeros((0, data.dim), dtype="float32")
+    q_norms = [normalize_text(q) for q in queries]
+    with phase("embed"):
+        mat = _embed_queries(data.embedder, q_norms)
+    filters = [parse_filters(q, snap.keyword.scanner) for q in queries]
+
+    k = top_k or TOP_K_DEFAULT
+    groups: Dict[Tuple[Optional[int], Optional[str]], List[int]] = {}
+    for row, flt in enumerate(filters):
+        groups.setdefault((flt.min_experience_years, flt.availability), []).append(row)
+
+    out: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+    for rows in groups.values():
+        D, I = _search(data, mat[rows], k, nprobe, ef_search, filters[rows[0]])
+        for j, row in enumerate(rows):
+            out[row] = {
+                "query": queries[row],
+                "normalized_query": q_norms[row],
+                "filters_applied": _filters_applied(filters[row]),
+                "top_k": k,
+                "results": _hydrate(data, D[j].tolist(), I[j].tolist()),
+            }
+    return out, mat  # type: ignore[return-value]
+
+def semantic_search_batch(queries: List[str], top_k: Optional[int] = None,
+                          nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
+    return semantic_search_batch_vec(queries, top_k, nprobe, ef_search)[0]
+
+def semantic_search_vec(query: str, top_k: Optional[int] = None, nprobe: Optional[int] = None,
+                        ef_search: Optional[int] = None,
+                        snap: Optional[snapshot.DataSnapshot] = None) -> Tuple[Dict[str, Any], np.ndarray]:
+    """semantic_search plus the query vector (for exact rescoring in hybrid)."""
+    data, snap = _data(snap)
+    q_norm = normalize_text(query)
+    vec = _embed_query(data.embedder, q_norm)
+    return _search_vector(snap, query, q_norm, vec, top_k, nprobe, ef_search), vec
+
+async def semantic_search_vec_async(query: str, top_k: Optional[int] = None, nprobe: Optional[int] = None,
+                                    ef_search: Optional[int] = None,
+                                    snap: Optional[snapshot.DataSnapshot] = None
+                                    ) -> Tuple[Dict[str, Any], np.ndarray]:
+    data, snap = _data(snap)
+    q_norm = normalize_text(query)
+    vec = await _embed_query_async(data.embedder, q_norm)
+    return _search_vector(snap, query, q_norm, vec, top_k, nprobe, ef_search), vec
+
+def semantic_search(query: str, top_k: Optional[int] = None,
+                    nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Normalize query -> embed -> FAISS search -> hydrate meta.
+    nprobe / ef_search override the IVF / HNSW search defaults for this call.
+    Returns: { query, top_k, results: [{id,name,sem_score,meta}] }
+    """
+    return semantic_search_vec(query, top_k, nprobe, ef_search)[0]
+
+async def semantic_search_async(query: str, top_k: Optional[int] = None,
+                                nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> Dict[str, Any]:
+    """Same as semantic_search, with the embedding call awaited on the event loop."""
+    return (await semantic_search_vec_async(query, top_k, nprobe, ef_search))[0]
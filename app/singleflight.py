@@ -0,0 +1,110 @@
+# app/singleflight.py
+"""
+Request coalescing: concurrent calls with the same key share one in-flight
+computation. The first caller (leader) runs it; callers arriving while it is
+running wait for and receive the same result (or exception). Nothing is kept
+once the call finishes -- this is not a cache.
+
+Results are shared objects: callers must treat them as read-only.
+"""
+from __future__ import annotations
+import asyncio, threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """One coalescing group (e.g. per function). Sync and async callers are tracked separately."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        _GROUPS[name] = self
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, bool]:
+        """
+        Run fn(*args, **kwargs) once per concurrent `key` (threads).
+        Returns (value, shared); shared is True for callers that joined another's call.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.value, False
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Awaitable[Any]],
+                       *args: Any, **kwargs: Any) -> Tuple[Any, bool]:
+        """Await fn(*args, **kwargs) once per concurrent `key` on this event loop; returns (value, shared)."""
+        loop_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            self.calls += 1
+            task = self._tasks.get(loop_key)
+            shared = task is not None
+            if shared:
+                self.coalesced += 1
+            else:
+                task = asyncio.ensure_future(fn(*args, **kwargs))
+                self._tasks[loop_key] = task
+                self.executions += 1
+                task.add_done_callback(lambda t: self._finish_async(loop_key, t))
+        # shield: a cancelled waiter must not cancel the computation the others wait on
+        return await asyncio.shield(task), shared
+
+    def _finish_async(self, loop_key: Tuple[int, Hashable], task: asyncio.Future) -> None:
+        with self._lock:
+            if self._tasks.get(loop_key) is task:
+                del self._tasks[loop_key]
+            if not task.cancelled() and task.exception() is not None:
+                self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "inflight": len(self._calls) + len(self._tasks),
+            }
+
+_GROUPS: Dict[str, SingleFlight] = {}
+
+def singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    """Counters for every coalescing group, by name."""
+    return {name: g.stats() for name, g in _GROUPS.items()}
@@ -0,0 +1,226 @@
+# app/snapshot.py
+"""
+Versioned, immutable snapshot of everything search reads: keyword
+candidates/postings/filters and facets (streamed from the employee store),
+and the FAISS index + meta.
+
+Requests take `current()` once and use that object throughout, so a reload
+(admin endpoint or file watcher) builds the next snapshot off to the side and
+swaps a single reference -- nobody ever sees a half-loaded state.
+"""
+from __future__ import annotations
+import logging, threading, time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from app import employee_store
+from app.config import load_yaml, repo_path
+from app.employee_store import EMPLOYEES_PATH, STORE_PATH
+from app.normalizer import NORMALIZER
+
+if TYPE_CHECKING:  # built lazily; those modules import this one
+    from app.search.baseline import KeywordData
+    from app.search.semantic import SemanticData
+
+DATA_CFG = load_yaml(repo_path("config", "data.yaml")) or {}
+WATCH_CFG = DATA_CFG.get("watch", {}) or {}
+
+logger = logging.getLogger("hrbot.data")
+
+@dataclass(frozen=True)
+class DataSnapshot:
+    version: int                              # increments on every successful swap
+    employees_sha: str                        # content hash of the employees.json the store holds
+    loaded_at: float
+    build_ms: float
+    sources: Dict[str, Tuple[int, int]]       # path -> (mtime_ns, size) when read
+    keyword: "KeywordData"
+    semantic: Optional["SemanticData"]        # None when the index can't be loaded
+    semantic_error: Optional[BaseException]
+    facets: Dict[str, Any]
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "employees_sha": self.employees_sha[:16],
+            "employees": len(self.keyword.candidates),
+            "semantic": self.semantic is not None,
+            "semantic_error": repr(self.semantic_error) if self.semantic_error else None,
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.loaded_at)),
+            "build_ms": round(self.build_ms, 1),
+        }
+
+def build_facets(employees: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Canonical skill/domain lists for dropdowns, plus availability buckets."""
+    return facets_from_names(
+        (s for e in employees for s in e.get("skills") or []),
+        (d for e in employees for d in e.get("domains") or []),
+        len(employees),
+    )
+
+def facets_from_names(skill_names: Iterable[str], domain_names: Iterable[str], n_employees: int) -> Dict[str, Any]:
+    """build_facets over raw skill/domain names (the store's distinct names, or every occurrence)."""
+    skills = sorted({s for s in map(NORMALIZER.canon_skill, skill_names) if s})
+    domains = sorted({d for d in map(NORMALIZER.canon_domain, domain_names) if d})
+    return {
+        "skills": skills,
+        "domains": domains,
+        "availability": ["available", "soon", "unavailable"],
+        "counts": {
+            "skills": len(skills),
+            "domains": len(domains),
+            "employees": n_employees
+        }
+    }
+
+def _source_paths() -> List[Path]:
+    from app.embeddings import LOCAL_PATH, PROVIDER
+    from app.search import semantic
+    paths = [EMPLOYEES_PATH, STORE_PATH, semantic.INDEX_PATH, semantic.META_PATH, semantic.VECTORS_PATH, semantic.STATS_PATH]
+    return paths + [LOCAL_PATH] if PROVIDER == "local" else paths
+
+def _stat_sources() -> Dict[str, Tuple[int, int]]:
+    out = {}
+    for p in _source_paths():
+        try:
+            st = p.stat()
+            out[str(p)] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            out[str(p)] = (0, -1)
+    return out
+
+def build_snapshot(version: int, require_semantic: bool = False) -> DataSnapshot:
+    """
+    Read every source and build a complete snapshot. A semantic load failure is
+    recorded on the snapshot (keyword search keeps working) unless
+    `require_semantic`, in which case it is raised.
+    """
+    from app.search.baseline import build_keyword_data
+    from app.search.semantic import load_semantic_data
+
+    t0 = time.perf_counter()
+    with employee_store.open_store() as store:  # re-imports employees.json first if it changed
+        sources = _stat_sources()  # after the import, so the store write doesn't trigger another reload
+        skills, domains = store.skill_names(), store.domain_names()
+        keyword = build_keyword_data(store.iter_employees(), names=skills + domains)
+        employees_sha = store.source_sha
+    semantic, semantic_error = None, None
+    try:
+        semantic = load_semantic_data()
+    except Exception as e:
+        if require_semantic:
+            raise
+        semantic_error = e
+    return DataSnapshot(
+        version=version,
+        employees_sha=employees_sha,
+        loaded_at=time.time(),
+        build_ms=(time.perf_counter() - t0) * 1000.0,
+        sources=sources,
+        keyword=keyword,
+        semantic=semantic,
+        semantic_error=semantic_error,
+        facets=facets_from_names(skills, domains, len(keyword.candidates)),
+    )
+
+_current: Optional[DataSnapshot] = None
+_swap_lock = threading.Lock()    # guards the first build and every swap
+_reload_lock = threading.Lock()  # one reload at a time
+
+def current() -> DataSnapshot:
+    """The live snapshot (built on first use)."""
+    snap = _current
+    if snap is None:
+        with _swap_lock:
+            if _current is None:
+                _swap(build_snapshot(1))
+            snap = _current
+    return snap  # type: ignore[return-value]
+
+def _swap(snap: DataSnapshot) -> None:
+    global _current
+    _current = snap
+
+def install(snap: DataSnapshot) -> None:
+    """Make a snapshot built elsewhere live (benchmarks, tools); the service itself goes through reload()."""
+    with _swap_lock:
+        _swap(snap)
+
+def reload(reason: str = "manual") -> DataSnapshot:
+    """
+    Build a new snapshot and swap it in. If the build fails the current snapshot
+    stays live and the error propagates. A previously working semantic index is
+    never replaced by a broken one.
+    """
+    with _reload_lock:
+        old = current()
+        try:
+            snap = build_snapshot(old.version + 1, require_semantic=old.semantic is not None)
+        except Exception as e:
+            logger.exception(f"snapshot reload failed reason={reason} error={type(e).__name__} keeping={old.version}")
+            raise
+        with _swap_lock:
+            _swap(snap)
+        logger.info(
+            f"snapshot reload reason={reason} version={snap.version} employees={len(snap.keyword.candidates)} "
+            f"semantic={snap.semantic is not None} build_ms={snap.build_ms:.1f}"
+        )
+        return snap
+
+def changed_sources(snap: Optional[DataSnapshot] = None) -> List[str]:
+    snap = snap or current()
+    now = _stat_sources()
+    return [p for p, st in now.items() if snap.sources.get(p) != st]
+
+class SnapshotWatcher:
+    """
+    Polls the source files and reloads when they change. A change has to be stable
+    for one poll interval first, so a multi-file index write is picked up whole.
+    """
+
+    def __init__(self, interval_s: float = 2.0):
+        self.interval_s = max(0.1, float(interval_s))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="snapshot-watch", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_s + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        pending: Optional[Dict[str, Tuple[int, int]]] = None
+        failed: Optional[Dict[str, Tuple[int, int]]] = None
+        while not self._stop.wait(self.interval_s):
+            try:
+                if not changed_sources():
+                    pending = None
+                    continue
+                now = _stat_sources()
+                if now == failed:
+                    continue  # same files that already failed to load; wait for the next write
+                if now != pending:
+                    pending = now  # wait one more interval for writes to settle
+                    continue
+                pending = None
+                try:
+                    reload("watch")
+                except Exception:
+                    failed = now  # logged by reload
+            except Exception:
+                logger.exception("snapshot watcher error")
+
+def start_watcher() -> Optional[SnapshotWatcher]:
+    """Start the file watcher if enabled in config/data.yaml."""
+    if not WATCH_CFG.get("enabled", True):
+        return None
+    watcher = SnapshotWatcher(float(WATCH_CFG.get("poll_interval_s", 2.0)))
+    watcher.start()
+    return watcher
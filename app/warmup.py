@@ -0,0 +1,106 @@
+# app/warmup.py
+"""
+Explicit startup warmup, run from the FastAPI lifespan: heavy imports, the data
+snapshot (candidates + FAISS index), provider clients and caches are prepared
+before /ready reports ready. Each phase is timed and logged.
+"""
+from __future__ import annotations
+import logging, threading, time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import load_yaml, repo_path
+
+STARTUP_CFG = load_yaml(repo_path("config", "startup.yaml")) or {}
+WARMUP_CFG = STARTUP_CFG.get("warmup", {}) or {}
+
+logger = logging.getLogger("hrbot.startup")
+
+class StartupState:
+    """Per-phase timings and the readiness flag reported by /ready."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.ready = False
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, phase: str, ms: float) -> None:
+        with self._lock:
+            self.phases[phase] = round(ms, 1)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "error": self.error,
+                "phases_ms": dict(self.phases),
+                "total_ms": round(sum(self.phases.values()), 1),
+            }
+
+STATE = StartupState()
+
+def _phase(name: str, fn: Callable[[], Any]) -> Any:
+    t0 = time.perf_counter()
+    out = fn()
+    ms = (time.perf_counter() - t0) * 1000.0
+    STATE.record(name, ms)
+    logger.info(f"startup phase={name} latency_ms={ms:.1f}")
+    return out
+
+def _heavy_imports() -> None:
+    import faiss  # noqa: F401  # type: ignore
+    import openai  # noqa: F401
+    import httpx  # noqa: F401
+
+def _load_snapshot() -> None:
+    from app import snapshot
+    snap = snapshot.current()
+    if snap.semantic is None:
+        logger.warning(f"startup semantic index unavailable: {snap.semantic_error!r}")
+        if WARMUP_CFG.get("require_semantic", False):
+            raise RuntimeError(f"semantic index unavailable: {snap.semantic_error!r}")
+
+def _open_clients() -> None:
+    """Fatal only when query embeddings need the client; chat generation falls back without it."""
+    from app.clients import get_client
+    from app.embeddings import PROVIDER
+    try:
+        get_client()
+    except Exception as e:
+        if PROVIDER == "openai":
+            raise
+        logger.warning(f"startup OpenAI client unavailable ({type(e).__name__}: {e}); "
+                       f"embedding.provider={PROVIDER} does not need it, chat generation will use the fallback")
+
+def _prime_caches(queries: List[str]) -> None:
+    from app import snapshot
+    from app.search.baseline import baseline_search
+    from app.search.semantic import warm_query_cache
+    snap = snapshot.current()
+    for q in queries:
+        baseline_search(q, data=snap.keyword)
+    hits = warm_query_cache(queries)
+    logger.info(f"startup warm queries={len(queries)} embedding_cache_hits={hits}")
+
+def run_warmup() -> StartupState:
+    """Run every warmup phase in order; sets STATE.ready (or STATE.error) at the end."""
+    if not WARMUP_CFG.get("enabled", True):
+        STATE.ready = True
+        return STATE
+    try:
+        _phase("imports", _heavy_imports)
+        _phase("snapshot", _load_snapshot)
+        if WARMUP_CFG.get("open_clients", True):
+            _phase("clients", _open_clients)
+        _phase("caches", lambda: _prime_caches(list(WARMUP_CFG.get("queries", []) or [])))
+        STATE.ready = True
+    except Exception as e:
+        STATE.error = f"{type(e).__name__}: {e}"
+        logger.exception("startup warmup failed")
+    report = STATE.report()
+    logger.info(
+        "startup " + " ".join(f"phase={k} latency_ms={v}" for k, v in report["phases_ms"].items())
+        + f" total_ms={report['total_ms']} ready={STATE.ready}"
+    )
+    return STATE
@@ -0,0 +1,84 @@
+# benchmarks/bench_ann.py
+"""
+Recall@k vs. exact (Flat) search and single-query latency for Flat / IVF / HNSW.
+
+    python benchmarks/bench_ann.py [--sizes 10000 100000] [--dim 256] [--k 10]
+
+Vectors are synthetic, clustered and L2-normalized (like the profile embeddings),
+so the numbers are for choosing an index type and parameters, not absolute targets.
+"""
+from __future__ import annotations
+import argparse
+import time
+
+import numpy as np
+
+import synthetic  # noqa: F401  (puts the repo root on sys.path)
+from app.search.ann import FLAT, HNSW, IVF, build_ann_index, effective_nlist, search_params
+
+def clustered_vectors(n: int, dim: int, seed: int, n_clusters: int = 64) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype("float32")
+    x = centers[rng.integers(0, n_clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype("float32")
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    return x
+
+def run(index, queries: np.ndarray, k: int, params):
+    lat = []
+    labels = np.empty((len(queries), k), dtype="int64")
+    for i, q in enumerate(queries):
+        t0 = time.perf_counter()
+        _, I = index.search(q.reshape(1, -1), k, params=params)
+        lat.append((time.perf_counter() - t0) * 1000.0)
+        labels[i] = I[0]
+    return labels, np.array(lat)
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f.tolist()) & set(t.tolist())) for f, t in zip(found, truth))
+    return hits / truth.size
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--nlist", type=int, default=1024)
+    ap.add_argument("--nprobe", type=int, nargs="+", default=[1, 8, 32])
+    ap.add_argument("--M", type=int, default=32)
+    ap.add_argument("--ef-construction", type=int, default=200)
+    ap.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 128])
+    args = ap.parse_args()
+
+    print(f"{'n':>8} {'index':<8} {'param':<14} {'build_s':>8} {'recall@k':>9} {'p50_ms':>8} {'p99_ms':>8}")
+    for n in args.sizes:
+        xb = clustered_vectors(n, args.dim, seed=n)
+        xq = clustered_vectors(args.queries, args.dim, seed=n + 1)
+        ids = np.arange(1, n + 1, dtype="int64")
+
+        t0 = time.perf_counter()
+        flat = build_ann_index(FLAT, xb, ids, {})
+        flat_build = time.perf_counter() - t0
+        truth, lat = run(flat, xq, args.k, None)
+        print(f"{n:>8} {'flat':<8} {'-':<14} {flat_build:>8.2f} {1.0:>9.3f} "
+              f"{np.percentile(lat, 50):>8.3f} {np.percentile(lat, 99):>8.3f}")
+
+        t0 = time.perf_counter()
+        ivf = build_ann_index(IVF, xb, ids, {"nlist": args.nlist})
+        ivf_build = time.perf_counter() - t0
+        nlist = effective_nlist(args.nlist, n)
+        for nprobe in args.nprobe:
+            found, lat = run(ivf, xq, args.k, search_params(ivf, nprobe=nprobe))
+            print(f"{n:>8} {'ivf':<8} {f'nl={nlist},np={nprobe}':<14} {ivf_build:>8.2f} "
+                  f"{recall(found, truth):>9.3f} {np.percentile(lat, 50):>8.3f} {np.percentile(lat, 99):>8.3f}")
+
+        t0 = time.perf_counter()
+        hnsw = build_ann_index(HNSW, xb, ids, {"M": args.M, "ef_construction": args.ef_construction})
+        hnsw_build = time.perf_counter() - t0
+        for ef in args.ef_search:
+            found, lat = run(hnsw, xq, args.k, search_params(hnsw, ef_search=ef))
+            print(f"{n:>8} {'hnsw':<8} {f'M={args.M},ef={ef}':<14} {hnsw_build:>8.2f} "
+                  f"{recall(found, truth):>9.3f} {np.percentile(lat, 50):>8.3f} {np.percentile(lat, 99):>8.3f}")
+
+if __name__ == "__main__":
+    main()
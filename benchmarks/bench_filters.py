@@ -0,0 +1,74 @@
+# benchmarks/bench_filters.py
+"""
+Columnar filter resolution vs. the per-candidate Python scan.
+
+    python benchmarks/bench_filters.py [--sizes 10000 100000 1000000]
+"""
+from __future__ import annotations
+import argparse
+import random
+import time
+
+import numpy as np
+
+from synthetic import AVAILABILITY  # also puts the repo root on sys.path
+from app.search.baseline import SearchFilters
+from app.search.filter_index import FilterIndex
+
+class _Row:
+    __slots__ = ("id", "experience_years", "availability")
+
+    def __init__(self, id, experience_years, availability):
+        self.id, self.experience_years, self.availability = id, experience_years, availability
+
+def _python_scan(rows, flt: SearchFilters):
+    out = []
+    for c in rows:
+        if flt.min_experience_years is not None and c.experience_years < flt.min_experience_years:
+            continue
+        if flt.availability is not None and c.availability != flt.availability:
+            continue
+        out.append(c.id)
+    return out
+
+def _time_ms(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - t0) * 1000.0)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    filters = [
+        SearchFilters(min_experience_years=5, availability=None),
+        SearchFilters(min_experience_years=None, availability="available"),
+        SearchFilters(min_experience_years=8, availability="soon"),
+    ]
+    print(f"{'n':>9} {'filter':<28} {'build_ms':>9} {'columnar_ms':>12} {'scan_ms':>9} {'matches':>9}")
+    for n in args.sizes:
+        rng = random.Random(n)
+        exp = [rng.randint(0, 15) for _ in range(n)]
+        avail = [rng.choice(AVAILABILITY) for _ in range(n)]
+        ids = list(range(1, n + 1))
+        rows = [_Row(i, e, a) for i, e, a in zip(ids, exp, avail)]
+
+        t0 = time.perf_counter()
+        fi = FilterIndex(ids, exp, avail)
+        build_ms = (time.perf_counter() - t0) * 1000.0
+
+        for flt in filters:
+            label = f"exp>={flt.min_experience_years},avail={flt.availability}"
+            col_ms = _time_ms(lambda: fi.resolve(flt), args.repeat)
+            scan_ms = _time_ms(lambda: _python_scan(rows, flt), max(1, args.repeat // 2))
+            matches = int(np.count_nonzero(fi.resolve(flt)))
+            assert matches == len(_python_scan(rows, flt))
+            print(f"{n:>9} {label:<28} {build_ms:>9.1f} {col_ms:>12.3f} {scan_ms:>9.1f} {matches:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/bench_normalizer.py
+"""
+Tokens/sec of the compiled normalizer vs. the per-call implementation it replaced
+(translation table and whitespace regex rebuilt on every call).
+
+    python benchmarks/bench_normalizer.py [--n 200000] [--distinct 5000]
+"""
+from __future__ import annotations
+import argparse
+import random
+import re
+import time
+
+from synthetic import _vocab  # also puts the repo root on sys.path
+from app.normalizer import Normalizer, NORMALIZER
+
+def _legacy_tokens(text: str, cfg) -> list:
+    # The pre-normalizer implementation, kept here only as the baseline
+    punct = cfg.get("punctuation_chars_to_strip", [])
+    skill, domain = cfg.get("skill_aliases", {}), cfg.get("domain_aliases", {})
+    stop = set(cfg.get("stopwords", []))
+    t = text.lower()
+    if punct:
+        t = t.translate(str.maketrans({ch: " " for ch in punct}))
+    t = re.sub(r"\s+", " ", t).strip()
+    out = []
+    for tok in t.split() if t else []:
+        tok = skill.get(tok, domain.get(tok, tok))
+        if tok and tok not in stop:
+            out.append(tok)
+    return out
+
+def _queries(n: int, distinct: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    vocab = [w for words in _vocab().values() for w in words]
+    vocab += ["JS", "ML", "e-comm", "please", "need", "with", "Node.", "AWS,", "3+ years"]
+    pool = [" ".join(rng.choice(vocab) for _ in range(rng.randint(3, 10))) for _ in range(distinct)]
+    return [rng.choice(pool) for _ in range(n)]
+
+def _run(label: str, fn, queries) -> None:
+    t0 = time.perf_counter()
+    n_tok = 0
+    for q in queries:
+        n_tok += len(fn(q))
+    dt = time.perf_counter() - t0
+    print(f"{label:<22} {len(queries) / dt:>12,.0f} q/s {n_tok / dt:>14,.0f} tok/s")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000, help="normalizations per run")
+    ap.add_argument("--distinct", type=int, default=5_000, help="distinct query strings")
+    args = ap.parse_args()
+
+    queries = _queries(args.n, args.distinct)
+    cfg = NORMALIZER.cfg
+    uncached = Normalizer(cfg, cache_size=0)
+    print(f"normalizer {NORMALIZER.version}; {args.n:,} queries, {args.distinct:,} distinct")
+    _run("legacy (per call)", lambda q: _legacy_tokens(q, cfg), queries)
+    _run("compiled, no LRU", uncached.tokens, queries)
+    _run("compiled + LRU", NORMALIZER.tokens, queries)
+    print(f"LRU: {NORMALIZER.cache_info()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# benchmarks/bench_suite.py
+"""
+Offline benchmark of the search engines on synthetic employees.
+
+    python benchmarks/bench_suite.py [--sizes 1000 10000 100000] [--dim 128] [--repeat 20]
+                                     [--out benchmarks/results/latest.json]
+                                     [--save-baseline] [--baseline benchmarks/results/baseline.json]
+
+For each size: build the keyword structures, stub-embed the profiles and build the
+FAISS index (config/semantic.yaml index_type), install the result as the live data
+snapshot, then time normalize_to_tokens, baseline_search, semantic_search and
+hybrid_search over tests/gold_queries.json. normalize_to_tokens runs on a scanner
+with its LRU caches disabled: the gold queries repeat, so the live one would only
+measure cache hits.
+
+Nothing leaves the process: query embeddings come from `StubEmbedder` via a
+memory-only query cache primed before timing, and the API base URL points at a
+closed local port so an unexpected miss fails instead of calling out.
+
+Writes p50/p99/mean latency, throughput and peak RSS to JSON. The comparison is
+opt-in: --save-baseline records a run (default benchmarks/results/baseline.json),
+and --baseline FILE prints the change per metric against a run recorded on the
+same machine, exiting 1 if --strict and anything regressed by more than --tolerance.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+os.environ["OPENAI_BASE_URL"] = "http://127.0.0.1:9/v1"  # offline: fail fast on any API call
+os.environ.setdefault("OPENAI_API_KEY", "offline-bench")
+
+import numpy as np
+
+from synthetic import ROOT, StubEmbedder, synthetic_employees  # also puts the repo root on sys.path
+from app import snapshot
+from app.cache import LRUCache, TwoTierCache
+from app.config import load_json, repo_path
+from app.normalizer import NORMALIZER, Normalizer
+from app.search import semantic
+from app.search.ann import build_ann_index
+from app.search.baseline import baseline_search, build_keyword_data, normalize_to_tokens, phrase_names
+from app.search.hybrid import hybrid_search
+from app.search.matcher import QueryScanner
+from indexing.build_index import INDEX_KIND, INDEX_PARAMS, blob_hash, meta_entry, profile_blob
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+DEFAULT_BASELINE = RESULTS_DIR / "baseline.json"
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KiB on Linux
+
+def _summary(samples_ms: List[float], wall_s: float) -> Dict[str, Any]:
+    arr = np.asarray(samples_ms)
+    return {
+        "n": int(arr.size),
+        "p50_ms": round(float(np.percentile(arr, 50)), 4),
+        "p99_ms": round(float(np.percentile(arr, 99)), 4),
+        "mean_ms": round(float(arr.mean()), 4),
+        "qps": round(arr.size / wall_s, 1) if wall_s > 0 else None,
+    }
+
+def _time_op(fn: Callable[[str], Any], queries: List[str], repeat: int, per_pass: int = 0) -> Dict[str, Any]:
+    """
+    Latency samples of fn over the queries. Sub-microsecond ops set `per_pass`: each
+    sample is then the mean over that many passes, so timer overhead doesn't dominate.
+    """
+    for q in queries:  # warm-up pass (imports, first-touch allocations)
+        fn(q)
+    samples = []
+    t_start = time.perf_counter()
+    if per_pass:
+        for _ in range(repeat * len(queries)):
+            t0 = time.perf_counter()
+            for _ in range(per_pass):
+                for q in queries:
+                    fn(q)
+            samples.append((time.perf_counter() - t0) * 1000.0 / (per_pass * len(queries)))
+        wall = time.perf_counter() - t_start
+        return {**_summary(samples, wall), "qps": round(len(samples) * per_pass * len(queries) / wall, 1)}
+    for _ in range(repeat):
+        for q in queries:
+            t0 = time.perf_counter()
+            fn(q)
+            samples.append((time.perf_counter() - t0) * 1000.0)
+    return _summary(samples, time.perf_counter() - t_start)
+
+def _build(employees: List[Dict[str, Any]], embedder: StubEmbedder, version: int) -> Dict[str, Any]:
+    """Build a full DataSnapshot for `employees`; returns per-stage seconds."""
+    stages: Dict[str, float] = {}
+
+    t0 = time.perf_counter()
+    keyword = build_keyword_data(employees)
+    stages["keyword_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    blobs = [profile_blob(e) for e in employees]
+    stages["profiles_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    vecs = embedder.embed_many(blobs)
+    stages["embed_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ids = np.array([e["id"] for e in employees], dtype="int64")
+    index = build_ann_index(INDEX_KIND, vecs, ids, INDEX_PARAMS)
+    meta = [meta_entry(row, e, blob_hash(b)) for row, (e, b) in enumerate(zip(employees, blobs))]
+    sem = semantic.build_semantic_data(index, meta, vecs)
+    stages["ann_s"] = time.perf_counter() - t0
+
+    snap = snapshot.DataSnapshot(
+        version=version,
+        employees_sha=f"synthetic-{len(employees)}".ljust(16, "0"),
+        loaded_at=time.time(),
+        build_ms=sum(stages.values()) * 1000.0,
+        sources={},
+        keyword=keyword,
+        semantic=sem,
+        semantic_error=None,
+        facets=snapshot.build_facets(employees),
+    )
+    snapshot.install(snap)
+    stages["index_build_s"] = stages["profiles_s"] + stages["embed_s"] + stages["ann_s"]
+    return {k: round(v, 3) for k, v in stages.items()}
+
+def _prime_query_cache(queries: List[str], embedder: StubEmbedder) -> None:
+    # Memory-only cache so stub vectors never reach data/query_embeddings.sqlite
+    semantic._query_cache = TwoTierCache(LRUCache(max_entries=4096), None, encode=bytes, decode=bytes)
+    for q in queries:
+        q_norm = semantic.normalize_text(q)
+        semantic._query_cache.put(semantic._cache_key(q_norm), embedder.embed(q_norm))
+
+def run_size(n: int, queries: List[str], embedder: StubEmbedder, repeat: int, top_k: int) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    employees = synthetic_employees(n)
+    gen_s = time.perf_counter() - t0
+    build = _build(employees, embedder, version=n)
+    # same rules and phrases as the live scanner, no token caches
+    uncached = Normalizer(load_json(repo_path("config", "normalization.json")), cache_size=0)
+    scanner = QueryScanner(uncached, phrase_names=phrase_names(employees), cache_size=0)
+    ops = {
+        "normalize_to_tokens": _time_op(lambda q: normalize_to_tokens(q, scanner), queries, repeat, per_pass=10),
+        "baseline_search": _time_op(lambda q: baseline_search(q, top_k), queries, repeat),
+        "semantic_search": _time_op(lambda q: semantic.semantic_search(q, top_k), queries, repeat),
+        "hybrid_search": _time_op(lambda q: hybrid_search(q, top_k), queries, repeat),
+    }
+    return {
+        "employees": n,
+        "generate_s": round(gen_s, 3),
+        "build": build,
+        "build_profiles_per_s": round(n / build["index_build_s"], 1) if build["index_build_s"] else None,
+        "ops": ops,
+        "peak_rss_mb": _peak_rss_mb(),  # process high-water mark so far (sizes run ascending)
+    }
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+# ---------- Baseline comparison ----------
+# (metric, higher is better)
+COMPARED = [("p50_ms", False), ("p99_ms", False), ("qps", True)]
+NOISE_FLOOR_MS = 0.01  # latency changes smaller than this are never flagged
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print per-metric deltas vs. the baseline; returns the regressions beyond `tolerance`."""
+    regressions = []
+    base_sizes = {str(r["employees"]): r for r in baseline.get("results", [])}
+    print(f"\n{'size':>8} {'op':<20} {'metric':<7} {'baseline':>11} {'current':>11} {'change':>8}")
+    for res in current["results"]:
+        base = base_sizes.get(str(res["employees"]))
+        if base is None:
+            continue
+        rows = [(op, s, base["ops"].get(op)) for op, s in res["ops"].items()]
+        rows.append(("index_build", {"qps": res["build_profiles_per_s"]}, {"qps": base.get("build_profiles_per_s")}))
+        for op, cur, old in rows:
+            if not old:
+                continue
+            for metric, higher_better in COMPARED:
+                a, b = old.get(metric), cur.get(metric)
+                if not a or b is None:
+                    continue
+                change = (b - a) / a
+                worse = -change if higher_better else change
+                noise = metric.endswith("_ms") and abs(b - a) < NOISE_FLOOR_MS
+                flag = "  REGRESSION" if worse > tolerance and not noise else ""
+                print(f"{res['employees']:>8} {op:<20} {metric:<7} {a:>11.3f} {b:>11.3f} {change:>+7.1%}{flag}")
+                if flag:
+                    regressions.append(f"{res['employees']}/{op}/{metric} {change:+.1%}")
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline benchmark suite for keyword/semantic/hybrid search.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                    help="synthetic employee counts (up to 1000000)")
+    ap.add_argument("--dim", type=int, default=128, help="stub embedding dimension")
+    ap.add_argument("--repeat", type=int, default=20, help="passes over the gold queries per op")
+    ap.add_argument("--top-k", type=int, default=5)
+    ap.add_argument("--out", type=Path, default=RESULTS_DIR / "latest.json")
+    ap.add_argument("--baseline", type=Path, default=None,
+                    help="compare against this recorded run (or, with --save-baseline, where to record it)")
+    ap.add_argument("--save-baseline", action="store_true",
+                    help=f"also write the results to --baseline (default {DEFAULT_BASELINE.relative_to(ROOT)})")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown before flagging")
+    ap.add_argument("--strict", action="store_true", help="exit 1 when a metric regressed beyond --tolerance")
+    args = ap.parse_args()
+    if args.baseline is not None and not args.save_baseline and not args.baseline.exists():
+        ap.error(f"--baseline {args.baseline} does not exist (record one with --save-baseline)")
+
+    queries = list(load_json(repo_path("tests", "gold_queries.json"))["queries"])
+    embedder = StubEmbedder(args.dim)
+    _prime_query_cache(queries, embedder)
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "git": _git_rev(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "index_kind": INDEX_KIND,
+            "dim": args.dim,
+            "repeat": args.repeat,
+            "top_k": args.top_k,
+            "queries": len(queries),
+            "normalizer": NORMALIZER.version,
+        },
+        "results": [],
+    }
+    print(f"{'size':>8} {'op':<20} {'p50_ms':>9} {'p99_ms':>9} {'qps':>10}   build_s  rss_mb")
+    for n in sorted(args.sizes):
+        res = run_size(n, queries, embedder, args.repeat, args.top_k)
+        report["results"].append(res)
+        for op, s in res["ops"].items():
+            print(f"{n:>8} {op:<20} {s['p50_ms']:>9.3f} {s['p99_ms']:>9.3f} {s['qps']:>10,.1f}")
+        print(f"{n:>8} {'index_build':<20} {'':>9} {'':>9} {res['build_profiles_per_s'] or 0:>10,.1f}"
+              f"   {res['build']['index_build_s']:>7.2f}  {res['peak_rss_mb']}")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nwrote {args.out}")
+
+    if args.save_baseline:
+        path = args.baseline or DEFAULT_BASELINE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"saved baseline {path}")
+    elif args.baseline is not None:
+        regressions = compare(report, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: " + ", ".join(regressions))
+            if args.strict:
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+# benchmarks/loadgen.py
+"""
+Open-loop load generator for the API (`/search/hybrid`, `/chat`, ...), replaying
+tests/gold_queries.json at fixed request rates.
+
+    # everything local: stub OpenAI server + uvicorn with 2 workers, rates 5..40 req/s
+    python benchmarks/loadgen.py --spawn --workers 2 --rates 5 10 20 40 --duration 20 \\
+        --mix hybrid=0.7,chat=0.3 --stub-latency-ms 300 --stub-jitter-ms 100 --stub-error-rate 0.02
+
+    # against a server that is already running
+    python benchmarks/loadgen.py --url http://127.0.0.1:8000 --rates 10 20
+
+Arrivals are Poisson at each target rate and never wait for earlier responses
+(open loop), so queueing inside the server shows up as latency instead of a lower
+send rate. Per step and route: throughput, p50/p95/p99, error and fallback rate.
+The saturation point is the highest rate that still met all of: throughput within
+10% of the rate actually sent, p99 under --slo-ms, error rate under --max-error-rate
+(throughput includes the drain after the last arrival, so keep steps >= 10 s).
+
+With --spawn the server runs with QUERY_CACHE_PATH="" so stub query embeddings
+never reach the persistent query cache. --unique appends a per-request token to
+every query so embedding/response caches miss (worst case); without it the gold
+queries repeat and mostly hit.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+ROUTES = {
+    # name -> (method, path)
+    "hybrid": ("GET", "/search/hybrid"),
+    "keyword": ("GET", "/search/keyword"),
+    "chat": ("POST", "/chat"),
+    "stream": ("POST", "/chat/stream"),
+}
+
+def _parse_mix(spec: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise SystemExit(f"unknown route {name!r} in --mix (choose from {', '.join(ROUTES)})")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _index_dim() -> int:
+    stats = ROOT / "data" / "employee_index.stats.json"
+    try:
+        return int(json.loads(stats.read_text(encoding="utf-8")).get("embedding_dim", 3072))
+    except (OSError, ValueError):
+        return 3072
+
+# ---------- Spawned stack ----------
+class Stack:
+    """Stub OpenAI server + uvicorn running app.main, both as subprocesses."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.procs: List[subprocess.Popen] = []
+        self.url = ""
+
+    def __enter__(self) -> "Stack":
+        a = self.args
+        stub_port, api_port = _free_port(), _free_port()
+        self.procs.append(subprocess.Popen([
+            sys.executable, str(ROOT / "scripts" / "stub_openai_server.py"), "--port", str(stub_port),
+            "--dim", str(a.dim or _index_dim()), "--latency-ms", str(a.stub_latency_ms),
+            "--jitter-ms", str(a.stub_jitter_ms), "--error-rate", str(a.stub_error_rate),
+            "--token-delay-ms", str(a.stub_token_delay_ms), "--seed", str(a.seed),
+        ], cwd=ROOT, stdout=subprocess.DEVNULL))
+        env = {
+            **os.environ,
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+            "OPENAI_API_KEY": "stub",
+            "QUERY_CACHE_PATH": "",
+        }
+        self.procs.append(subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(api_port),
+            "--workers", str(a.workers), "--log-level", "warning", "--no-access-log",
+        ], cwd=ROOT, env=env))
+        self.url = f"http://127.0.0.1:{api_port}"
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for p in reversed(self.procs):
+            p.terminate()
+        for p in self.procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+async def wait_ready(url: str, timeout_s: float) -> None:
+    deadline = time.monotonic() + timeout_s
+    async with httpx.AsyncClient(timeout=5) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{url}/ready")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise SystemExit(f"{url}/ready did not return 200 within {timeout_s:.0f}s")
+
+# ---------- One request ----------
+async def _request(client: httpx.AsyncClient, route: str, query: str, top_k: int) -> Dict[str, Any]:
+    method, path = ROUTES[route]
+    rec: Dict[str, Any] = {"route": route, "status": 0, "error": None, "fallback": False}
+    t0 = time.perf_counter()
+    try:
+        if method == "GET":
+            resp = await client.get(path, params={"q": query, "top_k": top_k})
+            rec["status"] = resp.status_code
+        elif route == "stream":
+            async with client.stream("POST", path, json={"query": query, "top_k": top_k}) as resp:
+                rec["status"] = resp.status_code
+                async for line in resp.aiter_lines():
+                    if rec.get("ttfb_ms") is None and line.startswith("event: token"):
+                        rec["ttfb_ms"] = (time.perf_counter() - t0) * 1000.0
+                    if line.startswith("event: fallback") or line.startswith("event: error"):
+                        rec["fallback"] = True
+        else:
+            resp = await client.post(path, json={"query": query, "top_k": top_k})
+            rec["status"] = resp.status_code
+            if resp.status_code == 200:
+                notes = resp.json().get("notes") or {}
+                rec["fallback"] = bool(notes.get("fallback"))
+                rec["cache_hit"] = bool(notes.get("cache_hit"))
+    except httpx.HTTPError as e:
+        rec["error"] = type(e).__name__
+    rec["latency_ms"] = (time.perf_counter() - t0) * 1000.0
+    rec["done_at"] = time.perf_counter()
+    return rec
+
+# ---------- One step at a fixed rate ----------
+async def run_step(url: str, rate: float, duration_s: float, queries: List[str], mix: List[Tuple[str, float]],
+                   rng: random.Random, args: argparse.Namespace) -> Dict[str, Any]:
+    names = [m[0] for m in mix]
+    weights = [m[1] for m in mix]
+    limits = httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight)
+    records: List[Dict[str, Any]] = []
+    tasks: List[asyncio.Task] = []
+    dropped = 0
+    seq = 0
+    inflight = 0
+
+    def finished(_task: asyncio.Task) -> None:
+        nonlocal inflight
+        inflight -= 1
+
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        next_at = start
+        while True:
+            next_at += rng.expovariate(rate)
+            if next_at - start >= duration_s:
+                break
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if inflight >= args.max_inflight:
+                dropped += 1  # client-side cap reached; counted, not sent
+                continue
+            seq += 1
+            q = queries[seq % len(queries)]
+            if args.unique:
+                q = f"{q} lg{seq}x{int(rate)}"
+            task = asyncio.create_task(_request(client, rng.choices(names, weights)[0], q, args.top_k))
+            inflight += 1
+            task.add_done_callback(finished)
+            tasks.append(task)
+        sent_window = time.perf_counter() - start
+        results = await asyncio.gather(*tasks)
+        records.extend(results)
+    end = max((r["done_at"] for r in records), default=start + sent_window)
+    return summarize(rate, records, dropped, start, end, duration_s)
+
+def _pct(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    arr = np.asarray(values)
+    return {f"p{p}_ms": round(float(np.percentile(arr, p)), 1) for p in (50, 95, 99)}
+
+def summarize(rate: float, records: List[Dict[str, Any]], dropped: int,
+              start: float, end: float, duration_s: float) -> Dict[str, Any]:
+    def block(recs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        ok = [r for r in recs if r["error"] is None and 200 <= r["status"] < 400]
+        out = {
+            "requests": len(recs),
+            "ok": len(ok),
+            "throughput_rps": round(len(ok) / max(end - start, 1e-9), 2),
+            **_pct([r["latency_ms"] for r in ok]),
+            "error_rate": round(1 - len(ok) / len(recs), 4) if recs else 0.0,
+            "fallback_rate": round(sum(r["fallback"] for r in ok) / len(ok), 4) if ok else 0.0,
+        }
+        ttfb = [r["ttfb_ms"] for r in ok if r.get("ttfb_ms") is not None]
+        if ttfb:
+            out["ttfb_p50_ms"] = _pct(ttfb)["p50_ms"]
+        hits = [r["cache_hit"] for r in ok if "cache_hit" in r]
+        if hits:
+            out["cache_hit_rate"] = round(sum(hits) / len(hits), 4)
+        return out
+
+    routes = sorted({r["route"] for r in records})
+    return {
+        "offered_rps": rate,
+        "sent_rps": round(len(records) / duration_s, 2),  # Poisson: close to, not exactly, offered
+        "duration_s": duration_s,
+        "elapsed_s": round(end - start, 2),
+        "dropped": dropped,
+        "all": block(records),
+        "routes": {name: block([r for r in records if r["route"] == name]) for name in routes},
+    }
+
+def saturated(step: Dict[str, Any], args: argparse.Namespace) -> List[str]:
+    """Reasons this step missed the targets (empty if it held)."""
+    s = step["all"]
+    reasons = []
+    if s["throughput_rps"] < 0.9 * step["sent_rps"]:
+        reasons.append(f"throughput {s['throughput_rps']} < 90% of sent {step['sent_rps']}")
+    if s["p99_ms"] is not None and s["p99_ms"] > args.slo_ms:
+        reasons.append(f"p99 {s['p99_ms']}ms > {args.slo_ms}ms")
+    if s["error_rate"] > args.max_error_rate:
+        reasons.append(f"errors {s['error_rate']:.1%} > {args.max_error_rate:.1%}")
+    if step["dropped"]:
+        reasons.append(f"{step['dropped']} dropped at --max-inflight")
+    return reasons
+
+def _print_step(step: Dict[str, Any]) -> None:
+    for name, s in [("all", step["all"]), *step["routes"].items()]:
+        print(f"{step['offered_rps']:>7.1f} {name:<8} {s['requests']:>6} {s['throughput_rps']:>8.2f} "
+              f"{s['p50_ms'] or 0:>8.1f} {s['p95_ms'] or 0:>8.1f} {s['p99_ms'] or 0:>8.1f} "
+              f"{s['error_rate']:>7.1%} {s['fallback_rate']:>8.1%}")
+
+async def drive(url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    queries = json.loads((ROOT / "tests" / "gold_queries.json").read_text(encoding="utf-8"))["queries"]
+    mix = _parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    await wait_ready(url, args.ready_timeout)
+
+    steps = []
+    sustained: Optional[float] = None
+    first_failed: Optional[Dict[str, Any]] = None
+    print(f"{'rps':>7} {'route':<8} {'reqs':>6} {'tput':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'errors':>7} {'fallback':>8}")
+    for rate in args.rates:
+        step = await run_step(url, rate, args.duration, queries, mix, rng, args)
+        step["missed"] = saturated(step, args)
+        steps.append(step)
+        _print_step(step)
+        if step["missed"]:
+            print(f"        saturated at {rate} rps: {'; '.join(step['missed'])}")
+            if first_failed is None:
+                first_failed = {"offered_rps": rate, "reasons": step["missed"]}
+            if not args.keep_going:
+                break
+        elif first_failed is None:
+            sustained = rate
+        if args.pause:
+            await asyncio.sleep(args.pause)
+
+    return {
+        "meta": {
+            "url": url,
+            "workers": args.workers,
+            "mix": args.mix,
+            "duration_s": args.duration,
+            "unique_queries": args.unique,
+            "slo_ms": args.slo_ms,
+            "max_error_rate": args.max_error_rate,
+            "stub": {
+                "latency_ms": args.stub_latency_ms, "jitter_ms": args.stub_jitter_ms,
+                "error_rate": args.stub_error_rate, "token_delay_ms": args.stub_token_delay_ms,
+            } if args.spawn else None,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "saturation": {"sustained_rps": sustained, "first_saturated": first_failed},
+        "steps": steps,
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Open-loop load generator for the HR chatbot API.")
+    ap.add_argument("--url", help="base URL of a running API (omit with --spawn)")
+    ap.add_argument("--spawn", action="store_true", help="start the stub OpenAI server and uvicorn locally")
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn workers (--spawn) / recorded in the report")
+    ap.add_argument("--rates", type=float, nargs="+", default=[5, 10, 20, 40], help="offered req/s per step")
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds per step")
+    ap.add_argument("--mix", default="hybrid=0.7,chat=0.3", help="route weights: hybrid, keyword, chat, stream")
+    ap.add_argument("--top-k", type=int, default=3)
+    ap.add_argument("--unique", action="store_true", help="make every query unique (cache-miss worst case)")
+    ap.add_argument("--timeout", type=float, default=30.0, help="client timeout per request (s)")
+    ap.add_argument("--max-inflight", type=int, default=1000, help="client-side cap on concurrent requests")
+    ap.add_argument("--slo-ms", type=float, default=3000.0, help="p99 target used for the saturation point")
+    ap.add_argument("--max-error-rate", type=float, default=0.01)
+    ap.add_argument("--keep-going", action="store_true", help="run every rate even after saturation")
+    ap.add_argument("--pause", type=float, default=2.0, help="idle seconds between steps")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--ready-timeout", type=float, default=180.0)
+    ap.add_argument("--dim", type=int, default=0, help="stub embedding dim (default: from the index stats)")
+    ap.add_argument("--stub-latency-ms", type=float, default=300.0)
+    ap.add_argument("--stub-jitter-ms", type=float, default=100.0)
+    ap.add_argument("--stub-error-rate", type=float, default=0.0)
+    ap.add_argument("--stub-token-delay-ms", type=float, default=10.0)
+    ap.add_argument("--out", type=Path, default=RESULTS_DIR / "load.json")
+    args = ap.parse_args()
+    if not args.spawn and not args.url:
+        ap.error("pass --url of a running API, or --spawn")
+
+    if args.spawn:
+        with Stack(args) as stack:
+            report = asyncio.run(drive(stack.url, args))
+    else:
+        report = asyncio.run(drive(args.url.rstrip("/"), args))
+
+    sat = report["saturation"]
+    print(f"\nworkers={args.workers} sustained={sat['sustained_rps']} rps "
+          f"first_saturated={(sat['first_saturated'] or {}).get('offered_rps')}")
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
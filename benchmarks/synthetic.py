@@ -0,0 +1,84 @@
+# benchmarks/synthetic.py
+"""Deterministic synthetic employees and stub embeddings for offline benchmarks."""
+from __future__ import annotations
+import hashlib
+import random
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]   # repo root
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.config import load_json, repo_path
+
+AVAILABILITY = ["available", "soon", "unavailable"]
+
+def _vocab() -> Dict[str, List[str]]:
+    """Skills/domains/projects seen in the real dataset plus alias targets from normalization.json."""
+    norm = load_json(repo_path("config", "normalization.json"))
+    employees = load_json(repo_path("data", "employees.json"))["employees"]
+    skills = {s for e in employees for s in e.get("skills", [])}
+    skills |= set(norm.get("skill_aliases", {}).values())
+    domains = {d for e in employees for d in e.get("domains", [])}
+    domains |= set(norm.get("domain_aliases", {}).values())
+    projects = {p for e in employees for p in e.get("projects", [])}
+    return {
+        "skills": sorted(skills),
+        "domains": sorted(domains),
+        "projects": sorted(projects),
+    }
+
+def synthetic_employees(n: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Return `n` employee dicts shaped like data/employees.json entries."""
+    rng = random.Random(seed)
+    vocab = _vocab()
+    out = []
+    for i in range(n):
+        out.append({
+            "id": i + 1,
+            "name": f"Employee {i + 1}",
+            "skills": rng.sample(vocab["skills"], rng.randint(3, 8)),
+            "experience_years": rng.randint(0, 15),
+            "projects": rng.sample(vocab["projects"], rng.randint(1, 3)),
+            "availability": rng.choice(AVAILABILITY),
+            "domains": rng.sample(vocab["domains"], rng.randint(1, 3)),
+        })
+    return out
+
+class StubEmbedder:
+    """
+    Deterministic offline embedding: the L2-normalized sum of one pseudo-random unit
+    vector per token (seeded from the token's sha256). Texts sharing tokens land close
+    together, so search results are meaningful without calling the API.
+    """
+
+    def __init__(self, dim: int = 128):
+        self.dim = dim
+        self._token_vecs: Dict[str, np.ndarray] = {}
+
+    def _token(self, tok: str) -> np.ndarray:
+        v = self._token_vecs.get(tok)
+        if v is None:
+            seed = int.from_bytes(hashlib.sha256(tok.encode("utf-8")).digest()[:8], "little")
+            v = np.random.default_rng(seed).standard_normal(self.dim).astype("float32")
+            v /= np.linalg.norm(v)
+            self._token_vecs[tok] = v
+        return v
+
+    def embed(self, text: str) -> np.ndarray:
+        """One vector for already-normalized text (tokens split on whitespace)."""
+        toks = text.split()
+        if not toks:
+            return np.zeros(self.dim, dtype="float32")
+        v = np.sum([self._token(t) for t in toks], axis=0)
+        return (v / max(float(np.linalg.norm(v)), 1e-12)).astype("float32")
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        out = np.empty((len(texts), self.dim), dtype="float32")
+        for i, t in enumerate(texts):
+            out[i] = self.embed(t)
+        return out
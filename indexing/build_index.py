@@ -1,64 +1,45 @@
 # indexing/build_index.py
 from __future__ import annotations
-import os, json, time
+import os, sys, json, time, hashlib, argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
-import re
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 
 from dotenv import load_dotenv
-from openai import OpenAI
 import faiss  # type: ignore
 
 # ---------- Paths ----------
 ROOT = Path(__file__).resolve().parents[1]   # repo root
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.clients import get_client, timeout
+from app.config import load_yaml
+from app.employee_store import EmployeeStore, open_store
+from app.embeddings import LOCAL_PATH, PROVIDER, EmbeddingProvider, fit_local, remote_provider
+from app.normalizer import VERSION as NORMALIZER_VERSION, normalize_text
+from app.search.ann import FLAT, IVF, build_ann_index, describe, effective_nlist, index_kind
+from indexing.embedding_store import EmbeddingStore
+from indexing.pipeline import Checkpoint, batched, embed_chunks, embed_with_backoff
+
 DATA_DIR = ROOT / "data"
 CONFIG_DIR = ROOT / "config"
 
-EMP_PATH = DATA_DIR / "employees.json"
-NORM_PATH = CONFIG_DIR / "normalization.json"
-
 INDEX_OUT = DATA_DIR / "employee_index.faiss"
 META_OUT  = DATA_DIR / "employee_meta.json"
 STATS_OUT = DATA_DIR / "employee_index.stats.json"
+VECTORS_OUT = DATA_DIR / "employee_vectors.npy"   # float32 [N, d], row i == meta row_id i
+STORE_PATH = DATA_DIR / "embedding_store.sqlite"
+CHECKPOINT_PATH = DATA_DIR / "build_checkpoint.json"
 
 # ---------- Load env & configs ----------
 load_dotenv()  # loads .env (kept out of git)
-EMBED_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
-
-with NORM_PATH.open("r", encoding="utf-8") as f:
-    NORM = json.load(f)
-
-STOPWORDS = set(NORM.get("stopwords", []))
-PUNCT = NORM.get("punctuation_chars_to_strip", [])
-SKILL_ALIASES = NORM.get("skill_aliases", {})
-DOMAIN_ALIASES = NORM.get("domain_aliases", {})
-
-def strip_punct(s: str) -> str:
-    if not PUNCT:
-        return s
-    tbl = str.maketrans({ch: " " for ch in PUNCT})
-    return s.translate(tbl)
-
-def collapse_spaces(s: str) -> str:
-    return re.sub(r"\s+", " ", s).strip()
-
-def alias_expand(tok: str) -> str:
-    if tok in SKILL_ALIASES: return SKILL_ALIASES[tok]
-    if tok in DOMAIN_ALIASES: return DOMAIN_ALIASES[tok]
-    return tok
-
-def normalize_text(s: str) -> str:
-    s = s.lower()
-    s = strip_punct(s)
-    s = collapse_spaces(s)
-    toks = [alias_expand(t) for t in (s.split() if s else [])]
-    toks = [t for t in toks if t and t not in STOPWORDS]
-    return " ".join(toks)
-
-# ---------- Load employees ----------
-with EMP_PATH.open("r", encoding="utf-8") as f:
-    employees = json.load(f)["employees"]
+SEM_CFG = load_yaml(CONFIG_DIR / "semantic.yaml")
+BUILD_CFG = SEM_CFG.get("build", {}) or {}
+INDEX_TYPE = SEM_CFG.get("index_type", "IndexFlatIP")
+INDEX_KIND = index_kind(INDEX_TYPE)
+INDEX_PARAMS = (SEM_CFG.get("index_params", {}) or {}).get(INDEX_KIND, {}) or {}
 
 def profile_blob(emp: Dict[str, Any]) -> str:
     # Build a single, normalized text blob per employee
@@ -71,53 +52,266 @@ def profile_blob(emp: Dict[str, Any]) -> str:
     raw = f"{name}. skills: {skills}. projects: {projects}. domains: {domains}. {exp}. {avail}."
     return normalize_text(raw)
 
-texts: List[str] = [profile_blob(e) for e in employees]
-
-# ---------- Embed ----------
-client = OpenAI()
-print(f"Embedding {len(texts)} profiles with model: {EMBED_MODEL} ...")
-resp = client.embeddings.create(model=EMBED_MODEL, input=texts)
-vecs = np.array([d.embedding for d in resp.data], dtype="float32")
+def blob_hash(blob: str) -> str:
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
 
-# L2-normalize so inner product ≈ cosine similarity
-faiss.normalize_L2(vecs)
+def profile_record(emp: Dict[str, Any]) -> Tuple[str, str]:
+    """(blob, hash) for one employee; runs in the normalization process pool."""
+    blob = profile_blob(emp)
+    return blob, blob_hash(blob)
 
-# ---------- Build FAISS index ----------
-d = vecs.shape[1]
-index = faiss.IndexFlatIP(d)
-index.add(vecs)
-assert index.ntotal == len(texts)
-
-# ---------- Save artifacts ----------
-print(f"Saving index → {INDEX_OUT}")
-faiss.write_index(index, str(INDEX_OUT))
-
-meta = []
-for row_id, emp in enumerate(employees):
-    meta.append({
+def meta_entry(row_id: int, emp: Dict[str, Any], h: str) -> Dict[str, Any]:
+    return {
         "row_id": row_id,
         "employee_id": emp["id"],
         "name": emp.get("name",""),
+        "blob_hash": h,
         "top_fields": {
             "skills": emp.get("skills", [])[:6],
             "domains": emp.get("domains", [])[:6],
             "availability": emp.get("availability",""),
             "experience_years": emp.get("experience_years",0)
         }
-    })
-
-with META_OUT.open("w", encoding="utf-8") as f:
-    json.dump(meta, f, ensure_ascii=False, indent=2)
-
-stats = {
-    "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-    "model": EMBED_MODEL,
-    "embedding_dim": int(d),
-    "num_items": int(index.ntotal),
-    "faiss_index": "IndexFlatIP",
-}
-with STATS_OUT.open("w", encoding="utf-8") as f:
-    json.dump(stats, f, ensure_ascii=False, indent=2)
-
-print("Done.")
-print(json.dumps(stats, indent=2))
+    }
+
+# ---------- Embedding provider ----------
+def load_provider(store: EmployeeStore, workers: int, read_batch: int) -> EmbeddingProvider:
+    """
+    The provider selected in config/semantic.yaml. `local` is (re)fit on the current
+    profile blobs in a pre-pass; its model name carries the fit's fingerprint, so a
+    new fit never reuses stored vectors or patches an index from an older one.
+    """
+    if PROVIDER != "local":
+        return remote_provider()
+    t0 = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        def blobs():
+            for batch in batched(store.iter_employees(read_batch), read_batch):
+                recs = pool.map(profile_record, batch, chunksize=64) if pool else map(profile_record, batch)
+                yield from (blob for blob, _ in recs)
+        provider = fit_local(blobs())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    print(f"Fit local embedder {provider.model} on {provider.n_docs} profiles in {time.perf_counter() - t0:.1f}s")
+    return provider
+
+# ---------- Previous build ----------
+def load_previous(model: str) -> Tuple[Optional[faiss.Index], Dict[int, str]]:
+    """
+    Return (index to patch in place, {employee_id: blob_hash}) from the last build.
+    Only flat ID-mapped indexes are patched; for IVF/HNSW the index is None and the
+    build re-assembles it from the embedding store (hashes still drive the delta).
+    """
+    if not (INDEX_OUT.exists() and META_OUT.exists() and STATS_OUT.exists()):
+        return None, {}
+    with STATS_OUT.open("r", encoding="utf-8") as f:
+        stats = json.load(f)
+    if not stats.get("id_mapped") or stats.get("model") != model:
+        return None, {}
+    with META_OUT.open("r", encoding="utf-8") as f:
+        meta = json.load(f)
+    prev = {int(m["employee_id"]): m["blob_hash"] for m in meta if m.get("blob_hash")}
+    if INDEX_KIND != FLAT or stats.get("faiss_index") != "IndexIDMap2(IndexFlatIP)":
+        return None, prev
+    index = faiss.read_index(str(INDEX_OUT))
+    if not isinstance(index, faiss.IndexIDMap2) or len(prev) != index.ntotal:
+        return None, {}
+    return index, prev
+
+# ---------- Build ----------
+def build(full: bool = False) -> Dict[str, Any]:
+    """
+    Streaming build:
+      employees are streamed from the employee store -> blobs normalized in a process pool ->
+      vectors reused from the store or embedded in bounded concurrent chunks ->
+      appended to the ID-mapped index as each chunk arrives.
+    Every embedded chunk is committed to the store, so an interrupted build
+    resumes by skipping what it already embedded.
+    """
+    read_batch = int(BUILD_CFG.get("read_batch", 1000))
+    chunk_size = int(BUILD_CFG.get("embed_chunk_size", 256))
+    max_inflight = int(BUILD_CFG.get("max_inflight", 4))
+    workers = int(BUILD_CFG.get("normalize_workers", os.cpu_count() or 1))
+
+    emp_store = open_store()  # re-imports employees.json first if it changed
+    provider = load_provider(emp_store, workers, read_batch)
+    model = provider.model
+    index, prev = (None, {}) if full else load_previous(model)
+    patching = index is not None  # False -> every row is (re)added from store/embeddings
+    store = EmbeddingStore(STORE_PATH)
+    checkpoint = Checkpoint(CHECKPOINT_PATH)
+    prior = checkpoint.load()
+    if prior and prior.get("model") == model:
+        print(f"Resuming interrupted build: {prior.get('embedded', 0)} profiles already embedded and stored.")
+
+    client = None
+    def embed(texts: List[str]) -> np.ndarray:
+        nonlocal client
+        if not provider.remote:
+            return provider.embed(texts)
+        if client is None:
+            # shared connection pool; backoff is handled by embed_with_backoff
+            client = get_client().with_options(max_retries=0, timeout=timeout("embeddings_build"))
+        return embed_with_backoff(
+            client, model, texts,
+            max_retries=int(BUILD_CFG.get("max_retries", 6)),
+            base_s=float(BUILD_CFG.get("backoff_base_s", 1.0)),
+            max_s=float(BUILD_CFG.get("backoff_max_s", 60.0)),
+        )
+
+    def add_vectors(ids: List[int], mat: np.ndarray) -> None:
+        nonlocal index
+        if index is None:
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(mat.shape[1]))
+        index.add_with_ids(np.ascontiguousarray(mat, dtype="float32"), np.array(ids, dtype="int64"))
+
+    meta: List[Dict[str, Any]] = []
+    seen: set = set()
+    waiting: Dict[str, List[int]] = {}   # hash queued for embedding -> employee ids needing it
+    counts = {"added": 0, "updated": 0, "unchanged": 0, "embedded": 0, "reused_from_store": 0}
+
+    def missing_chunks(pool):
+        keys: List[str] = []
+        texts: List[str] = []
+        for batch in batched(emp_store.iter_employees(read_batch), read_batch):
+            recs = list(pool.map(profile_record, batch, chunksize=64) if pool else map(profile_record, batch))
+            stale: List[int] = []
+            need: Dict[str, List[int]] = {}
+            blobs: Dict[str, str] = {}
+            for emp, (blob, h) in zip(batch, recs):
+                emp_id = int(emp["id"])
+                seen.add(emp_id)
+                meta.append(meta_entry(len(meta), emp, h))
+                old = prev.get(emp_id)
+                if old == h:
+                    counts["unchanged"] += 1
+                    if patching:
+                        continue
+                elif old is None:
+                    counts["added"] += 1
+                else:
+                    counts["updated"] += 1
+                    if patching:
+                        stale.append(emp_id)
+                need.setdefault(h, []).append(emp_id)
+                blobs[h] = blob
+            if stale and index is not None:
+                index.remove_ids(np.array(stale, dtype="int64"))
+
+            found = store.get_many(model, [h for h in need if h not in waiting])
+            if found:
+                ids = [i for h in found for i in need[h]]
+                add_vectors(ids, np.vstack([found[h] for h in found for _ in need[h]]))
+                counts["reused_from_store"] += len(found)
+            for h, ids in need.items():
+                if h in found:
+                    continue
+                if h in waiting:
+                    waiting[h].extend(ids)
+                    continue
+                waiting[h] = list(ids)
+                keys.append(h)
+                texts.append(blobs[h])
+                if len(keys) >= chunk_size:
+                    yield keys, texts
+                    keys, texts = [], []
+        if keys:
+            yield keys, texts
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        chunks_done = 0
+        for keys, vecs in embed_chunks(embed, missing_chunks(pool), max_inflight):
+            # L2-normalize so inner product ≈ cosine similarity
+            faiss.normalize_L2(vecs)
+            store.put_many(model, dict(zip(keys, vecs)))
+            ids = [i for h in keys for i in waiting[h]]
+            add_vectors(ids, np.vstack([v for h, v in zip(keys, vecs) for _ in waiting[h]]))
+            for h in keys:
+                del waiting[h]
+            counts["embedded"] += len(keys)
+            chunks_done += 1
+            print(f"  embedded chunk {chunks_done}: {counts['embedded']} profiles so far")
+            checkpoint.save({"model": model, "embedded": counts["embedded"],
+                             "chunks": chunks_done, "rows_read": len(meta)})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        store.close()
+        emp_store.close()
+
+    removed = sorted(set(prev) - seen)
+    if removed and index is not None:
+        index.remove_ids(np.array(removed, dtype="int64"))
+    if index is None:
+        raise SystemExit("No employees to index.")
+    assert index.ntotal == len(meta)
+
+    # ---------- Row-aligned vector matrix (exact rescoring / MMR at query time) ----------
+    ids = faiss.vector_to_array(index.id_map)
+    xb = faiss.downcast_index(index.index).reconstruct_n(0, index.ntotal)
+    pos = {int(i): p for p, i in enumerate(ids.tolist())}
+    vectors = xb[[pos[int(m["employee_id"])] for m in meta]]
+
+    # ---------- Convert to the configured ANN index ----------
+    index_params = dict(INDEX_PARAMS)
+    if INDEX_KIND != FLAT:
+        print(f"Building {INDEX_TYPE} over {index.ntotal} vectors ...")
+        index = build_ann_index(INDEX_KIND, xb, ids, index_params)
+        if INDEX_KIND == IVF:
+            index_params["nlist"] = effective_nlist(index_params.get("nlist", 1024), len(ids))
+
+    # ---------- Save artifacts ----------
+    print(f"Saving index → {INDEX_OUT}")
+    faiss.write_index(index, str(INDEX_OUT))
+
+    with META_OUT.open("w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    np.save(VECTORS_OUT, np.ascontiguousarray(vectors, dtype="float32"))
+
+    if not provider.remote:  # the query path must embed with exactly this fit
+        print(f"Saving local embedder → {LOCAL_PATH}")
+        tmp = LOCAL_PATH.with_name(LOCAL_PATH.name + ".tmp")
+        provider.save(tmp)
+        os.replace(tmp, LOCAL_PATH)
+
+    stats = {
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "model": model,
+        "embedding": provider.info(),
+        "embedding_dim": int(index.d),
+        "num_items": int(index.ntotal),
+        "faiss_index": describe(index),
+        "index_type": INDEX_TYPE,
+        "index_params": index_params,
+        "id_mapped": True,
+        "normalizer_version": NORMALIZER_VERSION,
+        "delta": {
+            "mode": "full" if not prev else "incremental",
+            "added": counts["added"],
+            "updated": counts["updated"],
+            "removed": len(removed),
+            "unchanged": counts["unchanged"],
+            "embedded": counts["embedded"],
+            "reused_from_store": counts["reused_from_store"],
+        },
+    }
+    with STATS_OUT.open("w", encoding="utf-8") as f:
+        json.dump(stats, f, ensure_ascii=False, indent=2)
+    checkpoint.clear()
+    return stats
+
+def main():
+    ap = argparse.ArgumentParser(description="Build or incrementally update the employee FAISS index.")
+    ap.add_argument("--full", action="store_true", help="ignore the previous build and rebuild from scratch")
+    args = ap.parse_args()
+
+    stats = build(full=args.full)
+    print("Done.")
+    print(json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    main()
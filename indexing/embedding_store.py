@@ -0,0 +1,55 @@
+# indexing/embedding_store.py
+from __future__ import annotations
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+class EmbeddingStore:
+    """
+    Persistent (model, content hash) -> float32 vector store.
+
+    Lets the indexer reuse embeddings for profile blobs it has already seen,
+    so only new or changed profiles are sent to the embeddings API.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, hash TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        out: Dict[str, np.ndarray] = {}
+        hashes = list(dict.fromkeys(hashes))
+        for start in range(0, len(hashes), 500):  # stay under SQLite's bound-parameter limit
+            chunk = hashes[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({marks})",
+                [model, *chunk],
+            )
+            for h, blob in rows:
+                out[h] = np.frombuffer(blob, dtype="float32").copy()
+        return out
+
+    def put_many(self, model: str, items: Dict[str, np.ndarray]) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, hash, dim, vector) VALUES (?, ?, ?, ?)",
+            [(model, h, int(v.shape[0]), sqlite3.Binary(v.astype("float32").tobytes())) for h, v in items.items()],
+        )
+        self._conn.commit()
+
+    def count(self, model: Optional[str] = None) -> int:
+        if model is None:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?", (model,)).fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
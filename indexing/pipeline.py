@@ -0,0 +1,103 @@
+# indexing/pipeline.py
+"""Building blocks for the streaming index build: bounded concurrent embedding with
+backoff, and a small checkpoint file."""
+from __future__ import annotations
+import json, random, time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import openai
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch: List[Any] = []
+    for it in items:
+        batch.append(it)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# ---------- Embedding with backoff ----------
+RETRYABLE = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+def _retry_after(err: Exception) -> Optional[float]:
+    resp = getattr(err, "response", None)
+    if resp is None:
+        return None
+    try:
+        return float(resp.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def embed_with_backoff(client: Any, model: str, texts: List[str], max_retries: int = 6,
+                       base_s: float = 1.0, max_s: float = 60.0) -> np.ndarray:
+    """One embeddings call, retried with exponential backoff + jitter on rate limits and transient errors."""
+    attempt = 0
+    while True:
+        try:
+            resp = client.embeddings.create(model=model, input=texts)
+            return np.array([d.embedding for d in resp.data], dtype="float32")
+        except RETRYABLE as e:
+            attempt += 1
+            if attempt > max_retries:
+                raise
+            delay = _retry_after(e) or min(max_s, base_s * (2 ** (attempt - 1)))
+            delay *= 1.0 + random.random() * 0.25
+            print(f"  {type(e).__name__}; retry {attempt}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+def embed_chunks(embed: Callable[[List[str]], np.ndarray],
+                 chunks: Iterable[Tuple[Sequence[str], List[str]]],
+                 max_inflight: int) -> Iterator[Tuple[Sequence[str], np.ndarray]]:
+    """
+    Run `embed(texts)` over (keys, texts) chunks with at most `max_inflight`
+    requests outstanding; yield (keys, vectors) as each chunk completes.
+    """
+    max_inflight = max(1, int(max_inflight))
+    with ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="embed") as pool:
+        inflight: Dict[Future, Sequence[str]] = {}
+        for keys, texts in chunks:
+            if len(inflight) >= max_inflight:
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    yield inflight.pop(fut), fut.result()
+            inflight[pool.submit(embed, texts)] = keys
+        while inflight:
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield inflight.pop(fut), fut.result()
+
+# ---------- Checkpoint ----------
+class Checkpoint:
+    """
+    Progress marker for an in-flight build. Embedded vectors themselves are
+    committed to the EmbeddingStore per chunk, so a restarted build skips them;
+    this file just records what the interrupted run was doing.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        if not self.path.exists():
+            return None
+        with self.path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, state: Dict[str, Any]) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        tmp.replace(self.path)
+
+    def clear(self) -> None:
+        if self.path.exists():
+            self.path.unlink()
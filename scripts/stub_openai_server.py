@@ -0,0 +1,192 @@
+# scripts/stub_openai_server.py
+"""
+Offline stand-in for the OpenAI embeddings and chat-completions endpoints.
+
+    python scripts/stub_openai_server.py --port 8765 --dim 64
+    set OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+    set OPENAI_API_KEY=stub
+
+Vectors are deterministic per input text (seeded from its sha256), so repeated
+runs produce identical indexes. `--rate-limit-every N` answers every Nth request
+with HTTP 429 to exercise client backoff.
+
+For load tests: `--latency-ms` / `--jitter-ms` delay every response (uniform
+jitter, seeded), `--error-rate` answers that fraction of requests with HTTP 500,
+and `--token-delay-ms` paces streamed chat chunks. Chat replies are a short
+template naming the candidates found in the prompt; `"stream": true` is answered
+as server-sent events like the real API.
+"""
+from __future__ import annotations
+import argparse, hashlib, json, random, re, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+def stub_embedding(text: str, dim: int) -> list:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    v = np.random.default_rng(seed).standard_normal(dim).astype("float32")
+    v /= np.linalg.norm(v) or 1.0
+    return v.tolist()
+
+_NAME = re.compile(r'"name":\s*"([^"]+)"')
+
+def stub_reply(messages: list) -> str:
+    """Deterministic reply built from the candidate names in the last user message."""
+    prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    names = _NAME.findall(prompt)
+    lines = ["Summary: staffing request (stub reply)."]
+    lines += [f"- {n} — matches the requested skills — see availability above." for n in names[:3]]
+    lines.append("Next steps: confirm availability with the candidates' managers.")
+    return "\n".join(lines)
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "StubOpenAI/0.2"
+    dim = 64
+    rate_limit_every = 0
+    latency_ms = 0.0
+    jitter_ms = 0.0
+    error_rate = 0.0
+    token_delay_ms = 0.0
+    rng = random.Random(0)
+    _count = 0
+    _lock = threading.Lock()
+
+    def log_message(self, fmt, *args):  # keep the console quiet
+        pass
+
+    def _send(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay_and_fault(self) -> bool:
+        """Apply the configured latency; True if this request should fail with a 500."""
+        with StubHandler._lock:
+            jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+            fail = self.error_rate > 0 and self.rng.random() < self.error_rate
+        delay = max(0.0, self.latency_ms + jitter) / 1000.0
+        if delay:
+            time.sleep(delay)
+        return fail
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        req = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.rstrip("/")
+        if not (path.endswith("/embeddings") or path.endswith("/chat/completions")):
+            self._send(404, {"error": {"message": f"unknown route {self.path}"}})
+            return
+
+        with StubHandler._lock:
+            StubHandler._count += 1
+            n = StubHandler._count
+        if self.rate_limit_every and n % self.rate_limit_every == 0:
+            self._send(429, {"error": {"message": "rate limited (stub)", "type": "rate_limit"}},
+                       headers={"retry-after": "0.05"})
+            return
+        if self._delay_and_fault():
+            self._send(500, {"error": {"message": "injected failure (stub)", "type": "server_error"}})
+            return
+
+        if path.endswith("/chat/completions"):
+            self._chat(req)
+        else:
+            self._embeddings(req)
+
+    def _embeddings(self, req: dict):
+        inputs = req.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        data = [{"object": "embedding", "index": i, "embedding": stub_embedding(t, self.dim)}
+                for i, t in enumerate(inputs)]
+        self._send(200, {
+            "object": "list",
+            "data": data,
+            "model": req.get("model", "stub"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        })
+
+    def _chat(self, req: dict):
+        text = stub_reply(req.get("messages", []))
+        model = req.get("model", "stub")
+        cid = f"chatcmpl-stub-{int(time.time() * 1000)}"
+        if not req.get("stream"):
+            self._send(200, {
+                "id": cid,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+            return
+
+        # Server-sent events: one chunk per word, then [DONE]; the connection closes at the end
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def event(delta: dict, finish=None):
+            chunk = {"id": cid, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        event({"role": "assistant", "content": ""})
+        for word in re.findall(r"\S+\s*", text):
+            if self.token_delay_ms:
+                time.sleep(self.token_delay_ms / 1000.0)
+            event({"content": word})
+        event({}, finish="stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+def make_server(host: str = "127.0.0.1", port: int = 8765, dim: int = 64,
+                rate_limit_every: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                error_rate: float = 0.0, token_delay_ms: float = 0.0, seed: int = 0) -> ThreadingHTTPServer:
+    handler = type("Handler", (StubHandler,), {
+        "dim": dim,
+        "rate_limit_every": rate_limit_every,
+        "latency_ms": latency_ms,
+        "jitter_ms": jitter_ms,
+        "error_rate": error_rate,
+        "token_delay_ms": token_delay_ms,
+        "rng": random.Random(seed),
+    })
+    srv = ThreadingHTTPServer((host, port), handler)
+    srv.daemon_threads = True
+    return srv
+
+def main():
+    ap = argparse.ArgumentParser(description="Local stub for the OpenAI embeddings and chat-completions APIs.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--dim", type=int, default=64)
+    ap.add_argument("--rate-limit-every", type=int, default=0)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="added to every response")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- jitter on --latency-ms")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    ap.add_argument("--token-delay-ms", type=float, default=0.0, help="pause between streamed chat chunks")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    srv = make_server(args.host, args.port, args.dim, args.rate_limit_every, args.latency_ms,
+                      args.jitter_ms, args.error_rate, args.token_delay_ms, args.seed)
+    print(f"Stub OpenAI API on http://{args.host}:{args.port}/v1 (dim={args.dim}, latency={args.latency_ms}ms "
+          f"±{args.jitter_ms}ms, error_rate={args.error_rate})")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
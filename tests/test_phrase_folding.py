@@ -0,0 +1,33 @@
+# tests/test_phrase_folding.py
+"""Keyword-search regressions for phrase folding (app/search/matcher.py) on data/employees.json."""
+from app.search.baseline import baseline_search, normalize_to_tokens
+
+def _ids(query: str, top_k: int = 10):
+    return [r["id"] for r in baseline_search(query, top_k=top_k)["results"]]
+
+def _skills(query: str, emp_id: int):
+    for r in baseline_search(query, top_k=50)["results"]:
+        if r["id"] == emp_id:
+            return r["matched_terms"]["skills"]
+    return None
+
+def test_node_alias_matches_nodejs_skill():
+    assert normalize_to_tokens("node") == ["node.js"]
+    assert _ids("available now node") == [15]
+    assert set(_ids("node.js")) == {2, 15}
+
+def test_dotted_name_is_not_folded_into_alias_hybrid():
+    tokens = normalize_to_tokens("frontend typescript next.js")
+    assert "next javascript" not in tokens
+    assert tokens == ["frontend", "typescript", "next", "javascript"]
+    assert "javascript" in _skills("frontend typescript next.js", 2)
+
+def test_single_word_still_matches_multiword_skill():
+    assert 19 in _ids("python aws 3+ years ecommerce")
+    assert "aws" in _skills("aws", 19)
+
+def test_phrase_query_matches_phrase_only():
+    assert normalize_to_tokens("aws s3") == ["aws s3"]
+    assert _ids("aws s3") == [19]
+    assert normalize_to_tokens("react native mobile") == ["react native", "mobile"]
+    assert _skills("react native mobile", 5) == ["react native"]
@@ -1,5 +1,6 @@
 # ui/app.py
 import os
+import json
 import requests
 import streamlit as st
 
@@ -18,6 +19,46 @@ def call_chat(q: str, k: int):
     r.raise_for_status()
     return r.json()
 
+def call_chat_stream(q: str, k: int):
+    """Yield (event, data) pairs from the SSE endpoint POST /chat/stream."""
+    url = f"{API_BASE}/chat/stream"
+    payload = {"query": q, "top_k": k}
+    with requests.post(url, json=payload, stream=True, timeout=(10, 60)) as r:
+        r.raise_for_status()
+        event, data_lines = "message", []
+        for line in r.iter_lines(decode_unicode=True):
+            if line is None:
+                continue
+            if line == "":
+                if data_lines:
+                    yield event, json.loads("\n".join(data_lines))
+                event, data_lines = "message", []
+            elif line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[len("data:"):].strip())
+
+def run_chat_streaming(q: str, k: int, placeholder) -> dict:
+    """
+    Render tokens into `placeholder` as they arrive; return a /chat-shaped dict
+    ({response_text, used_candidate_ids, notes}) once the stream is done.
+    """
+    out = {"response_text": "", "used_candidate_ids": [], "notes": {}}
+    for event, data in call_chat_stream(q, k):
+        if event == "candidates":
+            out["used_candidate_ids"] = data.get("used_candidate_ids", [])
+        elif event == "token":
+            out["response_text"] += data.get("text", "")
+            placeholder.markdown(out["response_text"] + "▌")
+        elif event == "fallback":
+            out["response_text"] = data.get("response_text", "")
+        elif event == "done":
+            out["notes"] = data.get("notes", {})
+        elif event == "error":
+            raise RuntimeError(data.get("detail", "stream error"))
+    placeholder.empty()
+    return out
+
 def call_hybrid(q: str, k: int):
     url = f"{API_BASE}/search/hybrid"
     params = {"q": q, "top_k": k}
@@ -165,8 +206,12 @@ if not go and not query.strip():
 if go:
     try:
         q = build_query_with_filters(query)
-        with st.spinner("Thinking..."):
-            chat_out = call_chat(q, top_k)
+        try:
+            # Tokens render as they stream; the full response is shown below once done
+            chat_out = run_chat_streaming(q, top_k, st.empty())
+        except requests.RequestException:
+            with st.spinner("Thinking..."):
+                chat_out = call_chat(q, top_k)
 
         # Response block
         resp_text = chat_out.get("response_text", "").strip()